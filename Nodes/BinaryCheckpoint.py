@@ -0,0 +1,135 @@
+"""
+A compact, append-only binary format to store the state of the nodes (and their history) in.
+
+The file starts with a small header, followed by a list of length prefixed records. Each record consists of the type
+of the record (1 byte), the length of the payload (4 bytes, little endian) and the payload itself (zlib compressed
+JSON). A checkpoint is a number of records, closed by a CHECKPOINT_RECORD. Records that are not followed by a
+CHECKPOINT_RECORD (eg; because the engine crashed while it was writing) are ignored when the file is read.
+"""
+import json
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"SBCN"
+VERSION = 1
+HEADER = MAGIC + struct.pack("<B", VERSION)
+
+NODE_RECORD = 1
+"""The complete serialized state of a single node."""
+HISTORY_RECORD = 2
+"""The complete serialized history of a single node."""
+HISTORY_APPEND_RECORD = 3
+"""Samples that were added to the history of a single node since the last checkpoint."""
+CHECKPOINT_RECORD = 4
+"""Closes a checkpoint. All records since the previous checkpoint are only valid once this record is written."""
+
+_RECORD_HEADER = struct.Struct("<BI")
+
+
+def isBinaryCheckpoint(data: bytes) -> bool:
+    """
+    Check if the provided data is (the start of) a binary checkpoint file.
+    :param data: The data to check.
+    :return: True if the data starts with the header of the binary format.
+    """
+    return data.startswith(MAGIC)
+
+
+def encodeRecord(record_type: int, payload: Dict[str, Any]) -> bytes:
+    """
+    Encode a single record.
+    :param record_type: The type of the record (eg; NODE_RECORD)
+    :param payload: The (JSON serializable) data of the record.
+    :return: The encoded record.
+    """
+    encoded_payload = zlib.compress(json.dumps(payload, separators = (",", ":")).encode("utf-8"))
+    return _RECORD_HEADER.pack(record_type, len(encoded_payload)) + encoded_payload
+
+
+def decodeRecords(data: bytes) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Decode all the (complete) records in a binary checkpoint file. If the last record is incomplete, it is dropped.
+    :param data: The complete contents of the file.
+    :return: List of record type & payload tuples, in the order that they were written.
+    """
+    if not data.startswith(HEADER):
+        raise ValueError("Data is not a binary checkpoint of version %s" % VERSION)
+    records = []
+    offset = len(HEADER)
+    while offset + _RECORD_HEADER.size <= len(data):
+        record_type, length = _RECORD_HEADER.unpack_from(data, offset)
+        offset += _RECORD_HEADER.size
+        if offset + length > len(data):
+            break  # Record was not completely written.
+        try:
+            payload = json.loads(zlib.decompress(data[offset: offset + length]).decode("utf-8"))
+        except (zlib.error, ValueError):
+            break  # Anything after a corrupt record can't be trusted.
+        offset += length
+        records.append((record_type, payload))
+    return records
+
+
+def readCheckpoint(data: bytes) -> Dict[str, Any]:
+    """
+    Read a binary checkpoint file and convert it into the same structure as the JSON storage uses.
+    :param data: The complete contents of the file.
+    :return: Dict with the nodes, the histories and the current tick of the last complete checkpoint.
+    """
+    nodes = {}  # type: Dict[str, Dict[str, Any]]
+    histories = {}  # type: Dict[str, Dict[str, Any]]
+    current_tick = 0
+
+    pending_records = []  # type: List[Tuple[int, Dict[str, Any]]]
+    for record_type, payload in decodeRecords(data):
+        if record_type != CHECKPOINT_RECORD:
+            pending_records.append((record_type, payload))
+            continue
+        for pending_type, pending_payload in pending_records:
+            node_id = pending_payload["node_id"]
+            if pending_type == NODE_RECORD:
+                nodes[node_id] = pending_payload["data"]
+            elif pending_type == HISTORY_RECORD:
+                histories[node_id] = pending_payload["data"]
+            elif pending_type == HISTORY_APPEND_RECORD and node_id in histories:
+                _appendHistorySamples(histories[node_id], pending_payload["data"])
+        pending_records = []
+        current_tick = payload["tick"]
+
+    return {"nodes": list(nodes.values()), "histories": histories, "current_tick": current_tick}
+
+
+def _appendHistorySamples(history: Dict[str, Any], samples: Dict[str, Any]) -> None:
+    """
+    Add the samples of a HISTORY_APPEND_RECORD to a serialized history.
+    The history isn't truncated here; The ring buffers of the NodeHistory only keep the newest values when it's
+    deserialized.
+    :param history: The serialized history to add the samples to.
+    :param samples: The new samples, in the same structure as the serialized history.
+    """
+    for key, new_values in samples.items():
+        if isinstance(new_values, dict):
+            section = history.setdefault(key, {})
+            for resource_type, values in new_values.items():
+                section.setdefault(resource_type, []).extend(values)
+        else:
+            history.setdefault(key, []).extend(new_values)
+
+
+def getAppendedSamples(old_values: List[float], new_values: List[float], max_length: int) -> Optional[List[float]]:
+    """
+    Find the samples that need to be appended to old_values (a FIFO of max_length) to end up with new_values.
+    :param old_values: The values that were previously stored.
+    :param new_values: The values as they are now.
+    :param max_length: The maximum number of values that the FIFO holds.
+    :return: The samples that were added, or None if new_values can't be created by appending to old_values.
+    """
+    num_old = len(old_values)
+    # Values are only dropped from the front once the FIFO is full.
+    max_dropped = num_old if len(new_values) == max_length else 0
+    for dropped in range(0, max_dropped + 1):
+        num_overlap = num_old - dropped
+        if num_overlap <= len(new_values) and old_values[dropped:] == new_values[:num_overlap]:
+            return new_values[num_overlap:]
+    return None
@@ -0,0 +1,174 @@
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from atomicwrites import atomic_write
+
+from Nodes import BinaryCheckpoint
+from Nodes.NodeStorage import NodeStorage
+
+if TYPE_CHECKING:
+    from Nodes.NodeEngine import NodeEngine
+
+
+class BinaryNodeStorage(NodeStorage):
+    """
+    Storage that writes the state of the nodes as (incremental) checkpoints in a compact binary file.
+    Instead of dumping the complete state on every tick, only the nodes that changed since the last checkpoint are
+    written, together with the history samples that were added since then. Every so many checkpoints the file is
+    compacted, by writing the complete state to a new file (which then also becomes one of the stored revisions).
+
+    .. seealso:: :mod:`Nodes.BinaryCheckpoint` for the format of the file.
+    """
+    def __init__(self, engine: "NodeEngine", store_on_tick: bool = True, checkpoints_per_compaction: int = 100,
+                 **kwargs) -> None:
+        """
+        Create a storage that stores the state of all the nodes in an engine as binary checkpoints.
+        :param engine: The engine to store the nodes of.
+        :param store_on_tick: Should the state be stored automatically every time a tick is completed?
+        :param checkpoints_per_compaction: How many incremental checkpoints can be appended before the file is compacted.
+        :param kwargs: Passed on to the NodeStorage (eg; to write asynchronously)
+        """
+        # What was written in the last checkpoint, so that we can tell what changed. This is only used by whoever
+        # writes the snapshots (which can be the writer thread)
+        self._stored_node_states = {}  # type: Dict[str, str]
+        self._stored_histories = {}  # type: Dict[str, Dict[str, Any]]
+        self._checkpoints_per_compaction = checkpoints_per_compaction
+        self._checkpoints_since_compaction = 0
+
+        super().__init__(engine, store_on_tick, **kwargs)
+        self.storage_name = "node_state.bin"
+
+    @property
+    def base_storage_path(self):
+        if self.storage_name.endswith(".bin"):
+            return self.storage_name
+        return self.storage_name + ".bin"
+
+    def _createSnapshot(self) -> Dict[str, Any]:
+        snapshot = super()._createSnapshot()
+        snapshot["history_lengths"] = {}
+        for node_id in snapshot["histories"]:
+            history = self._engine.getNodeHistoryById(node_id)
+            if history is not None:
+                snapshot["history_lengths"][node_id] = history.max_elements_to_store
+        return snapshot
+
+    def _writeSnapshot(self, snapshot: Dict[str, Any]) -> None:
+        if not self._stored_node_states or self._checkpoints_since_compaction >= self._checkpoints_per_compaction \
+                or not os.path.isfile(self.base_storage_path):
+            self._storeFullCheckpoint(snapshot)
+        else:
+            self._storeIncrementalCheckpoint(snapshot)
+
+    def _storeFullCheckpoint(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Write the complete state of all the nodes to a new file, which replaces the old one.
+        :param snapshot: The snapshot to write.
+        """
+        self._stored_node_states = {}
+        self._stored_histories = {}
+        records = [BinaryCheckpoint.HEADER]
+        for node_data in snapshot["nodes"]:
+            self._stored_node_states[node_data["node_id"]] = json.dumps(node_data, sort_keys = True)
+            records.append(BinaryCheckpoint.encodeRecord(BinaryCheckpoint.NODE_RECORD,
+                                                         {"node_id": node_data["node_id"], "data": node_data}))
+
+        for node_id, history_data in snapshot["histories"].items():
+            self._stored_histories[node_id] = history_data
+            records.append(BinaryCheckpoint.encodeRecord(BinaryCheckpoint.HISTORY_RECORD,
+                                                         {"node_id": node_id, "data": history_data}))
+        records.append(self._createCheckpointRecord(snapshot["current_tick"]))
+        data_to_store = b"".join(records)
+
+        name = self._getVersionedName(self._getCurrentRevision() + 1)
+        with atomic_write(name, mode = "wb") as file:
+            file.write(data_to_store)
+
+        with atomic_write(self.base_storage_path, mode = "wb", overwrite = True) as file:
+            file.write(data_to_store)
+
+        self._deleteOldRevisions()
+        self._checkpoints_since_compaction = 0
+
+    def _storeIncrementalCheckpoint(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Append the nodes that changed and the new history samples to the file.
+        :param snapshot: The snapshot to write.
+        """
+        records = []
+        for node_data in snapshot["nodes"]:
+            node_id = node_data["node_id"]
+            serialized_state = json.dumps(node_data, sort_keys = True)
+            if self._stored_node_states.get(node_id) == serialized_state:
+                continue
+            self._stored_node_states[node_id] = serialized_state
+            records.append(BinaryCheckpoint.encodeRecord(BinaryCheckpoint.NODE_RECORD,
+                                                         {"node_id": node_id, "data": node_data}))
+
+        for node_id, history_data in snapshot["histories"].items():
+            samples = self._getNewHistorySamples(self._stored_histories.get(node_id), history_data,
+                                                 snapshot["history_lengths"][node_id])
+            self._stored_histories[node_id] = history_data
+            if samples is None:
+                records.append(BinaryCheckpoint.encodeRecord(BinaryCheckpoint.HISTORY_RECORD,
+                                                             {"node_id": node_id, "data": history_data}))
+            elif samples:
+                records.append(BinaryCheckpoint.encodeRecord(BinaryCheckpoint.HISTORY_APPEND_RECORD,
+                                                             {"node_id": node_id, "data": samples}))
+        records.append(self._createCheckpointRecord(snapshot["current_tick"]))
+
+        with open(self.base_storage_path, "ab") as file:
+            file.write(b"".join(records))
+            file.flush()
+            os.fsync(file.fileno())
+        self._checkpoints_since_compaction += 1
+
+    @staticmethod
+    def _createCheckpointRecord(tick: int) -> bytes:
+        """
+        :param tick: The tick that the checkpoint contains the state of.
+        :return: The record that closes a checkpoint.
+        """
+        return BinaryCheckpoint.encodeRecord(BinaryCheckpoint.CHECKPOINT_RECORD, {"tick": tick})
+
+    @staticmethod
+    def _getNewHistorySamples(old_history: Optional[Dict[str, Any]], new_history: Dict[str, Any], max_length: int) \
+            -> Optional[Dict[str, Any]]:
+        """
+        Find the samples that were added to a serialized history.
+        :param old_history: The history as it was written in the last checkpoint.
+        :param new_history: The history as it is now.
+        :param max_length: The maximum number of samples that the history keeps per value.
+        :return: The added samples (in the same structure as a serialized history, with only the values that got new
+                 samples) or None if the new history can't be created by appending to the old one.
+        """
+        if old_history is None:
+            return None
+        samples = {}  # type: Dict[str, Any]
+        for key, new_values in new_history.items():
+            old_values = old_history.get(key)
+            if isinstance(new_values, dict):
+                section_samples = {}  # type: Dict[str, List[float]]
+                for resource_type, resource_values in new_values.items():
+                    old_resource_values = old_values.get(resource_type, []) if old_values is not None else []
+                    appended = BinaryCheckpoint.getAppendedSamples(old_resource_values, resource_values, max_length)
+                    if appended is None:
+                        return None
+                    if appended:
+                        section_samples[resource_type] = appended
+                if section_samples:
+                    samples[key] = section_samples
+            else:
+                appended = BinaryCheckpoint.getAppendedSamples(old_values or [], new_values, max_length)
+                if appended is None:
+                    return None
+                if appended:
+                    samples[key] = appended
+        return samples
+
+    def restoreNodeState(self) -> None:
+        super().restoreNodeState()
+        # Start with a fresh file on the next store, so that we don't append to something we didn't write ourselves.
+        self._stored_node_states = {}
+        self._stored_histories = {}
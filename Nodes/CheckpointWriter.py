@@ -0,0 +1,124 @@
+import time
+from collections import deque
+from threading import Condition, Thread
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class CheckpointWriter:
+    """
+    Writes snapshots on a separate thread, so that the (slow) serialization and disk writes don't block whoever creates
+    the snapshots. The queue of snapshots is bounded; If the writing can't keep up, the oldest snapshot that is still
+    waiting is dropped in favor of the new one (which is fine, since only the last state matters).
+    The metrics can be requested from any thread.
+    """
+
+    def __init__(self, write_function: Callable[[Dict[str, Any]], None], max_queue_size: int = 2,
+                 max_latencies_to_store: int = 50) -> None:
+        """
+        Writes snapshots on a separate thread.
+        :param write_function: Function that actually writes a single snapshot.
+        :param max_queue_size: How many snapshots can wait to be written before the oldest is dropped.
+        :param max_latencies_to_store: For how many writes should the duration be kept?
+        """
+        self._write_function = write_function
+        self._max_queue_size = max(1, max_queue_size)
+        self._queue = deque()  # type: Deque[Dict[str, Any]]
+        self._condition = Condition()
+        self._is_writing = False
+        self._should_stop = False
+
+        self._num_submitted = 0
+        self._num_written = 0
+        self._num_coalesced = 0
+        self._num_failed = 0
+        self._write_latencies = deque(maxlen = max_latencies_to_store)  # type: Deque[float]
+
+        self._thread = Thread(target = self._run, name = "CheckpointWriter", daemon = True)
+        self._thread.start()
+
+    def submit(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Add a snapshot to be written. This doesn't block.
+        :param snapshot: The snapshot to write. It should not be changed after it was submitted.
+        """
+        with self._condition:
+            if self._should_stop:
+                raise RuntimeError("Unable to submit a snapshot to a writer that was stopped")
+            if len(self._queue) >= self._max_queue_size:
+                self._queue.popleft()
+                self._num_coalesced += 1
+            self._queue.append(snapshot)
+            self._num_submitted += 1
+            self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all the submitted snapshots are written.
+        :param timeout: Maximum time to wait (in seconds). None waits for as long as it takes.
+        :return: True if everything was written, False if the timeout expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and not self._is_writing, timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write the snapshots that are still waiting and stop the thread. No snapshots can be submitted afterwards.
+        :param timeout: Maximum time to wait (in seconds). None waits for as long as it takes.
+        :return: True if everything was written, False if the timeout expired first.
+        """
+        with self._condition:
+            self._should_stop = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread.is_alive()
+
+    def getMetrics(self) -> Dict[str, Any]:
+        """
+        Get information about the snapshots that were written.
+        :return: Dict with the number of submitted, written, coalesced (dropped) and failed snapshots, the current size
+                 of the queue and the last, average and maximum duration of the stored writes (in seconds).
+        """
+        with self._condition:
+            latencies = list(self._write_latencies)
+            return {"num_submitted": self._num_submitted,
+                    "num_written": self._num_written,
+                    "num_coalesced": self._num_coalesced,
+                    "num_failed": self._num_failed,
+                    "queue_size": len(self._queue),
+                    "last_write_duration": latencies[-1] if latencies else 0.,
+                    "average_write_duration": sum(latencies) / len(latencies) if latencies else 0.,
+                    "max_write_duration": max(latencies) if latencies else 0.}
+
+    def _run(self) -> None:
+        """
+        Keep on writing snapshots until the writer is stopped (and there is nothing left to write).
+        """
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._should_stop)
+                if not self._queue:
+                    return  # Stopped and nothing left to write.
+                snapshot = self._queue.popleft()
+                self._is_writing = True
+
+            start_time = time.perf_counter()
+            succeeded = True
+            try:
+                self._write_function(snapshot)
+            except Exception as e:
+                print("Failed to write snapshot:", e)
+                succeeded = False
+            duration = time.perf_counter() - start_time
+
+            with self._condition:
+                if succeeded:
+                    self._num_written += 1
+                    self._write_latencies.append(duration)
+                else:
+                    self._num_failed += 1
+                self._is_writing = False
+                self._condition.notify_all()
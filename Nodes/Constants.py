@@ -50,4 +50,6 @@ COMBUSTION_HEAT = {"water": 0,
                    "medicine": 0
                    }
 
-SECONDS_PER_TICK = 60
\ No newline at end of file
+SECONDS_PER_TICK = 60
+
+STEFAN_BOLTZMANN_CONSTANT = 5.67e-8
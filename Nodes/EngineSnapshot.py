@@ -0,0 +1,153 @@
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from Nodes.Node import Node
+
+STATIC_NODE_STATE_KEYS = ("node_id", "node_type", "label", "description", "custom_description",
+                          "has_settable_performance", "surface_area", "additional_properties", "incoming_connections",
+                          "outgoing_connections")
+"""The parts of the state of a node that can't change during a run (unless connections are added)"""
+
+
+class EngineSnapshot:
+    """
+    An immutable copy of all the state of the nodes that can be requested from outside the engine (eg; over DBus).
+    The engine publishes a new snapshot once a tick is completed, so readers can use the last snapshot without waiting
+    for a tick that is in progress and always see the state of all the nodes at the same moment. The version is
+    increased with every snapshot that is published.
+    """
+
+    def __init__(self, version: int, tick_count: int, node_states: Mapping[str, Mapping[str, Any]]) -> None:
+        """
+        An immutable copy of the state of the nodes.
+        :param version: The version of the snapshot.
+        :param tick_count: The number of ticks that were done when the snapshot was taken.
+        :param node_states: The state per node id (see createNodeState). The snapshot takes ownership of it.
+        """
+        self._version = version
+        self._tick_count = tick_count
+        self._node_states = MappingProxyType(node_states)  # type: Mapping[str, Mapping[str, Any]]
+
+    @classmethod
+    def createFromNodes(cls, nodes: Iterable["Node"], version: int, tick_count: int,
+                        previous: Optional["EngineSnapshot"] = None) -> "EngineSnapshot":
+        """
+        Take a snapshot of the nodes. The nodes should not be updated while this is done.
+        :param nodes: The nodes to take the snapshot of.
+        :param version: The version of the snapshot.
+        :param tick_count: The number of ticks that were done.
+        :param previous: The previous snapshot, if no nodes or connections were added since it was taken. The state that
+                         can't change during a run (see STATIC_NODE_STATE_KEYS) is then shared with it.
+        :return: The snapshot.
+        """
+        previous_states = previous._node_states if previous is not None else {}  # type: Mapping[str, Mapping[str, Any]]
+        return cls(version, tick_count, {node.getId(): cls.createNodeState(node, previous_states.get(node.getId()))
+                                         for node in nodes})
+
+    def replaceNodeStates(self, nodes: Iterable["Node"], version: int) -> "EngineSnapshot":
+        """
+        Create a new snapshot in which the state of some nodes is taken again (the other states are shared).
+        :param nodes: The nodes of which the state should be taken again.
+        :param version: The version of the new snapshot.
+        :return: The new snapshot.
+        """
+        node_states = dict(self._node_states)
+        for node in nodes:
+            node_states[node.getId()] = self.createNodeState(node, self._node_states.get(node.getId()))
+        return EngineSnapshot(version, self._tick_count, node_states)
+
+    @staticmethod
+    def _createStaticNodeState(node: "Node") -> Dict[str, Any]:
+        """
+        Copy the state of a node that can't change during a run (see STATIC_NODE_STATE_KEYS).
+        :param node: The node to copy the state of.
+        :return: The static state of the node.
+        """
+        return {
+            "node_id": node.getId(),
+            "node_type": type(node).__name__,
+            "label": node.label,
+            "description": node.description,
+            "custom_description": node.custom_description,
+            "has_settable_performance": node.hasSettablePerformance,
+            "surface_area": node.surface_area,
+            "additional_properties": tuple(node.additional_properties),
+            "incoming_connections": tuple(MappingProxyType({"target": connection.target.getId(),
+                                                           "origin": connection.origin.getId(),
+                                                           "resource_type": connection.resource_type})
+                                          for connection in node.getAllIncomingConnections()),
+            "outgoing_connections": tuple(MappingProxyType({"target": connection.target.getId(),
+                                                           "origin": connection.origin.getId(),
+                                                           "resource_type": connection.resource_type})
+                                          for connection in node.getAllOutgoingConnections())
+        }
+
+    @classmethod
+    def createNodeState(cls, node: "Node", previous_state: Optional[Mapping[str, Any]] = None) -> Mapping[str, Any]:
+        """
+        Copy the state of a single node. Everything in it is immutable (dicts are read only and lists are tuples).
+        :param node: The node to copy the state of.
+        :param previous_state: The previous state of the node, to share the static state with.
+        :return: The state of the node.
+        """
+        if previous_state is None:
+            state = cls._createStaticNodeState(node)
+        else:
+            state = {key: previous_state[key] for key in STATIC_NODE_STATE_KEYS}
+        additional_properties = state["additional_properties"]
+        state.update({
+            "temperature": node.temperature,
+            "enabled": node.enabled,
+            "active": node.active,
+            "performance": node.performance,
+            "target_performance": node.target_performance,
+            "min_performance": node.min_performance,
+            "max_performance": node.max_performance,
+            "max_safe_temperature": node.max_safe_temperature,
+            "heat_convection_coefficient": node.heat_convection_coefficient,
+            "heat_emissivity": node.heat_emissivity,
+            "health": getattr(node, "health", -1),
+            "is_temperature_dependant": node.isTemperatureDependant,
+            "optimal_temperature": node.optimal_temperature,
+            "effectiveness_factor": node.effectiveness_factor,
+            "resources_required": MappingProxyType(dict(node.getResourcesRequiredLastTick())),
+            "optional_resources_required": MappingProxyType(dict(node.getOptionalResourcesRequiredLastTick())),
+            "resources_received": MappingProxyType(dict(node.getResourcesReceivedLastTick())),
+            "resources_produced": MappingProxyType(dict(node.getResourcesProducedLastTick())),
+            "resources_provided": MappingProxyType(dict(node.getResourcesProvidedLastTick())),
+            "additional_property_values": MappingProxyType({prop: getattr(node, prop, -1)
+                                                            for prop in additional_properties}),
+            "max_additional_property_values": MappingProxyType({prop: getattr(node, "max_" + prop, -1)
+                                                                for prop in additional_properties}),
+            "modifiers": tuple(MappingProxyType({"name": modifier.name,
+                                                 "duration": modifier.duration,
+                                                 "abbreviation": modifier.abbreviation,
+                                                 "type": type(modifier).__name__})
+                               for modifier in node.getModifiers())
+        })
+        return MappingProxyType(state)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def tick_count(self) -> int:
+        return self._tick_count
+
+    def getNodeState(self, node_id: str) -> Optional[Mapping[str, Any]]:
+        """
+        :param node_id: The id of the node.
+        :return: The state of the node (see createNodeState), or None if there is no such node.
+        """
+        return self._node_states.get(node_id)
+
+    def getAllNodeStates(self) -> Mapping[str, Mapping[str, Any]]:
+        """
+        :return: The state of every node, by node id (in the order the nodes were registered).
+        """
+        return self._node_states
+
+    def getAllNodeIds(self) -> List[str]:
+        return list(self._node_states)
@@ -0,0 +1,95 @@
+import math
+from typing import Dict, List, Optional
+
+from Nodes.RingBuffer import RingBuffer
+
+
+class HistoryRollup:
+    """
+    Downsampled version of a history. Every `resolution` samples are combined into a single point, which holds the
+    minimum, mean and maximum of those samples. Since the number of points that are stored is limited in the same way as
+    the normal history, a rollup with a resolution of 100 covers a 100 times longer period.
+    The points are aligned to the tick at which the samples were taken, so that rollups that were started at different
+    moments still combine the same ticks into a point.
+    """
+
+    def __init__(self, resolution: int, max_elements_to_store: int, start_tick: int = 0) -> None:
+        """
+        Downsampled version of a history.
+        :param resolution: How many samples are combined into a single point.
+        :param max_elements_to_store: How many points should be kept?
+        :param start_tick: The tick of the first sample. If it's not a multiple of the resolution, the first point only
+                           combines the samples until the next multiple.
+        """
+        self._resolution = resolution
+        self._minimum = RingBuffer(max_elements_to_store)
+        self._mean = RingBuffer(max_elements_to_store)
+        self._maximum = RingBuffer(max_elements_to_store)
+
+        # The samples of the point that is not complete yet. The ticks before the start count for the point, but have no
+        # sample.
+        self._num_ticks = start_tick % resolution
+        self._num_samples = 0
+        self._sum = 0.
+        self._current_minimum = math.inf
+        self._current_maximum = -math.inf
+
+    @property
+    def resolution(self) -> int:
+        return self._resolution
+
+    def __len__(self) -> int:
+        return len(self._mean)
+
+    def add(self, value: float) -> None:
+        """
+        Add a sample. Once enough samples are added, they are stored as a new point.
+        :param value: The value of the sample.
+        """
+        self._num_ticks += 1
+        self._num_samples += 1
+        self._sum += value
+        if value < self._current_minimum:
+            self._current_minimum = value
+        if value > self._current_maximum:
+            self._current_maximum = value
+
+        if self._num_ticks == self._resolution:
+            self._minimum.append(self._current_minimum)
+            self._mean.append(self._sum / self._num_samples)
+            self._maximum.append(self._current_maximum)
+            self._num_ticks = 0
+            self._num_samples = 0
+            self._sum = 0.
+            self._current_minimum = math.inf
+            self._current_maximum = -math.inf
+
+    def getMeans(self, num_points: Optional[int] = None) -> List[float]:
+        """
+        :param num_points: How many of the newest points to get. None to get all of them.
+        :return: The mean of the samples for each point (oldest first).
+        """
+        return self._mean.getLast(num_points)
+
+    def getStatistics(self, num_points: Optional[int] = None) -> Dict[str, List[float]]:
+        """
+        :param num_points: How many of the newest points to get. None to get all of them.
+        :return: Dict with a list of the minimum, mean and maximum for each point (oldest first).
+        """
+        return {"min": self._minimum.getLast(num_points),
+                "mean": self._mean.getLast(num_points),
+                "max": self._maximum.getLast(num_points)}
+
+    def resize(self, max_elements_to_store: int) -> None:
+        """
+        Change how many points are kept. If it's decreased, the oldest points are dropped.
+        :param max_elements_to_store: How many points should be kept?
+        """
+        for buffer in [self._minimum, self._mean, self._maximum]:
+            buffer.resize(max_elements_to_store)
+
+    def getMemoryUsage(self) -> int:
+        """
+        :return: The number of bytes that are used to store the points.
+        """
+        return sum(buffer.getMemoryUsage() for buffer in [self._minimum, self._mean, self._maximum])
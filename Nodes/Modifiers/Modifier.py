@@ -88,6 +88,9 @@ class Modifier:
         self._modifiers = data["modifiers"]
         self._factors = data["factors"]
         self._duration = data["duration"]
+        if self._node is not None:
+            # The node caches the effect of its modifiers, so it needs to know that ours changed.
+            self._node.clearModifiedPropertyCache()
 
     @property
     def duration(self) -> int:
@@ -1,9 +1,10 @@
+import math
 from threading import RLock
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Set, Tuple, Optional
 
 from collections import defaultdict
 from Nodes.Connection import Connection
-from Nodes.Constants import SPECIFIC_HEAT, WEIGHT_PER_UNIT
+from Nodes.Constants import SPECIFIC_HEAT, WEIGHT_PER_UNIT, STEFAN_BOLTZMANN_CONSTANT
 from Nodes.Modifiers.Modifier import Modifier
 from Nodes.Modifiers.ModifierFactory import ModifierFactory
 from Signal import signalemitter, Signal
@@ -20,25 +21,32 @@ def modifiable_property(f):
     A modifiable property is one that can be modified by, you guessed it, modifiers.
 
     If a property has a max_{property_name}, it will also be used to clamp it's max.
+
+    Since these properties are read a *lot* during a tick, the combined modifier & factor of all the modifiers is cached
+    per node (see :meth:`Nodes.Node.Node.clearModifiedPropertyCache`). Whether a class has a max_{property_name} can't
+    change once the class is created, so that is only looked up once per class.
     :param f:
     :return:
     """
+    property_name = f.__name__
+    max_property_name = "max_" + property_name
+    has_max_clamp = {}  # type: Dict[type, bool]
 
     @wraps(f)
     def wrapper(self, *args, **kwargs):
-        modifier_value = 0
-        factor_value = 1.0
-        property_name = f.__name__
-        for modifier in self._modifiers:
-            modifier_value += modifier.getModifierForProperty(property_name)
-            factor_value *= modifier.getFactorForProperty(property_name)
+        modifier_terms = self._modified_property_cache.get(property_name)
+        if modifier_terms is None:
+            modifier_terms = self._getModifierTermsForProperty(property_name)
 
         unmodified_value = f(self, *args, **kwargs)
-        final_value = factor_value * unmodified_value + modifier_value
-        try:
-            return min(getattr(self, "max_" + property_name), final_value)
-        except AttributeError:
-            return final_value
+        final_value = modifier_terms[1] * unmodified_value + modifier_terms[0]
+
+        node_class = type(self)
+        if node_class not in has_max_clamp:
+            has_max_clamp[node_class] = hasattr(node_class, max_property_name)
+        if has_max_clamp[node_class]:
+            return min(getattr(self, max_property_name), final_value)
+        return final_value
     return property(wrapper)
 
 
@@ -53,11 +61,32 @@ class Node:
     Nodes can produce and require a certain amount of resources per tick.
     """
 
+    # Every node has the same (large) set of attributes, which are stored in slots instead of the __dict__. In large
+    # bases this saves a lot of memory. The __dict__ is still there for the attributes that subclasses add.
+    __slots__ = ("_node_id", "_incoming_connections", "_outgoing_connections", "_incoming_connections_by_type",
+                 "_outgoing_connections_by_type", "_resources_required_per_tick",
+                 "_original_resources_required_per_tick", "_optional_resources_required_per_tick",
+                 "_original_optional_resources_required_per_tick", "_optional_resources_required_last_tick",
+                 "_resources_received_this_tick", "_resources_produced_this_tick", "_resources_provided_this_tick",
+                 "_resources_received_this_sub_tick", "_resources_required_last_tick", "_resources_received_last_tick",
+                 "_resources_produced_last_tick", "_resources_provided_last_tick", "_resources_left_over", "_weight",
+                 "_specific_heat", "_stored_heat", "_temperature", "_heat_emissivity", "_enabled", "_can_be_modified",
+                 "_update_lock", "_heat_convection_coefficient", "_surface_area", "__stefan_boltzmann_constant",
+                 "_additional_properties", "_health", "_max_health", "_active", "_max_safe_temperature",
+                 "_performance", "_target_performance", "_min_performance", "_max_performance",
+                 "_has_settable_performance", "_usage_damage_factor", "_temperature_degradation_speed",
+                 "_custom_description", "_label", "_modifiers", "_modified_property_cache",
+                 "_use_temperature_dependant_effectiveness_factor", "_performance_change_factor",
+                 "_optimal_temperature", "_optimal_temperature_range", "_temperature_efficiency", "_tags",
+                 "_seconds_per_tick", "_acceptable_resources", "_providable_resources", "_logistics_factor",
+                 "_optional_logistics_factor", "_post_update_prepared", "__dict__", "__weakref__")
+
     outside_temp = 293.15
 
     preUpdateCalled = Signal()
     updateCalled = Signal()
     postUpdateCalled = Signal()
+    connectionAdded = Signal()
 
     _description: str = ""
     """Description for this type of node"""
@@ -71,6 +100,11 @@ class Node:
         self._incoming_connections = []  # type: List[Connection]
         self._outgoing_connections = []  # type: List[Connection]
 
+        self._incoming_connections_by_type = {}  # type: Dict[str, List[Connection]]
+        """The incoming connections, indexed by the resource type they transport. Kept up to date by addConnection"""
+        self._outgoing_connections_by_type = {}  # type: Dict[str, List[Connection]]
+        """The outgoing connections, indexed by the resource type they transport. Kept up to date by connectWith"""
+
         self._resources_required_per_tick: resource_dict = {}
         """ What resources must this node get in order to function? """
 
@@ -127,7 +161,7 @@ class Node:
         self._surface_area: float = kwargs.get("surface_area", 1)
         """How large is the surface of this object (in M2)"""
 
-        self.__stefan_boltzmann_constant: float = 5.67e-8
+        self.__stefan_boltzmann_constant: float = STEFAN_BOLTZMANN_CONSTANT
         """A constant for heat."""
 
         self._additional_properties: List[str] = ["health"]
@@ -161,6 +195,9 @@ class Node:
 
         self._modifiers = []  # type: List[Modifier]
 
+        self._modified_property_cache = {}  # type: Dict[str, Tuple[float, float]]
+        """Combined (modifier, factor) of all modifiers per modifiable property. Cleared when the modifiers change"""
+
         self._use_temperature_dependant_effectiveness_factor = False
 
         # Does this node change it's performance instantly?
@@ -189,6 +226,9 @@ class Node:
         """
         self._optional_logistics_factor = 1.
 
+        self._post_update_prepared = False
+        """Was the preparePostUpdate (and the thermal update) already done by the engine this tick?"""
+
     @property
     def combined_specific_heat(self) -> float:
         total_specific_heat = self._weight * self._specific_heat
@@ -296,8 +336,33 @@ class Node:
             self._modifiers.remove(existing_modifier)
 
         self._modifiers.append(modifier)
+        self.clearModifiedPropertyCache()
         modifier.setNode(self)
 
+    def _getModifierTermsForProperty(self, property_name: str) -> Tuple[float, float]:
+        """
+        Get the combined effect of all modifiers on a modifiable property.
+        :param property_name: Name of the property
+        :return: Tuple of the value to add and the factor to multiply the unmodified value with.
+        """
+        modifier_terms = self._modified_property_cache.get(property_name)
+        if modifier_terms is None:
+            modifier_value = 0.
+            factor_value = 1.0
+            for modifier in self._modifiers:
+                modifier_value += modifier.getModifierForProperty(property_name)
+                factor_value *= modifier.getFactorForProperty(property_name)
+            modifier_terms = (modifier_value, factor_value)
+            self._modified_property_cache[property_name] = modifier_terms
+        return modifier_terms
+
+    def clearModifiedPropertyCache(self) -> None:
+        """
+        The combined effect of all modifiers on the modifiable properties is cached. This needs to be called whenever
+        the modifiers (or the values of the modifiers) of this node change.
+        """
+        self._modified_property_cache.clear()
+
     def _markResourceAsDestroyed(self, resource_type: str, amount: float) -> None:
         """
         If a resource is used up somehow, the node still got extra energy for receiving it in the first place!
@@ -335,6 +400,8 @@ class Node:
             self._modifiers.remove(modifier)
         except ValueError:
             pass
+        else:
+            self.clearModifiedPropertyCache()
 
     @modifiable_property
     def min_performance(self):
@@ -802,9 +869,12 @@ class Node:
         all_resources = self.getAllResourcesRequiredPerTick()
         for resource_type in all_resources:
             connections = self.getAllIncomingConnectionsByType(resource_type)
-            total_resource_deficiency = sum([connection.getReservationDeficiency() for connection in connections])
-            num_satisfied_reservations = len(
-                [connection for connection in connections if connection.isReservationSatisfied()])
+            total_resource_deficiency = 0.
+            num_satisfied_reservations = 0
+            for connection in connections:
+                total_resource_deficiency += connection.getReservationDeficiency()
+                if connection.isReservationSatisfied():
+                    num_satisfied_reservations += 1
 
             if num_satisfied_reservations == 0:
                 extra_resource_to_ask_per_connection = 0.
@@ -842,16 +912,33 @@ class Node:
                 return False
         return True
 
-    def postUpdate(self) -> None:
+    def preparePostUpdate(self) -> None:
         """
-        Cleanup after all the updating is done. This mostly does a bunch of bookkeeping (damage, heat, etc)
+        The part of the post update that needs to happen before the heat of the node is updated.
+        This is normally done by postUpdate itself, but if the engine updates the heat of all nodes in one go, it calls
+        this first, then updates the heat of all nodes and only then calls postUpdate.
         """
         self._updateResourceRequiredPerTick()
         self._active = self._reEvaluateIsActive()
+        self._post_update_prepared = True
+
+    def updateThermals(self) -> None:
+        """
+        Handle the heat that this node loses to (or gains from) the outside and the damage that it takes from heat.
+        """
         self._emitHeat()
         self._convectiveHeatTransfer()
         self._recalculateTemperature()
         self._dealDamageFromHeat()
+
+    def postUpdate(self) -> None:
+        """
+        Cleanup after all the updating is done. This mostly does a bunch of bookkeeping (damage, heat, etc)
+        """
+        if not self._post_update_prepared:
+            self.preparePostUpdate()
+            self.updateThermals()
+        self._post_update_prepared = False
         self._dealDamageFromUsage()
         self._resources_required_last_tick = self._resources_required_per_tick.copy()
         self._resources_received_last_tick = self._resources_received_this_tick.copy()
@@ -867,12 +954,15 @@ class Node:
         self._resources_produced_this_tick.clear()
         self._resources_provided_this_tick.clear()
 
-    def updateModifiers(self) -> None:
+    def updateModifiers(self) -> List[Modifier]:
         """
         Update the timers of the modifiers (and remove them if they have expired)
+        :return: The modifiers that expired (and were thus removed)
         """
+        modifiers_before_update = self._modifiers.copy()
         for modifier in self._modifiers:
             modifier.update()
+        return [modifier for modifier in modifiers_before_update if modifier not in self._modifiers]
 
     def cleanupAfterUpdate(self) -> None:
         """
@@ -896,6 +986,54 @@ class Node:
                 # We were warmer than the outside before, but no amount of radiation can make us go lower!
                 self._temperature = self.outside_temp
 
+    def _getTemperatureModel(self) -> Optional[Tuple[float, float, float, bool, float]]:
+        """
+        Describe how the temperature of this node depends on the heat stored in it. This allows the engine to update the
+        heat of all the nodes in one go.
+
+        The temperature is factor * (stored_heat / divisor) + offset. If follows_stored_heat is false, the temperature
+        only changes when it's recalculated (so adding heat doesn't change the temperature until that happens).
+        The model is only valid as long as the stored heat stays below max_stored_heat.
+
+        :return: Tuple of (divisor, factor, offset, follows_stored_heat, max_stored_heat). None if the temperature of
+                 this node can't be described like this.
+        """
+        if type(self).temperature is not Node.temperature:
+            # Subclass does its own thing. We can't know what that is.
+            return None
+        offset, factor = self._getModifierTermsForProperty("temperature")
+        return self.combined_specific_heat, factor, offset, False, math.inf
+
+    def getBatchedThermalProperties(self) -> Optional[Tuple[float, ...]]:
+        """
+        Get all the properties that are needed to update the heat of this node in a batch with other nodes.
+
+        .. seealso:: :meth:`Nodes.Node.Node.updateThermals` for the (per node) update that this replaces
+        :return: Tuple of (stored_heat, temperature, outside_temp, heat_emissivity, surface_area,
+                 heat_convection_coefficient, seconds_per_tick, combined_specific_heat, temperature_divisor,
+                 temperature_factor, temperature_offset, temperature_follows_stored_heat, max_stored_heat,
+                 max_safe_temperature, temperature_degradation_speed, health). None if it can't be done in a batch.
+        """
+        model = self._getTemperatureModel()
+        if model is None:
+            return None
+        divisor, factor, offset, follows_stored_heat, max_stored_heat = model
+        return (self._stored_heat, self.temperature, self.outside_temp, self.heat_emissivity, self._surface_area,
+                self.heat_convection_coefficient, self._seconds_per_tick, self.combined_specific_heat, divisor,
+                factor, offset, float(follows_stored_heat), max_stored_heat, self._max_safe_temperature,
+                self.temperature_degradation_speed, self._health)
+
+    def setBatchedThermalResult(self, stored_heat: float, temperature: float, health: float) -> None:
+        """
+        Store the result of a thermal update that was done in a batch with other nodes.
+        :param stored_heat: The new heat stored in this node
+        :param temperature: The new (unmodified) temperature of this node
+        :param health: The new health of this node
+        """
+        self._stored_heat = stored_heat
+        self._temperature = temperature
+        self._health = health
+
     def _convectiveHeatTransfer(self) -> None:
         """
         Handle the convective heat transfer.
@@ -995,6 +1133,28 @@ class Node:
         except ZeroDivisionError:
             return 1
 
+    def isQuiescent(self) -> bool:
+        """
+        Is this node in a steady state in which an update has nothing to do? This is the case if no resources are
+        reserved on any of its connections, it has no resources left over (that it could try to get rid of) and it
+        didn't receive, produce or provide anything during the last tick.
+        Since the update of such a node is the same in every sub tick, it can be done in one go.
+        This should be called after the reservations are done.
+
+        :return: True if the node is quiescent.
+        """
+        for connection in self._incoming_connections:
+            if connection.reserved_requested_amount:
+                return False
+        for connection in self._outgoing_connections:
+            if connection.reserved_requested_amount:
+                return False
+        for resources in [self._resources_left_over, self._resources_received_last_tick,
+                          self._resources_produced_last_tick, self._resources_provided_last_tick]:
+            if any(resources.values()):
+                return False
+        return True
+
     def requiresReplanning(self) -> bool:
         """
         Does this node need another replan step in order to get more resources.
@@ -1006,8 +1166,8 @@ class Node:
         """
         if not self.enabled:
             return False  # Disabled nodes don't need replanning!
-        num_satisfied_reservations = len(
-            [connection for connection in self._incoming_connections if connection.isReservationSatisfied()])
+        num_satisfied_reservations = sum(1 for connection in self._incoming_connections
+                                         if connection.isReservationSatisfied())
 
         if not num_satisfied_reservations:
             return False
@@ -1038,7 +1198,9 @@ class Node:
         with self._update_lock:
             new_connection = Connection(origin=self, target=target, resource_type = resource_type)
             self._outgoing_connections.append(new_connection)
+            self._outgoing_connections_by_type.setdefault(new_connection.resource_type, []).append(new_connection)
             target.addConnection(new_connection)
+        self.connectionAdded.emit(self, new_connection)
 
     def addConnection(self, connection: Connection) -> None:
         """
@@ -1048,6 +1210,7 @@ class Node:
         """
         with self._update_lock:
             self._incoming_connections.append(connection)
+            self._incoming_connections_by_type.setdefault(connection.resource_type, []).append(connection)
 
     def getAllOutgoingConnections(self) -> List[Connection]:
         """
@@ -1065,19 +1228,21 @@ class Node:
 
     def getAllIncomingConnectionsByType(self, resource_type: str) -> List[Connection]:
         """
-        Get all the connections that can provide resources to this node but filtered by resource_type
+        Get all the connections that can provide resources to this node but filtered by resource_type.
+        Note that the list is returned by reference (as this is called a *lot* during a tick), so don't modify it!
         :param resource_type: The resource type to filter by
         :return:The list of connections
         """
-        return [connection for connection in self._incoming_connections if connection.resource_type == resource_type]
+        return self._incoming_connections_by_type.get(resource_type, [])
 
     def getAllOutgoingConnectionsByType(self, resource_type: str) -> List[Connection]:
         """
         Get all the connections that the node can move resources from itself to somewhere else but filtered by resource_type
+        Note that the list is returned by reference (as this is called a *lot* during a tick), so don't modify it!
         :param resource_type: The resource type to filter by
         :return:The list of connections
         """
-        return [connection for connection in self._outgoing_connections if connection.resource_type == resource_type]
+        return self._outgoing_connections_by_type.get(resource_type, [])
 
     def preGetResource(self, resource_type: str, amount: float) -> float:
         """
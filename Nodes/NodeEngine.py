@@ -1,15 +1,33 @@
 from threading import RLock
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Set, Tuple
 
+from Nodes.Connection import Connection
+from Nodes.Constants import STEFAN_BOLTZMANN_CONSTANT
+from Nodes.EngineSnapshot import EngineSnapshot
 from Nodes.Node import Node
 from Nodes.NodeFactory import NodeFactory
-from Nodes.NodeHistory import NodeHistory
+from Nodes.NodeHistory import NodeHistory, DEFAULT_MAX_ELEMENTS_TO_STORE
+from Nodes import ParallelUpdate
 from Nodes.TemperatureHandlers.TemperatureHandler import TemperatureHandler
-from Nodes.PerpetualTimer import PerpetualTimer
+from Nodes.SubTickController import SubTickController
+from Nodes.TickProfiler import TickProfiler
+from Nodes.TickScheduler import TickScheduler
 from Signal import signalemitter, Signal
 import random
+import time
+import uuid
+
+try:
+    import numpy
+except ImportError:  # Numpy is optional. Without it, the thermal update is done per node.
+    numpy = None  # type: ignore
+
 TICK_INTERVAL = 120  # Seconds
 
+COMPONENT_ACTIVE = "active"
+COMPONENT_WITHOUT_REQUESTS = "no_requests"
+COMPONENT_DISABLED = "disabled"
+
 
 @signalemitter
 class NodeEngine:
@@ -33,7 +51,7 @@ class NodeEngine:
 
         self._update_lock = RLock()
 
-        self._tick_timer = PerpetualTimer(TICK_INTERVAL, self.doTick)
+        self._tick_scheduler = TickScheduler(TICK_INTERVAL, self.doTick)
 
         self._outside_temperature_handler: Optional[TemperatureHandler] = None
         self._tick_count: int = 0
@@ -49,8 +67,87 @@ class NodeEngine:
         mean that more calculations are done, which might negatively impact larger systems.
         """
 
+        self._sub_tick_controller: Optional[SubTickController] = None
+        """If set, the number of sub ticks is chosen for every tick, depending on how much the flows change."""
+        self._fixed_sub_ticks: int = self._sub_ticks
+
         self._default_outside_temperature = 293.15
 
+        self._replan_only_changed_nodes: bool = True
+        """
+        Should the replanning only revisit the nodes that could have been affected by the previous replanning step?
+        When a node replans, only the providers of its incoming connections need to update their reservations again and
+        only the nodes connected to those providers can change if they need replanning. The result is the same as
+        revisiting all the nodes, but the cost scales with the number of nodes that are fighting over resources instead
+        of the total number of nodes.
+        """
+
+        self._replan_iterations_last_tick: int = 0
+        self._replan_nodes_touched_last_tick: int = 0
+
+        self._tick_profiler = TickProfiler()
+
+        self._snapshot: EngineSnapshot = EngineSnapshot(0, 0, {})
+        """
+        The state of the nodes as it was when the last tick was completed. Readers (eg; the DBus service) use this, so
+        they never have to wait for a tick in progress and never see the state halfway through a tick.
+        """
+        self._snapshot_outdated: bool = False
+        """Were nodes or connections added since the last snapshot was published?"""
+
+        self._generation: str = uuid.uuid4().hex
+        """Changes every time nodes are added, so that users of the engine know when to request the nodes again."""
+
+        self._history_depth: int = DEFAULT_MAX_ELEMENTS_TO_STORE
+        """How many ticks of history should be kept per node?"""
+
+        self._expired_modifiers_last_tick: List[Tuple[str, str]] = []
+        """The modifiers that expired during the last tick, as (node_id, modifier type) tuples."""
+
+        self._use_batched_thermal_update: bool = False
+        """
+        Should the heat of all the nodes be updated in one go (with numpy arrays) instead of per node? The result is the
+        same, but for large setups it saves a lot of time in the post update. Nodes that can't be handled in a batch
+        are still updated one by one.
+        """
+
+        self._components: List[List[str]] = []
+        """
+        The ids of the nodes of each connected component. Nodes can only exchange resources through connections, so
+        the nodes of one component can never influence those of another component during a tick.
+        """
+        self._component_nodes: List[List[Node]] = []
+        self._component_indices: Dict[str, int] = {}
+        self._components_outdated: bool = False
+
+        self._component_states: List[str] = []
+        """What was done for each component in the last tick (COMPONENT_ACTIVE, COMPONENT_WITHOUT_REQUESTS, etc)"""
+        self._component_tick_costs: List[float] = []
+        """How much time (in seconds) each component took in the last tick."""
+
+        self._skip_idle_components: bool = True
+        """
+        Should components that have nothing to do be skipped? If none of the nodes of a component requested any
+        resources, the reservations and replanning of that component are skipped. If all of the nodes of a component are
+        disabled, the sub ticks of that component are skipped as well. The result is the same as handling every
+        component.
+        """
+
+        self._collapse_quiescent_nodes: bool = False
+        """
+        Should the sub ticks of quiescent nodes (nodes that have nothing to do, see Node.isQuiescent) be collapsed into
+        a single update? Since these nodes do the same thing in every sub tick, the result is (nearly) the same, but
+        they only need to be updated once per tick.
+        """
+        self._num_quiescent_nodes_last_tick: int = 0
+
+        self._parallel_update_processes: int = 1
+        """
+        Over how many processes should the update of the sub ticks be divided? This is experimental. The nodes are split
+        into groups that are not connected with each other, which are updated in separate processes. The result is
+        exactly the same as when it's done in a single process.
+        """
+
     def resetSeed(self) -> None:
         """
         When using 'sub-tick updates' we randomize the order in which we handle the updates
@@ -61,6 +158,21 @@ class NodeEngine:
     def tick_count(self) -> int:
         return self._tick_count
 
+    @property
+    def replan_iterations_last_tick(self) -> int:
+        """
+        How many replanning iterations were needed in the last tick.
+        """
+        return self._replan_iterations_last_tick
+
+    @property
+    def replan_nodes_touched_last_tick(self) -> int:
+        """
+        How many times a node was visited during the replanning of the last tick (checked if it needs replanning or had
+        to update its reservations again).
+        """
+        return self._replan_nodes_touched_last_tick
+
     def setOutsideTemperatureHandler(self, temp_handler: TemperatureHandler) -> None:
         """
         Set a handler that controls the outside temperature (which can vary over time)
@@ -85,24 +197,115 @@ class NodeEngine:
         """
         Start the automatic run of the node engine (do a tick per time passed)
         """
-        self._tick_timer.start()
+        self._tick_scheduler.start()
 
     def stop(self) -> None:
         """
-        Stop the automatic run of the node engine (do a tick per time passed)
+        Stop the automatic run of the node engine (do a tick per time passed). A tick that is in progress is finished.
         """
-        self._tick_timer.cancel()
+        self._tick_scheduler.pause()
 
     def setTickInterval(self, tick_interval: float) -> None:
         """
         How frequently should a tick be updated?
         :param tick_interval: How often should it be updated in seconds
         """
-        self._tick_timer.setInterval(tick_interval)
+        self._tick_scheduler.setInterval(tick_interval)
+
+    def setTickCatchUpPolicy(self, catch_up_policy: str) -> None:
+        """
+        Set what should happen with the automatic run when a tick takes longer than the tick interval.
+        :param catch_up_policy: One of the catch up policies of the TickScheduler (skip, burst or slow_down).
+        """
+        self._tick_scheduler.setCatchUpPolicy(catch_up_policy)
+
+    def getTickScheduler(self) -> TickScheduler:
+        """
+        Get the scheduler that does the automatic run (which also keeps track of the ticks that overran).
+        :return: The tick scheduler
+        """
+        return self._tick_scheduler
+
+    def setUseBatchedThermalUpdate(self, use_batched_thermal_update: bool) -> None:
+        """
+        Set if the heat of all nodes should be updated in a batch.
+        :param use_batched_thermal_update: Should it be batched?
+        """
+        if use_batched_thermal_update and numpy is None:
+            raise ValueError("The batched thermal update requires numpy to be installed")
+        self._use_batched_thermal_update = use_batched_thermal_update
+
+    @property
+    def sub_ticks(self) -> int:
+        """
+        The number of sub ticks that the next tick will do.
+        """
+        return self._sub_ticks
+
+    def setAdaptiveSubTicks(self, enabled: bool, min_sub_ticks: int = 2, max_sub_ticks: int = 30) -> None:
+        """
+        Set if the number of sub ticks should be adapted to how much the flows change. Quiet periods then use few sub
+        ticks, while more sub ticks are used when storages fill up or drain quickly (see SubTickController).
+        :param enabled: Should the number of sub ticks be adapted?
+        :param min_sub_ticks: The number of sub ticks when nothing changes.
+        :param max_sub_ticks: The number of sub ticks when a lot changes.
+        """
+        if not enabled:
+            if self._sub_tick_controller is not None:
+                self._sub_ticks = self._fixed_sub_ticks
+            self._sub_tick_controller = None
+            return
+        controller = SubTickController(min_sub_ticks, max_sub_ticks)
+        if self._sub_tick_controller is None:
+            self._fixed_sub_ticks = self._sub_ticks
+        self._sub_tick_controller = controller
+        self._sub_ticks = controller.getSubTicksForNextTick()
+
+    def setCollapseQuiescentNodes(self, collapse_quiescent_nodes: bool) -> None:
+        """
+        Set if the sub ticks of quiescent nodes should be collapsed into a single update. This is not done when the
+        update is done in parallel.
+        :param collapse_quiescent_nodes: Should they be collapsed?
+        """
+        self._collapse_quiescent_nodes = collapse_quiescent_nodes
+
+    @property
+    def num_quiescent_nodes_last_tick(self) -> int:
+        """
+        How many nodes were updated only once (instead of every sub tick) in the last tick, since they were quiescent.
+        """
+        return self._num_quiescent_nodes_last_tick
+
+    @property
+    def parallel_update_processes(self) -> int:
+        return self._parallel_update_processes
+
+    def setParallelUpdateProcesses(self, num_processes: int) -> None:
+        """
+        Set over how many processes the update of the sub ticks should be divided (experimental). Note that the
+        updateCalled signal of nodes that are updated in another process can't be listened to. When the node classes are
+        profiled, the update is always done in a single process. The same goes for when other threads are running (eg;
+        the tick scheduler or the DBus service), since forking those can deadlock the workers. So this should only be
+        used when the ticks are done without any other threads (eg; by headless_run without writing asynchronously).
+        :param num_processes: The number of processes to use. 1 disables the parallel update.
+        """
+        if num_processes < 1:
+            raise ValueError("The number of processes must be at least 1, not %s" % num_processes)
+        if num_processes > 1 and not ParallelUpdate.isParallelUpdateSupported():
+            raise ValueError("The parallel update requires a platform that supports forking processes")
+        self._parallel_update_processes = num_processes
+
+    @property
+    def generation(self) -> str:
+        """
+        Identifies this engine (and the nodes in it). It changes when nodes are added, so it's different for every
+        engine that is started, even with the same configuration.
+        """
+        return self._generation
 
     @property
     def paused(self):
-        return not self._tick_timer.is_running
+        return not self._tick_scheduler.is_running
 
     def registerNode(self, node: Node) -> None:
         """
@@ -113,7 +316,11 @@ class NodeEngine:
             self._nodes[node.getId()] = node
             self.preUpdateCalled.connect(node.acquireUpdateLock)
             self.postUpdateCalled.connect(node.releaseUpdateLock)
-            self._node_histories[node.getId()] = NodeHistory(node)
+            self._node_histories[node.getId()] = NodeHistory(node, self._history_depth)
+            node.connectionAdded.connect(self._onConnectionAdded)
+            self._components_outdated = True
+            self._snapshot_outdated = True
+            self._generation = uuid.uuid4().hex
             node.ensureSaneValues()
         else:
             raise KeyError("Node must have an unique ID!")
@@ -143,6 +350,29 @@ class NodeEngine:
         """
         return self._node_histories.get(node_id)
 
+    @property
+    def history_depth(self) -> int:
+        return self._history_depth
+
+    def setHistoryDepth(self, history_depth: int) -> None:
+        """
+        Change how many ticks of history are kept for each node. This is applied to the nodes that are already known as
+        well as the nodes that are registered later on. When the depth is decreased, the oldest data is dropped.
+        :param history_depth: The number of ticks to keep.
+        """
+        if history_depth < 1:
+            raise ValueError("The history depth must be at least 1, not %s" % history_depth)
+        self._history_depth = history_depth
+        for history in self._node_histories.values():
+            history.setMaxElementsToStore(history_depth)
+
+    def getHistoryMemoryUsage(self) -> Dict[str, int]:
+        """
+        Get how much memory the history of each node uses.
+        :return: Dict with the node id as key and the memory usage (in bytes) as value.
+        """
+        return {node_id: history.getMemoryUsage() for node_id, history in self._node_histories.items()}
+
     def deserialize(self, serialized: Dict[str, Any]) -> None:
         """
         Load a configuration file and create all the nodes & connections defined in it.
@@ -151,6 +381,136 @@ class NodeEngine:
         """
         self._registerNodesFromConfigurationData(serialized["nodes"])
         self._registerConnectionsFromConfigurationData(serialized["connections"])
+        self._updateConnectedComponents()
+        with self._update_lock:
+            self._publishSnapshot()
+
+    def _onConnectionAdded(self, node: Node, connection: Connection) -> None:
+        """
+        Called when a connection is added to one of the nodes. This can merge components, so they are determined again
+        (before they are used next). The connection also needs to be added to the snapshot.
+        :param node: The node that the connection originates from.
+        :param connection: The connection that was added.
+        """
+        self._components_outdated = True
+        self._snapshot_outdated = True
+
+    def getSnapshot(self) -> EngineSnapshot:
+        """
+        Get the state of all nodes as it was when the last tick was completed. This never waits for a tick in progress.
+        If nodes or connections were added since then, a new snapshot is published first (unless a tick is in progress).
+        :return: The last snapshot that was published.
+        """
+        if self._snapshot_outdated:
+            self.updateSnapshot()
+        return self._snapshot
+
+    def updateSnapshot(self, node_ids: Optional[List[str]] = None) -> bool:
+        """
+        Publish a new snapshot outside of a tick, for when nodes were changed from outside (eg; the target performance
+        was set), so that the change is visible before the next tick. If a tick is in progress, nothing is done, since
+        the snapshot that is published at the end of that tick will show the change anyway.
+        :param node_ids: The nodes that were changed. If None, the state of all nodes is taken.
+        :return: True if a new snapshot was published.
+        """
+        if not self._update_lock.acquire(blocking = False):
+            return False
+        try:
+            if node_ids is None or self._snapshot_outdated:
+                self._publishSnapshot()
+            else:
+                nodes = [self._nodes[node_id] for node_id in node_ids if node_id in self._nodes]
+                self._snapshot = self._snapshot.replaceNodeStates(nodes, self._snapshot.version + 1)
+        finally:
+            self._update_lock.release()
+        return True
+
+    def republishSnapshot(self) -> None:
+        """
+        Take a new snapshot of all the nodes, including the state that normally can't change during a run (eg; the
+        label), which is otherwise shared with the previous snapshot. This is needed when the state of the nodes was
+        replaced from outside (eg; when it was restored from storage).
+        """
+        with self._update_lock:
+            self._snapshot_outdated = True
+            self._publishSnapshot()
+
+    def _publishSnapshot(self) -> None:
+        """
+        Take a snapshot of the state of all nodes. This must be done while holding the update lock.
+        """
+        previous = None if self._snapshot_outdated else self._snapshot
+        self._snapshot_outdated = False
+        self._snapshot = EngineSnapshot.createFromNodes(self._nodes.values(), self._snapshot.version + 1,
+                                                        self._tick_count, previous)
+
+    def _updateConnectedComponents(self) -> None:
+        """
+        Determine which nodes are connected with each other.
+        """
+        self._components = ParallelUpdate.getConnectedComponents(self._nodes)
+        self._component_nodes = [[self._nodes[node_id] for node_id in component] for component in self._components]
+        self._component_indices = {node_id: index for index, component in enumerate(self._components)
+                                   for node_id in component}
+        self._component_states = [COMPONENT_ACTIVE] * len(self._components)
+        self._component_tick_costs = [0.] * len(self._components)
+        self._components_outdated = False
+
+    def _ensureComponentsAreUpToDate(self) -> None:
+        """
+        Determine the components again if the nodes or connections changed since they were last determined.
+        """
+        if self._components_outdated:
+            self._updateConnectedComponents()
+
+    def getConnectedComponents(self) -> List[List[str]]:
+        """
+        Get the groups of nodes that are connected with each other (ignoring the direction of the connections).
+        :return: List with the node ids of each component.
+        """
+        self._ensureComponentsAreUpToDate()
+        return [list(component) for component in self._components]
+
+    def getComponentDiagnostics(self) -> List[Dict[str, Any]]:
+        """
+        Get what was done for each connected component in the last tick.
+        :return: List with a dict per component, with the ids of the nodes, the state of the component (active,
+                 no_requests or disabled) and the time (in seconds) that was spent on the reservations, replanning and
+                 sub ticks of the component. Note that the time of the sub ticks can't be measured per component when the
+                 update is done in parallel.
+        """
+        self._ensureComponentsAreUpToDate()
+        return [{"nodes": list(component), "state": state, "duration": duration}
+                for component, state, duration in zip(self._components, self._component_states,
+                                                      self._component_tick_costs)]
+
+    def _updateComponentStates(self) -> None:
+        """
+        Determine which components need to be handled this tick. This needs to be done after the pre update, since
+        that's where the nodes request their resources.
+        """
+        self._ensureComponentsAreUpToDate()
+        for index, nodes in enumerate(self._component_nodes):
+            if not any(node.enabled for node in nodes):
+                state = COMPONENT_DISABLED
+            elif any(connection.reserved_requested_amount for node in nodes
+                     for connection in node.getAllIncomingConnections()):
+                state = COMPONENT_ACTIVE
+            else:
+                state = COMPONENT_WITHOUT_REQUESTS
+            self._component_states[index] = state
+            self._component_tick_costs[index] = 0.
+
+    def _getComponentsToHandle(self, requires_requests: bool) -> List[int]:
+        """
+        :param requires_requests: Should components of which none of the nodes requested resources be left out?
+        :return: The indices of the components that should be handled.
+        """
+        self._ensureComponentsAreUpToDate()
+        if not self._skip_idle_components:
+            return list(range(len(self._components)))
+        skipped_states = [COMPONENT_DISABLED, COMPONENT_WITHOUT_REQUESTS] if requires_requests else [COMPONENT_DISABLED]
+        return [index for index, state in enumerate(self._component_states) if state not in skipped_states]
 
     def _registerNodesFromConfigurationData(self, serialized: Dict[str, Any]) -> None:
         """
@@ -183,15 +543,21 @@ class NodeEngine:
         """
         return [node.getId() for node in self._nodes.values()]
 
-    def _preUpdate(self) -> None:
+    def _preUpdate(self, emit_signals: bool = True) -> None:
         """
         Handle the pre-update of the Node engine.
         This basically calls the pre-update for all nodes.
+        :param emit_signals: Should the preUpdateCalled signal be emitted?
         """
-        self.preUpdateCalled.emit()
-        for node in self._nodes.values():
-            if node.enabled:
-                node.preUpdate()
+        if emit_signals:
+            self.preUpdateCalled.emit()
+        if self._tick_profiler.profile_node_classes:
+            self._callOnEnabledNodesProfiled("preUpdate")
+        else:
+            for node in self._nodes.values():
+                if node.enabled:
+                    node.preUpdate()
+        self._updateComponentStates()
 
     def _updateReservations(self) -> None:
         """
@@ -201,7 +567,18 @@ class NodeEngine:
 
         Potential relaxation of these reservations will be done in _replanReservations.
         """
-        for node in self._nodes.values():
+        for index in self._getComponentsToHandle(requires_requests = True):
+            start_time = time.perf_counter()
+            self._updateNodeReservations(self._component_nodes[index])
+            self._component_tick_costs[index] += time.perf_counter() - start_time
+
+    @staticmethod
+    def _updateNodeReservations(nodes: List[Node]) -> None:
+        """
+        Update the reservations of the given (enabled) nodes.
+        :param nodes: The nodes to update the reservations of.
+        """
+        for node in nodes:
             if node.enabled:
                 node.updateReservations()
 
@@ -218,70 +595,369 @@ class NodeEngine:
         Neither of the lights will go on (as both of them only got 7!).
         The _replanReservation will attempt to relax the original reservation a bit. By asking 1 power more of batter_1
         and battery_3, the requests can be resolved.
+
+        Since the nodes of different components can't affect each other, every component is replanned on its own. The
+        number of iterations is that of the component that needed the most.
+        """
+        iterations = 0
+        nodes_touched = 0
+        for index in self._getComponentsToHandle(requires_requests = True):
+            start_time = time.perf_counter()
+            if self._replan_only_changed_nodes:
+                component_iterations, component_nodes_touched = \
+                    self._replanChangedReservations(self._component_nodes[index])
+            else:
+                component_iterations, component_nodes_touched = \
+                    self._replanAllReservations(self._component_nodes[index])
+            self._component_tick_costs[index] += time.perf_counter() - start_time
+            iterations = max(iterations, component_iterations)
+            nodes_touched += component_nodes_touched
+        self._replan_iterations_last_tick = iterations
+        self._replan_nodes_touched_last_tick = nodes_touched
+
+    def _replanAllReservations(self, nodes: List[Node]) -> Tuple[int, int]:
+        """
+        Replan the reservations by revisiting all the given nodes, until none of them needs replanning anymore.
+        :param nodes: The nodes to replan.
+        :return: The number of iterations that were needed and the number of times that a node was visited.
         """
         counter = 0
+        nodes_touched = 0
         while counter < 50:
             counter += 1
             if counter > 40:
-                print("Counter is extremely high", [node.getId() for node in self._nodes.values() if node.requiresReplanning()])
+                print("Counter is extremely high", [node.getId() for node in nodes if node.requiresReplanning()])
             run_again = False
-            for node in self._nodes.values():
+            num_enabled_nodes = 0
+            for node in nodes:
                 if not node.enabled:
                     continue
+                num_enabled_nodes += 1
                 if node.requiresReplanning():
                     run_again = True
                     node.replanReservations()
+            nodes_touched += num_enabled_nodes
             if not run_again:
                 break
-            self._updateReservations()
+            # Every enabled node updates its reservations again
+            nodes_touched += num_enabled_nodes
+            self._updateNodeReservations(nodes)
+        return counter, nodes_touched
+
+    @staticmethod
+    def _replanChangedReservations(nodes: List[Node]) -> Tuple[int, int]:
+        """
+        Worklist version of _replanAllReservations. Only the nodes of which the incoming connections could have changed
+        are checked again, and only the providers of nodes that replanned update their reservations again.
+        :param nodes: The nodes to replan.
+        :return: The number of iterations that were needed and the number of times that a node was visited.
+        """
+        # Dicts are used as ordered sets, so that the order in which nodes are handled stays deterministic.
+        nodes_to_check = dict.fromkeys(nodes)  # type: Dict[Node, None]
+        counter = 0
+        nodes_touched = 0
+        while counter < 50:
+            counter += 1
+            replanned_nodes = []  # type: List[Node]
+            for node in nodes_to_check:
+                if not node.enabled:
+                    continue
+                nodes_touched += 1
+                if node.requiresReplanning():
+                    node.replanReservations()
+                    replanned_nodes.append(node)
+
+            if counter > 40:
+                print("Counter is extremely high", [node.getId() for node in replanned_nodes])
+
+            if not replanned_nodes:
+                break
+
+            providers = {}  # type: Dict[Node, None]
+            for node in replanned_nodes:
+                for connection in node.getAllIncomingConnections():
+                    if connection.origin.enabled:
+                        providers[connection.origin] = None
+
+            # Nodes that replanned changed their own incoming connections, so they need to be checked again.
+            nodes_to_check = dict.fromkeys(replanned_nodes)
+            for provider in providers:
+                nodes_touched += 1
+                provider.updateReservations()
+                # Updating the reservations of the provider can change if the nodes it provides to need replanning.
+                for connection in provider.getAllOutgoingConnections():
+                    nodes_to_check[connection.target] = None
 
-    def _update(self) -> None:
+        return counter, nodes_touched
+
+    def _update(self, emit_signals: bool = True) -> None:
         """
         Handle the actual update.
+        :param emit_signals: Should the updateCalled signal be emitted?
         """
-        self.updateCalled.emit()
+        if emit_signals:
+            self.updateCalled.emit()
         sub_tick_modifier = 1 / self._sub_ticks
+        components_to_update = self._getComponentsToHandle(requires_requests = False)
+        groups = []  # type: List[List[str]]
+        if self._parallel_update_processes > 1 and not self._tick_profiler.profile_node_classes \
+                and ParallelUpdate.isForkSafe():
+            groups = ParallelUpdate.divideComponents([self._components[index] for index in components_to_update],
+                                                     self._parallel_update_processes)
+        self._num_quiescent_nodes_last_tick = 0
+        if len(groups) > 1:
+            orders = ParallelUpdate.createSubTickOrders(list(self._nodes.keys()), self._sub_ticks)
+            ParallelUpdate.updateInParallel(self._nodes, groups, orders, sub_tick_modifier)
+        else:
+            quiescent_nodes = set()  # type: Set[str]
+            if self._collapse_quiescent_nodes:
+                quiescent_nodes = {node.getId() for index in components_to_update
+                                   for node in self._component_nodes[index] if node.enabled and node.isQuiescent()}
+                self._num_quiescent_nodes_last_tick = len(quiescent_nodes)
+            self._updateSubTicks(sub_tick_modifier, components_to_update, quiescent_nodes)
+
+        # The nodes of skipped components aren't updated, but the cleanup still needs to be done. Since nothing changed
+        # in between the sub ticks, doing that once has the same result.
+        skipped_components = set(range(len(self._components))) - set(components_to_update)
+        for index in sorted(skipped_components):
+            for node in self._component_nodes[index]:
+                node.cleanupAfterUpdate()
+
+        self._expired_modifiers_last_tick = []
+        for node in self._nodes.values():
+            for modifier in node.updateModifiers():
+                self._expired_modifiers_last_tick.append((node.getId(), type(modifier).__name__))
+
+    def _updateSubTicks(self, sub_tick_modifier: float, components_to_update: List[int], quiescent_nodes: Set[str]) \
+            -> None:
+        """
+        Do the update of all the sub ticks in this process.
+        :param sub_tick_modifier: The part of a full tick that a single sub tick is.
+        :param components_to_update: The indices of the components of which the nodes should be updated.
+        :param quiescent_nodes: The ids of the nodes that should do the update of the complete tick in the first sub tick
+                                (and are not updated in the other sub ticks).
+        """
+        profile_node_classes = self._tick_profiler.profile_node_classes
+        full_tick_modifier = sub_tick_modifier * self._sub_ticks
         for i in range(0, self._sub_ticks):
+            sub_tick_start_time = time.perf_counter()
             keys = list(self._nodes.keys())
             # Yeah. Randomness. I know. But combined with the sub ticks, it's the only way to make sure that the order
             # in which the nodes are updated is no longer a factor. To at least make its reproducible, we use the tick
             # count as the seed for the randomness.
             random.shuffle(keys)
+            # The nodes of a component are updated in the same order as they have in the shuffled keys. Since the
+            # components don't affect each other, that gives the same result as going over all the keys at once.
+            component_keys = [[] for _ in self._components]  # type: List[List[str]]
             for node_id in keys:
-                node = self._nodes[node_id]
-                if node.enabled:
-                    node.update(sub_tick_modifier)
-                node.cleanupAfterUpdate()
+                component_keys[self._component_indices[node_id]].append(node_id)
+
+            for index in components_to_update:
+                component_start_time = time.perf_counter()
+                if profile_node_classes:
+                    keys_to_update = [node_id for node_id in component_keys[index] if node_id not in quiescent_nodes]
+                    self._callOnEnabledNodesProfiled("update", sub_tick_modifier, keys = keys_to_update)
+                    if i == 0:
+                        self._callOnEnabledNodesProfiled("update", full_tick_modifier,
+                                                         keys = [node_id for node_id in component_keys[index]
+                                                                 if node_id in quiescent_nodes])
+                    for node_id in component_keys[index]:
+                        self._nodes[node_id].cleanupAfterUpdate()
+                else:
+                    for node_id in component_keys[index]:
+                        node = self._nodes[node_id]
+                        if node.enabled:
+                            if node_id not in quiescent_nodes:
+                                node.update(sub_tick_modifier)
+                            elif i == 0:
+                                # Quiescent nodes do the update of the complete tick at once.
+                                node.update(full_tick_modifier)
+                        # The cleanup is still done every sub tick, as other nodes can still give resources (and
+                        # thus heat) to quiescent nodes.
+                        node.cleanupAfterUpdate()
+                self._component_tick_costs[index] += time.perf_counter() - component_start_time
+            self._tick_profiler.addSubTickTime(time.perf_counter() - sub_tick_start_time)
             #print("SUBTICK END")
-        for node in self._nodes.values():
-            node.updateModifiers()
 
-    def _postUpdate(self) -> None:
+    def _postUpdate(self, emit_signals: bool = True) -> None:
         """
         Handle everything that needs to be done after all the updating has been done.
         For more info what happens during the post update, check the Node documentation.
+        :param emit_signals: Should the postUpdateCalled signal be emitted?
         :return:
         """
-        self.postUpdateCalled.emit()
+        if emit_signals:
+            self.postUpdateCalled.emit()
+        if self._use_batched_thermal_update:
+            enabled_nodes = [node for node in self._nodes.values() if node.enabled]
+            for node in enabled_nodes:
+                node.preparePostUpdate()
+            self._batchedThermalUpdate(enabled_nodes)
+
+        if self._tick_profiler.profile_node_classes:
+            self._callOnEnabledNodesProfiled("postUpdate")
+            return
         for node in self._nodes.values():
             if node.enabled:
                 node.postUpdate()
 
-    def doTick(self) -> None:
+    def _callOnEnabledNodesProfiled(self, function_name: str, *args, keys: Optional[List[str]] = None) -> None:
+        """
+        Call a function on all enabled nodes and record how much time was spent on it per type of node.
+        :param function_name: Name of the function of the node to call.
+        :param keys: The ids of the nodes to call it on (in this order). If not set, it's called on all of them.
+        """
+        if keys is None:
+            keys = list(self._nodes.keys())
+        node_class_times = {}  # type: Dict[str, float]
+        for node_id in keys:
+            node = self._nodes[node_id]
+            if not node.enabled:
+                continue
+            start_time = time.perf_counter()
+            getattr(node, function_name)(*args)
+            duration = time.perf_counter() - start_time
+            node_class_name = type(node).__name__
+            node_class_times[node_class_name] = node_class_times.get(node_class_name, 0.) + duration
+        self._tick_profiler.addNodeClassTimes(node_class_times)
+
+    @staticmethod
+    def _batchedThermalUpdate(nodes: List[Node]) -> None:
+        """
+        Do the thermal update (radiation, convection, temperature and heat damage) of all the given nodes in one go.
+        This does the exact same calculations (in the same order) as Node.updateThermals, but on arrays.
+
+        Note that the clamping of the temperature in Node._emitHeat and Node._convectiveHeatTransfer is not done here;
+        The temperature is always recalculated from the stored heat afterwards, so that clamping doesn't have an effect
+        on the result.
+        :param nodes: The nodes to update.
+        """
+        batched_nodes = []
+        batched_properties = []
+        for node in nodes:
+            properties = node.getBatchedThermalProperties()
+            if properties is None:
+                node.updateThermals()
+                continue
+            batched_nodes.append(node)
+            batched_properties.append(properties)
+
+        if not batched_nodes:
+            return
+
+        (stored_heat, temperature, outside_temp, heat_emissivity, surface_area, heat_convection_coefficient,
+         seconds_per_tick, combined_specific_heat, temperature_divisor, temperature_factor, temperature_offset,
+         follows_stored_heat, max_stored_heat, max_safe_temperature, temperature_degradation_speed,
+         health) = numpy.array(batched_properties, dtype = numpy.float64).T
+        follows_stored_heat = follows_stored_heat > 0
+        # If the heat goes over the limit of the temperature model, the node has to be updated the normal way.
+        out_of_model_range = stored_heat >= max_stored_heat
+
+        # Radiation
+        temp_diff = numpy.power(outside_temp, 4) - numpy.power(temperature, 4)
+        heat_radiation = STEFAN_BOLTZMANN_CONSTANT * heat_emissivity * surface_area * temp_diff
+        stored_heat = stored_heat + heat_radiation * seconds_per_tick
+        out_of_model_range |= follows_stored_heat & (stored_heat >= max_stored_heat)
+        temperature = numpy.where(follows_stored_heat,
+                                  temperature_factor * (stored_heat / temperature_divisor) + temperature_offset,
+                                  temperature)
+
+        # Convection
+        heat_convection = heat_convection_coefficient * surface_area * (outside_temp - temperature)
+        stored_heat = stored_heat + heat_convection * seconds_per_tick
+        out_of_model_range |= stored_heat >= max_stored_heat
+
+        unmodified_temperature = stored_heat / combined_specific_heat
+        temperature = temperature_factor * (stored_heat / temperature_divisor) + temperature_offset
+
+        # Damage from heat
+        delta_temp = temperature - max_safe_temperature
+        damage = numpy.where(delta_temp > 0, temperature_degradation_speed * (delta_temp / max_safe_temperature), 0.)
+        health = numpy.where(delta_temp > 0, numpy.maximum(health - damage, 0.), health)
+
+        for node, node_stored_heat, node_temperature, node_health, fallback in zip(batched_nodes,
+                                                                                   stored_heat.tolist(),
+                                                                                   unmodified_temperature.tolist(),
+                                                                                   health.tolist(),
+                                                                                   out_of_model_range.tolist()):
+            if fallback:
+                node.updateThermals()
+            else:
+                node.setBatchedThermalResult(node_stored_heat, node_temperature, node_health)
+
+    def doTick(self, print_tick_info: bool = True, emit_signals: bool = True) -> None:
         """
         Handle a single tick.
+        :param print_tick_info: Should the start and end of the tick be printed?
+        :param emit_signals: Should the signals of the engine (preUpdateCalled, updateCalled, postUpdateCalled and
+                             tickCompleted) be emitted? Note that the signals of the nodes themselves are always emitted,
+                             as the node histories depend on them.
         """
-        print("TICK STARTED", self._tick_count + 1)
+        if print_tick_info:
+            print("TICK STARTED", self._tick_count + 1)
         with self._update_lock:
-            self._updateOutsideTemperature()
-            self._preUpdate()
-
-            self._updateReservations()
-            self._replanReservations()
-            self._update()
-            self._postUpdate()
+            tick_start_time = time.perf_counter()
+            self._tick_profiler.startTick(self._tick_count + 1)
+            self._doProfiledPhase("update_outside_temperature", self._updateOutsideTemperature)
+            self._doProfiledPhase("pre_update", self._preUpdate, emit_signals)
+
+            self._doProfiledPhase("update_reservations", self._updateReservations)
+            self._doProfiledPhase("replan_reservations", self._replanReservations)
+            if self._sub_tick_controller is not None:
+                self._sub_tick_controller.measureReservations(self._nodes.values())
+            self._doProfiledPhase("update", self._update, emit_signals)
+            self._doProfiledPhase("post_update", self._postUpdate, emit_signals)
             self._tick_count += 1
-            self.tickCompleted.emit()
+            if emit_signals:
+                self._doProfiledPhase("publish_snapshot", self._publishSnapshot)
+            self._tick_profiler.finishTick(time.perf_counter() - tick_start_time, self._replan_iterations_last_tick,
+                                           self._sub_ticks)
+            if self._sub_tick_controller is not None:
+                self._sub_tick_controller.measureStorages(self._nodes.values())
+                self._sub_ticks = self._sub_tick_controller.getSubTicksForNextTick()
+            if emit_signals:
+                self.tickCompleted.emit()
 
         self.resetSeed()
-        print("TICK ENDED!")
+        if print_tick_info:
+            print("TICK ENDED!")
+
+    def _doProfiledPhase(self, phase: str, function: Callable[..., None], *args) -> None:
+        """
+        Do a phase of the tick and record how long it took.
+        :param phase: Name of the phase (as it's stored in the profile)
+        :param function: The function that handles this phase.
+        """
+        start_time = time.perf_counter()
+        function(*args)
+        self._tick_profiler.addPhaseTime(phase, time.perf_counter() - start_time)
+
+    def getExpiredModifiersLastTick(self) -> List[Tuple[str, str]]:
+        """
+        Get the modifiers that expired (and were removed from their nodes) during the last tick.
+        :return: List of (node_id, modifier type) tuples.
+        """
+        return self._expired_modifiers_last_tick
+
+    def getTickProfiler(self) -> TickProfiler:
+        """
+        Get the profiler that keeps track of how much time the last ticks took.
+        :return: The tick profiler
+        """
+        return self._tick_profiler
+
+    def runTicks(self, number_of_ticks: int, print_tick_info: bool = False, emit_signals: bool = True) -> float:
+        """
+        Do a number of ticks right after each other, as fast as possible. This is useful to fast forward the simulation.
+        The engine is locked for the whole run, so nothing else can change it in between the ticks.
+        :param number_of_ticks: How many ticks should be done?
+        :param print_tick_info: Should the start and end of each tick be printed?
+        :param emit_signals: Should the signals of the engine be emitted for each tick? If these are not emitted,
+                             anything that listens to the tickCompleted (such as the NodeStorage) is not triggered.
+        :return: How many seconds it took to do all the ticks.
+        """
+        start_time = time.perf_counter()
+        with self._update_lock:
+            for _ in range(0, number_of_ticks):
+                self.doTick(print_tick_info = print_tick_info, emit_signals = emit_signals)
+        return time.perf_counter() - start_time
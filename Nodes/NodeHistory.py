@@ -1,10 +1,16 @@
 from threading import Lock
-from typing import Dict, List, Deque, Any
-from collections import deque
+from typing import Dict, List, Any, Optional
 
+from Nodes.HistoryRollup import HistoryRollup
 from Nodes.Node import Node
+from Nodes.RingBuffer import RingBuffer
 from Nodes.Util import enforcePositive
 
+DEFAULT_MAX_ELEMENTS_TO_STORE = 50
+
+HISTORY_RESOLUTIONS = [1, 10, 100]
+"""The resolutions (in ticks per point) that the history can be requested in. 1 is the normal (per tick) history."""
+
 
 class NodeHistory:
     """
@@ -12,41 +18,135 @@ class NodeHistory:
     But we do want some history to be stored, so that's where this comes in to play.
     The get functions of the node history are also thread safe, so they can be called from other threads / processes
     """
-    def __init__(self, node: Node) -> None:
+    def __init__(self, node: Node, max_elements_to_store: int = DEFAULT_MAX_ELEMENTS_TO_STORE) -> None:
         """
         Nodes themselves have no info about their history, they only have a state.
         But we do want some history to be stored, so that's where this comes in to play.
         The get functions of the node history are also thread safe, so they can be called from other threads / processes
         :param node: The node that this history objects is tracking.
+        :param max_elements_to_store: How many ticks of history should be kept?
         """
         self._node = node
         self._node.postUpdateCalled.connect(self._onPostUpdateUpdate)
 
-        self._max_elements_to_store = 50
+        self._max_elements_to_store = max_elements_to_store
 
-        self._resources_produced_history = {}  # type: Dict[str, Deque[float]]
-        self._resources_gained_history = {}  # type: Dict[str, Deque[float]]
-        self._resources_provided_history = {}  # type: Dict[str, Deque[float]]
+        self._resources_produced_history = {}  # type: Dict[str, RingBuffer]
+        self._resources_gained_history = {}  # type: Dict[str, RingBuffer]
+        self._resources_provided_history = {}  # type: Dict[str, RingBuffer]
         self._num_ticks_stored = 0
-        self._temperature_history = self._createDeque()  # type: Deque[float]
+        self._temperature_history = self._createBuffer()
 
         for resource_type in self._node.getResourcesRequiredPerTick():
-            self._resources_gained_history[resource_type] = self._createDeque()
+            self._resources_gained_history[resource_type] = self._createBuffer()
 
         self._data_lock = Lock()
 
-        self._additional_properties_history = {}  # type: Dict[str, Deque[float]]
+        self._additional_properties_history = {}  # type: Dict[str, RingBuffer]
+
+        # Downsampled versions of the history, per category (eg; "temperature"), key and resolution.
+        self._rollups = {}  # type: Dict[str, Dict[str, Dict[int, HistoryRollup]]]
+
+    def _createBuffer(self, data: Optional[List[float]] = None) -> RingBuffer:
+        """
+        Convenience function to convert lists into ring buffers.
+        We use ring buffers since those automatically handle the size with a FIFO strategy (without any allocations)
+        :param data: The data to put in the buffer
+        :return: The buffer with the provided data (or an empty one if data was None)
+        """
+        return RingBuffer(self._max_elements_to_store, data)
+
+    def _getAllBuffers(self) -> List[RingBuffer]:
+        """
+        :return: All the buffers that are used to store the history.
+        """
+        buffers = [self._temperature_history]
+        for buffer_dict in [self._resources_produced_history, self._resources_gained_history,
+                            self._resources_provided_history, self._additional_properties_history]:
+            buffers.extend(buffer_dict.values())
+        return buffers
+
+    def _getBufferDictsByCategory(self) -> Dict[str, Dict[str, RingBuffer]]:
+        """
+        :return: The buffers that are used to store the history, per category and key.
+        """
+        return {"temperature": {"temperature": self._temperature_history},
+                "resources_produced": self._resources_produced_history,
+                "resources_gained": self._resources_gained_history,
+                "resources_provided": self._resources_provided_history,
+                "additional_properties": self._additional_properties_history}
+
+    def _getAllRollups(self) -> List[HistoryRollup]:
+        """
+        :return: All the downsampled versions of the history.
+        """
+        return [rollup for rollups_by_key in self._rollups.values() for rollups in rollups_by_key.values()
+                for rollup in rollups.values()]
+
+    def _addSample(self, buffer: RingBuffer, category: str, key: str, value: float) -> None:
+        """
+        Add a sample to the history and all its downsampled versions.
+        :param buffer: The buffer that holds the history of the value.
+        :param category: The category of the value (eg; "resources_produced")
+        :param key: The key of the value in the category (eg; "energy")
+        :param value: The new value.
+        """
+        buffer.append(value)
+        rollups_by_key = self._rollups.setdefault(category, {})
+        if key not in rollups_by_key:
+            # The sample of this tick is the first one for the key.
+            rollups_by_key[key] = self._createRollups(self._num_ticks_stored - 1)
+        for rollup in rollups_by_key[key].values():
+            rollup.add(value)
+
+    def _createRollups(self, start_tick: int) -> Dict[int, HistoryRollup]:
+        """
+        Create the downsampled versions of the history of a single value.
+        :param start_tick: The tick of the first sample of the value.
+        :return: Dict with the rollup per resolution.
+        """
+        return {resolution: HistoryRollup(resolution, self._max_elements_to_store, start_tick)
+                for resolution in HISTORY_RESOLUTIONS if resolution != 1}
 
-    def _createDeque(self, data: List[float] = None) -> Deque[float]:
+    def _rebuildRollups(self) -> None:
         """
-        Convenience function to convert lists into deque's.
-        We use deques since those automatically handle the size with a FIFO strategy
-        :param data: The data to put in the deque
-        :return: The deque with the provided data (or an empty one if data was None)
+        Create the downsampled versions of the history again from the (per tick) history. The last tick of all the
+        buffers is assumed to be the last tick that was stored.
         """
-        if data is None:
-            data = []
-        return deque(data, self._max_elements_to_store)
+        self._rollups = {}
+        for category, buffer_dict in self._getBufferDictsByCategory().items():
+            for key, buffer in buffer_dict.items():
+                rollups = self._createRollups(int(enforcePositive(self._num_ticks_stored - len(buffer))))
+                for value in buffer.getLast(self._num_ticks_stored):
+                    for rollup in rollups.values():
+                        rollup.add(value)
+                self._rollups.setdefault(category, {})[key] = rollups
+
+    @staticmethod
+    def _checkResolution(resolution: int) -> None:
+        """
+        Check if the history can be provided with the given resolution
+        :param resolution: Number of ticks per point.
+        """
+        if resolution not in HISTORY_RESOLUTIONS:
+            raise ValueError("Resolution %s is not supported, it must be one of %s" % (resolution, HISTORY_RESOLUTIONS))
+
+    def _getSeries(self, buffer_dict: Dict[str, RingBuffer], category: str, num_samples: Optional[int],
+                   resolution: int) -> Dict[str, List[float]]:
+        """
+        Get the history of all the values in a category.
+        :param buffer_dict: The buffers that hold the (per tick) history of the category.
+        :param category: The name of the category.
+        :param num_samples: How many of the newest points to get. None to get all of them.
+        :param resolution: Number of ticks per point. If it's more than 1, the mean of those ticks is given.
+        :return: Dict with the key of the value and the list of historic values (oldest first).
+        """
+        self._checkResolution(resolution)
+        if resolution == 1:
+            return self._convertBufferDictToListDict(buffer_dict, num_samples)
+        rollups_by_key = self._rollups.get(category, {})
+        return {key: rollups_by_key[key][resolution].getMeans(num_samples) if key in rollups_by_key else []
+                for key in buffer_dict}
 
     def getNode(self) -> Node:
         """
@@ -55,86 +155,165 @@ class NodeHistory:
         """
         return self._node
 
+    @property
+    def max_elements_to_store(self) -> int:
+        return self._max_elements_to_store
+
+    def setMaxElementsToStore(self, max_elements_to_store: int) -> None:
+        """
+        Change how many ticks of history are kept. If it's decreased, the oldest data is dropped.
+        :param max_elements_to_store: How many ticks of history should be kept?
+        """
+        with self._data_lock:
+            self._max_elements_to_store = max_elements_to_store
+            for buffer in self._getAllBuffers():
+                buffer.resize(max_elements_to_store)
+            for rollup in self._getAllRollups():
+                rollup.resize(max_elements_to_store)
+
+    def getMemoryUsage(self) -> int:
+        """
+        How much memory does the stored history use? This only counts the stored values, not the overhead of the
+        objects that hold them.
+        :return: Memory usage in bytes.
+        """
+        with self._data_lock:
+            return sum(buffer.getMemoryUsage() for buffer in self._getAllBuffers()) + \
+                   sum(rollup.getMemoryUsage() for rollup in self._getAllRollups())
+
     def serialize(self) -> Dict[str, Any]:
         """
         Serialize this nodeHistory so that it can be stored somewhere (eg; save to file)
         :return: A dict with keys for the attribute.
         """
-        result = {}  # type: Dict[str, Any]
-        result["resources_produced_history"] = self._convertDequeDictToListDict(self._resources_produced_history)
-        result["resources_gained_history"] = self._convertDequeDictToListDict(self._resources_gained_history)
-        result["resources_provided_history"] = self._convertDequeDictToListDict(self._resources_provided_history)
-        result["temperature_history"] = list(self._temperature_history)
-        return result
+        with self._data_lock:
+            result = {}  # type: Dict[str, Any]
+            result["resources_produced_history"] = self._convertBufferDictToListDict(self._resources_produced_history)
+            result["resources_gained_history"] = self._convertBufferDictToListDict(self._resources_gained_history)
+            result["resources_provided_history"] = self._convertBufferDictToListDict(self._resources_provided_history)
+            result["temperature_history"] = self._temperature_history.getLast()
+            return result
 
     def deserialize(self, data: Dict[str, Any]) -> None:
         """
         Restore the data of a node from serialized information. (eg: load from file)
         :param data:
         """
-        self._resources_produced_history = {}
-        for produced_resource_key, values in data["resources_produced_history"].items():
-            self._resources_produced_history[produced_resource_key] = self._createDeque(values)
+        with self._data_lock:
+            self._resources_produced_history = {}
+            for produced_resource_key, values in data["resources_produced_history"].items():
+                self._resources_produced_history[produced_resource_key] = self._createBuffer(values)
 
-        for gained_resource_key, values in data["resources_gained_history"].items():
-            self._resources_gained_history[gained_resource_key] = self._createDeque(values)
+            for gained_resource_key, values in data["resources_gained_history"].items():
+                self._resources_gained_history[gained_resource_key] = self._createBuffer(values)
 
-        for gained_resource_key, values in data["resources_provided_history"].items():
-            self._resources_provided_history[gained_resource_key] = self._createDeque(values)
+            for gained_resource_key, values in data["resources_provided_history"].items():
+                self._resources_provided_history[gained_resource_key] = self._createBuffer(values)
 
-        self._temperature_history = self._createDeque(data["temperature_history"])
+            self._temperature_history = self._createBuffer(data["temperature_history"])
+            # Only the stored ticks are known, so count from the first of those. The downsampled history isn't stored,
+            # so it's made again from what is known.
+            self._num_ticks_stored = len(self._temperature_history)
+            self._rebuildRollups()
 
-    def getTickOffset(self) -> int:
+    def getTickOffset(self, resolution: int = 1) -> int:
         """
         Since not all data is stored, it could be that there is an offset.
-        :return:
+        :param resolution: Number of ticks per point of the history that the offset is requested for.
+        :return: The number of ticks before the first stored point.
         """
-        return int(enforcePositive(self._num_ticks_stored - self._max_elements_to_store))
+        self._checkResolution(resolution)
+        num_points = self._num_ticks_stored // resolution
+        return int(enforcePositive(num_points - self._max_elements_to_store)) * resolution
 
     @staticmethod
-    def _convertDequeDictToListDict(deque_dict: Dict[str, Deque[float]]) -> Dict[str, List[float]]:
-        return {key: list(value) for key, value in deque_dict.items()}
+    def _convertBufferDictToListDict(buffer_dict: Dict[str, RingBuffer], num_samples: Optional[int] = None) \
+            -> Dict[str, List[float]]:
+        """
+        Convert a dict of buffers into a dict of lists.
+        :param buffer_dict: The buffers to convert.
+        :param num_samples: How many of the newest samples to get. None to get all of them.
+        :return: Dict with the same keys and a list of the samples (oldest first) as value.
+        """
+        return {key: value.getLast(num_samples) for key, value in buffer_dict.items()}
 
-    def getAdditionalPropertiesHistory(self) -> Dict[str, List[float]]:
+    def getAdditionalPropertiesHistory(self, num_samples: Optional[int] = None, resolution: int = 1) -> Dict[str, List[float]]:
         """
         Get the stored history of the additional properties of the node.
 
         .. seealso:: :attr:`Nodes.Node.Node.additional_properties` for more info about these
+        :param num_samples: How many of the newest samples to get. None to get all of them.
+        :param resolution: Number of ticks per sample. If it's more than 1, the mean of those ticks is given.
         :return: Dict where the keys are the aditional_property name and the value is a list of historic values
         """
         with self._data_lock:
-            return self._convertDequeDictToListDict(self._additional_properties_history)
+            return self._getSeries(self._additional_properties_history, "additional_properties", num_samples, resolution)
 
-    def getResourcesProducedHistory(self) -> Dict[str, List[float]]:
+    def getResourcesProducedHistory(self, num_samples: Optional[int] = None, resolution: int = 1) -> Dict[str, List[float]]:
         """
         .. seealso:: :func:`Nodes.Node.Node.getResourcesProducedThisTick`
+        :param num_samples: How many of the newest samples to get. None to get all of them.
+        :param resolution: Number of ticks per sample. If it's more than 1, the mean of those ticks is given.
         :return: Dict where the keys are the type of resource and the value is a list of historic values
         """
         with self._data_lock:
-            return self._convertDequeDictToListDict(self._resources_produced_history)
+            return self._getSeries(self._resources_produced_history, "resources_produced", num_samples, resolution)
 
-    def getResourcesGainedHistory(self) -> Dict[str, List[float]]:
+    def getResourcesGainedHistory(self, num_samples: Optional[int] = None, resolution: int = 1) -> Dict[str, List[float]]:
         """
         .. seealso:: :func:`Nodes.Node.Node.getResourcesGainedThisTick`
+        :param num_samples: How many of the newest samples to get. None to get all of them.
+        :param resolution: Number of ticks per sample. If it's more than 1, the mean of those ticks is given.
         :return: Dict where the keys are the type of resource and the value is a list of historic values
         """
         with self._data_lock:
-            return self._convertDequeDictToListDict(self._resources_gained_history)
+            return self._getSeries(self._resources_gained_history, "resources_gained", num_samples, resolution)
 
-    def getResourcesProvidedHistory(self) -> Dict[str, List[float]]:
+    def getResourcesProvidedHistory(self, num_samples: Optional[int] = None, resolution: int = 1) -> Dict[str, List[float]]:
         """
         .. seealso:: :func:`Nodes.Node.Node.getResourcesProvidedThisTick`
+        :param num_samples: How many of the newest samples to get. None to get all of them.
+        :param resolution: Number of ticks per sample. If it's more than 1, the mean of those ticks is given.
         :return: Dict where the keys are the type of resource and the value is a list of historic values
         """
         with self._data_lock:
-            return self._convertDequeDictToListDict(self._resources_provided_history)
+            return self._getSeries(self._resources_provided_history, "resources_provided", num_samples, resolution)
 
-    def getTemperatureHistory(self) -> List[float]:
+    def getTemperatureHistory(self, num_samples: Optional[int] = None, resolution: int = 1) -> List[float]:
         """
+        :param num_samples: How many of the newest samples to get. None to get all of them.
+        :param resolution: Number of ticks per sample. If it's more than 1, the mean of those ticks is given.
         :return: List of the historic values of the temperatures of the Node (in Kelvin)
         """
         with self._data_lock:
-            return list(self._temperature_history)
+            return self._getSeries({"temperature": self._temperature_history}, "temperature", num_samples,
+                                   resolution)["temperature"]
+
+    def getHistoryStatistics(self, resolution: int, num_samples: Optional[int] = None) \
+            -> Dict[str, Dict[str, Dict[str, List[float]]]]:
+        """
+        Get the minimum, mean and maximum of all the history of the node, so that it's possible to show a long period
+        with a limited number of points without losing the peaks.
+        :param resolution: Number of ticks per point. With a resolution of 1 the min, mean and max are all the same.
+        :param num_samples: How many of the newest points to get. None to get all of them.
+        :return: Dict with the category (temperature, resources_produced, resources_gained, resources_provided and
+                 additional_properties), which holds a dict with the key (eg; the type of resource) and a dict with the
+                 list of "min", "mean" and "max" values (oldest first).
+        """
+        self._checkResolution(resolution)
+        result = {}  # type: Dict[str, Dict[str, Dict[str, List[float]]]]
+        with self._data_lock:
+            for category, buffer_dict in self._getBufferDictsByCategory().items():
+                result[category] = {}
+                for key, buffer in buffer_dict.items():
+                    if resolution == 1:
+                        values = buffer.getLast(num_samples)
+                        result[category][key] = {"min": values, "mean": list(values), "max": list(values)}
+                    elif key in self._rollups.get(category, {}):
+                        result[category][key] = self._rollups[category][key][resolution].getStatistics(num_samples)
+                    else:
+                        result[category][key] = {"min": [], "mean": [], "max": []}
+        return result
 
     def _onPostUpdateUpdate(self, _: Node) -> None:
         """
@@ -144,31 +323,35 @@ class NodeHistory:
         """
         with self._data_lock:
             self._num_ticks_stored += 1
-            self._temperature_history.append(self._node.temperature)
+            self._addSample(self._temperature_history, "temperature", "temperature", self._node.temperature)
             resources_received = self._node.getResourcesReceivedThisTick()
             resources_produced = self._node.getResourcesProducedThisTick()
             resources_provided = self._node.getResourcesProvidedThisTick()
 
             for resource_type in self._node.getResourcesRequiredPerTick():
                 if resource_type not in resources_received:
-                    self._resources_gained_history[resource_type].append(0)
+                    self._addSample(self._resources_gained_history[resource_type], "resources_gained", resource_type, 0)
 
             for resource_type in resources_received:
                 if resource_type not in self._resources_gained_history:
-                    self._resources_gained_history[resource_type] = self._createDeque()
-                self._resources_gained_history[resource_type].append(resources_received[resource_type])
+                    self._resources_gained_history[resource_type] = self._createBuffer()
+                self._addSample(self._resources_gained_history[resource_type], "resources_gained", resource_type,
+                                resources_received[resource_type])
 
             for resource_type in resources_produced:
                 if resource_type not in self._resources_produced_history:
-                    self._resources_produced_history[resource_type] = self._createDeque()
-                self._resources_produced_history[resource_type].append(resources_produced[resource_type])
+                    self._resources_produced_history[resource_type] = self._createBuffer()
+                self._addSample(self._resources_produced_history[resource_type], "resources_produced", resource_type,
+                                resources_produced[resource_type])
 
             for resource_type in resources_provided:
                 if resource_type not in self._resources_provided_history:
-                    self._resources_provided_history[resource_type] = self._createDeque()
-                self._resources_provided_history[resource_type].append(resources_provided[resource_type])
+                    self._resources_provided_history[resource_type] = self._createBuffer()
+                self._addSample(self._resources_provided_history[resource_type], "resources_provided", resource_type,
+                                resources_provided[resource_type])
 
             for prop in self._node.additional_properties:
                 if prop not in self._additional_properties_history:
-                    self._additional_properties_history[prop] = self._createDeque()
-                self._additional_properties_history[prop].append(getattr(self._node, prop))
+                    self._additional_properties_history[prop] = self._createBuffer()
+                self._addSample(self._additional_properties_history[prop], "additional_properties", prop,
+                                getattr(self._node, prop))
@@ -1,20 +1,39 @@
-from typing import TYPE_CHECKING, List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 from atomicwrites import atomic_write
 
 import json
 import glob
 import os
+
+from Nodes import BinaryCheckpoint
+from Nodes.CheckpointWriter import CheckpointWriter
+
 if TYPE_CHECKING:
     from Nodes.NodeEngine import NodeEngine
 
 
 class NodeStorage:
-    def __init__(self, engine: "NodeEngine") -> None:
+    def __init__(self, engine: "NodeEngine", store_on_tick: bool = True, write_asynchronously: bool = False,
+                 max_queued_snapshots: int = 2) -> None:
+        """
+        Create a storage that can store (and restore) the state of all the nodes in an engine.
+        :param engine: The engine to store the nodes of.
+        :param store_on_tick: Should the state be stored automatically every time a tick is completed?
+        :param write_asynchronously: Should the state be written to disk on a separate thread? Storing the state then
+                                     only takes a snapshot in memory, so that the tick isn't held up by the disk.
+        :param max_queued_snapshots: How many snapshots can wait to be written (when writing asynchronously) before
+                                     the oldest ones are skipped.
+        """
         self._engine = engine
-        self._engine.tickCompleted.connect(self.storeNodeState)
+        if store_on_tick:
+            self._engine.tickCompleted.connect(self.storeNodeState)
         self.storage_name = "node_state.json"
         self._num_versions_to_save = 3
 
+        self._writer = None  # type: Optional[CheckpointWriter]
+        if write_asynchronously:
+            self._writer = CheckpointWriter(self._writeSnapshot, max_queue_size = max_queued_snapshots)
+
     @property
     def base_storage_path(self):
         if self.storage_name.endswith(".json"):
@@ -68,15 +87,80 @@ class NodeStorage:
         """
         return "%s.~%s~" % (self.base_storage_path, revision)
 
+    @classmethod
+    def _copyData(cls, data: Any) -> Any:
+        """
+        Copy (nested) dicts & lists, so that later changes to the original don't end up in the copy.
+        :param data: The data to copy.
+        :return: The copied data.
+        """
+        if isinstance(data, dict):
+            return {key: cls._copyData(value) for key, value in data.items()}
+        if isinstance(data, list):
+            return [cls._copyData(value) for value in data]
+        return data
+
+    def _createSnapshot(self) -> Dict[str, Any]:
+        """
+        Create a snapshot of the current state that can be written later on (possibly by another thread).
+        :return: Dict with the nodes, the histories and the current tick.
+        """
+        # The serialized nodes still refer to (some of) the dicts of the node, so those need to be copied.
+        return {"nodes": self._copyData(self.serializeAllNodes()),
+                "histories": self.serializeAllNodeHistories(),
+                "current_tick": self._engine._tick_count}
+
     def storeNodeState(self) -> None:
-        node_data = self.serializeAllNodes()
+        """
+        Store the current state of all the nodes. If the storage writes asynchronously, this only takes a snapshot and
+        the actual writing is done later.
+        """
+        snapshot = self._createSnapshot()
+        if self._writer is not None:
+            self._writer.submit(snapshot)
+        else:
+            self._writeSnapshot(snapshot)
 
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all the stored states are actually written to disk.
+        :param timeout: Maximum time to wait (in seconds). None waits for as long as it takes.
+        :return: True if everything was written, False if the timeout expired first.
+        """
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write everything that is still waiting to be written and stop the writer thread. Should be called before the
+        application exits, since the writer thread won't keep it alive.
+        :param timeout: Maximum time to wait (in seconds). None waits for as long as it takes.
+        :return: True if everything was written, False if the timeout expired first.
+        """
+        if self._writer is None:
+            return True
+        return self._writer.stop(timeout)
+
+    def getWriterMetrics(self) -> Dict[str, Any]:
+        """
+        Get information about the asynchronous writes.
+
+        .. seealso:: :func:`Nodes.CheckpointWriter.CheckpointWriter.getMetrics`
+        :return: The metrics of the writer, or an empty dict if the storage writes synchronously.
+        """
+        if self._writer is None:
+            return {}
+        return self._writer.getMetrics()
+
+    def _writeSnapshot(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Write a snapshot (as created by _createSnapshot) to disk.
+        :param snapshot: The snapshot to write.
+        """
         name = self._getVersionedName(self._getCurrentRevision() + 1)
 
-        data_to_write = {"nodes": node_data}  # type: Dict[str, Any]
-        data_to_write["histories"] = self.serializeAllNodeHistories()
-        data_to_write["current_tick"] = self._engine._tick_count
-        data_to_store = json.dumps(data_to_write, separators=(", ", ": "), indent=4)
+        data_to_store = json.dumps(snapshot, separators=(", ", ": "), indent=4)
         with atomic_write(name) as file:
             file.write(data_to_store)
 
@@ -111,10 +195,18 @@ class NodeStorage:
                 os.remove(pathname)
 
     def restoreNodeState(self) -> None:
-        with open(self.base_storage_path) as file:
+        """
+        Restore the state of the nodes from the stored file. Both the JSON and the binary checkpoint format can be read.
+        """
+        # Don't read a file that is still being written.
+        self.flush()
+        with open(self.base_storage_path, "rb") as file:
             data = file.read()
 
-        parsed_json = json.loads(data)
+        if BinaryCheckpoint.isBinaryCheckpoint(data):
+            parsed_json = BinaryCheckpoint.readCheckpoint(data)
+        else:
+            parsed_json = json.loads(data.decode("utf-8"))
         self._engine._tick_count = parsed_json["current_tick"]
         for entry in parsed_json["nodes"]:
             # TODO: This has no fault handling what so ever, which should be added at some point.
@@ -131,3 +223,5 @@ class NodeStorage:
                     print("Could not find node_history for %s", entry["node_id"])
             else:
                 print("Could not find history_data for %s", entry["node_id"])
+        # The restored nodes (and tick) aren't in the snapshot yet.
+        self._engine.republishSnapshot()
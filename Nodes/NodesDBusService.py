@@ -1,7 +1,7 @@
 
 import dbus
 import dbus.service
-from typing import List, Dict, Optional, Union
+from typing import Any, List, Dict, Mapping, Optional, Union
 
 from Nodes.Modifiers.ModifierFactory import ModifierFactory
 from Nodes.NodeEngine import NodeEngine
@@ -38,6 +38,24 @@ class NodesDBusService(dbus.service.Object):
             object_path=self._object_path
         )
 
+        self._node_engine.tickCompleted.connect(self._onTickCompleted)
+
+    def _onTickCompleted(self) -> None:
+        expired_modifiers = [dbus.Dictionary({"node_id": node_id, "type": modifier_type}, signature = "ss")
+                             for node_id, modifier_type in self._node_engine.getExpiredModifiersLastTick()]
+        # The tick of the snapshot (and not the tick count of the engine), since that's what the getters return.
+        tick_count = self._node_engine.getSnapshot().tick_count
+        self.tickCompleted(tick_count, dbus.Array(expired_modifiers, signature = "a{ss}"))
+
+    @dbus.service.signal("com.frivengi.nodes", signature="xaa{ss}")
+    def tickCompleted(self, tick_number: int, expired_modifiers: List[Dict[str, str]]) -> None:
+        """
+        Signal that is emitted every time that the engine has completed a tick.
+        :param tick_number: The number of the tick that was completed
+        :param expired_modifiers: The modifiers that expired during this tick (dicts with the node_id and type)
+        """
+        pass
+
     @dbus.service.method("com.frivengi.nodes", out_signature="b")
     def isPaused(self):
         return self._node_engine.paused
@@ -54,6 +72,18 @@ class NodesDBusService(dbus.service.Object):
     def setTickInterval(self, tick_interval: float) -> None:
         self._node_engine.setTickInterval(tick_interval)
 
+    @dbus.service.method("com.frivengi.nodes", in_signature="s")
+    def setTickCatchUpPolicy(self, catch_up_policy: str) -> None:
+        self._node_engine.setTickCatchUpPolicy(catch_up_policy)
+
+    @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}")
+    def getTickSchedulerStatistics(self) -> Dict[str, Any]:
+        """
+        Get how well the automatic run keeps up with the tick interval (see TickScheduler.getStatistics).
+        :return: Dict with the number of ticks, overruns, skipped & failed ticks and their durations & lateness.
+        """
+        return dbus.Dictionary(self._node_engine.getTickScheduler().getStatistics(), signature = "sv")
+
     @dbus.service.method("com.frivengi.nodes", in_signature="ss", out_signature="b")
     def addModifierToNode(self, node_id: str, modifier_type: str) -> bool:
         node = self._node_engine.getNodeById(node_id)
@@ -61,6 +91,7 @@ class NodesDBusService(dbus.service.Object):
 
         if node and modifier:
             node.addModifier(modifier)
+            self._node_engine.updateSnapshot([node_id])
             return True
         return False
 
@@ -69,12 +100,14 @@ class NodesDBusService(dbus.service.Object):
         node = self._node_engine.getNodeById(node_id)
         if node:
             node.repair(amount)
+            self._node_engine.updateSnapshot([node_id])
 
     @dbus.service.method("com.frivengi.nodes", in_signature="sd")
     def damage(self, node_id: str, amount: float) -> None:
         node = self._node_engine.getNodeById(node_id)
         if node:
             node.damage(amount)
+            self._node_engine.updateSnapshot([node_id])
 
     @dbus.service.method("com.frivengi.nodes", out_signature="aa{sv}", in_signature="s")
     def getActiveModifiers(self, node_id: str) -> List[Dict[str, Union[str, int]]]:
@@ -84,59 +117,59 @@ class NodesDBusService(dbus.service.Object):
         :param node_id: ID of the node to get.
         :return: List of dicts that contain the name and duration of the found modifiers.
         """
-        node = self._node_engine.getNodeById(node_id)
-        if not node:
+        state = self._getNodeState(node_id)
+        if not state:
             return []
 
-        return [{"name": modifier.name, "duration": modifier.duration, "abbreviation": modifier.abbreviation, "type": type(modifier).__name__} for modifier in node.getModifiers()]
+        return [dict(modifier) for modifier in state["modifiers"]]
 
     @dbus.service.method("com.frivengi.nodes", out_signature="d", in_signature="s")
     def getTemperature(self, node_id: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.temperature
+        state = self._getNodeState(node_id)
+        if state:
+            return state["temperature"]
         return -9000.
 
     @dbus.service.method("com.frivengi.nodes", out_signature="s", in_signature="s")
     def getDescription(self, node_id: str) -> str:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.description
+        state = self._getNodeState(node_id)
+        if state:
+            return state["description"]
         return ""
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s")
     def getCustomDescription(self, node_id: str) -> str:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.custom_description
+        state = self._getNodeState(node_id)
+        if state:
+            return state["custom_description"]
         return ""
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getHeatEmissivity(self, node_id) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.heat_emissivity
+        state = self._getNodeState(node_id)
+        if state:
+            return state["heat_emissivity"]
         return 0.
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getSurfaceArea(self, node_id: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.surface_area
+        state = self._getNodeState(node_id)
+        if state:
+            return state["surface_area"]
         return 0.
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getHeatConvectionCoefficient(self, node_id: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.heat_convection_coefficient
+        state = self._getNodeState(node_id)
+        if state:
+            return state["heat_convection_coefficient"]
         return 0.
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getMaxSafeTemperature(self, node_id: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.max_safe_temperature
+        state = self._getNodeState(node_id)
+        if state:
+            return state["max_safe_temperature"]
         return 0.
 
     @dbus.service.method("com.frivengi.nodes", in_signature="sd")
@@ -144,117 +177,297 @@ class NodesDBusService(dbus.service.Object):
         node = self._node_engine.getNodeById(node_id)
         if node:
             node.target_performance = performance
+            self._node_engine.updateSnapshot([node_id])
+
+    @dbus.service.method("com.frivengi.nodes", in_signature="a{sd}", out_signature="s")
+    def setTargetPerformances(self, performances: Dict[str, float]) -> str:
+        """
+        Set the target performance of multiple nodes in one go. Nodes that don't exist are ignored.
+        :param performances: The new target performance per node id.
+        :return: The generation of the engine (see getEngineGeneration), so the caller can check if the nodes that it
+                 knows about are still up to date.
+        """
+        changed_node_ids = []
+        for node_id, performance in performances.items():
+            node = self._node_engine.getNodeById(str(node_id))
+            if node:
+                node.target_performance = float(performance)
+                changed_node_ids.append(str(node_id))
+        if changed_node_ids:
+            self._node_engine.updateSnapshot(changed_node_ids)
+        return self._node_engine.generation
+
+    @dbus.service.method("com.frivengi.nodes", out_signature="s")
+    def getEngineGeneration(self) -> str:
+        """
+        Get the generation of the engine. This changes when the engine is restarted or nodes are added, so anything
+        that is known about the nodes (eg; which ones exist) should be requested again when it changes.
+        :return: The generation of the engine.
+        """
+        return self._node_engine.generation
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getPerformance(self, node_id: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.performance
+        state = self._getNodeState(node_id)
+        if state:
+            return state["performance"]
         return 0.
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getTargetPerformance(self, node_id: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.target_performance
+        state = self._getNodeState(node_id)
+        if state:
+            return state["target_performance"]
         return 0.
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="b")
     def hasSettablePerformance(self, node_id: str) -> bool:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.hasSettablePerformance
+        state = self._getNodeState(node_id)
+        if state:
+            return state["has_settable_performance"]
         return False
 
     @dbus.service.method("com.frivengi.nodes", out_signature="d", in_signature="s")
     def isNodeActive(self, node_id: str) -> bool:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.active
+        state = self._getNodeState(node_id)
+        if state:
+            return state["active"]
         return False
 
-    @dbus.service.method("com.frivengi.nodes", out_signature="ad", in_signature="s")
-    def getTemperatureHistory(self, node_id: str) -> List[float]:
+    @staticmethod
+    def _convertNumSamples(num_samples: int) -> Optional[int]:
+        """
+        DBus can't send None, so 0 (or less) is used to request all samples.
+        :param num_samples: The requested number of samples.
+        :return: The number of samples to pass on to the history.
+        """
+        return num_samples if num_samples > 0 else None
+
+    @dbus.service.method("com.frivengi.nodes", out_signature="ad", in_signature="sii")
+    def getTemperatureHistory(self, node_id: str, resolution: int = 1, num_samples: int = 0) -> List[float]:
+        """
+        Get the temperature history of a node.
+        :param node_id: Id of the node to get the history of.
+        :param resolution: Number of ticks per sample (1, 10 or 100). Above 1, each sample is the mean of the ticks.
+        :param num_samples: How many of the newest samples to get. 0 to get all of them.
+        :return: List of temperatures (oldest first)
+        """
         history = self._node_engine.getNodeHistoryById(node_id)
         if history:
-            return history.getTemperatureHistory()
+            return history.getTemperatureHistory(self._convertNumSamples(num_samples), resolution)
         return []
 
-    @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="s")
-    def getResourcesGainedHistory(self, node_id: str) -> Dict:
+    @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="sii")
+    def getResourcesGainedHistory(self, node_id: str, resolution: int = 1, num_samples: int = 0) -> Dict:
         history = self._node_engine.getNodeHistoryById(node_id)
         if history:
-            return dbus.Dictionary(history.getResourcesGainedHistory(), signature='sv')
+            return dbus.Dictionary(history.getResourcesGainedHistory(self._convertNumSamples(num_samples), resolution),
+                                   signature='sv')
         return {}
 
-    @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="s")
-    def getResourcesProducedHistory(self, node_id: str) -> Dict:
+    @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="sii")
+    def getResourcesProducedHistory(self, node_id: str, resolution: int = 1, num_samples: int = 0) -> Dict:
         history = self._node_engine.getNodeHistoryById(node_id)
         if history:
-            return dbus.Dictionary(history.getResourcesProducedHistory(), signature='sv')
+            return dbus.Dictionary(history.getResourcesProducedHistory(self._convertNumSamples(num_samples), resolution),
+                                   signature='sv')
         return {}
 
-    @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="s")
-    def getResourcesProvidedHistory(self, node_id: str) -> Dict:
+    @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="sii")
+    def getResourcesProvidedHistory(self, node_id: str, resolution: int = 1, num_samples: int = 0) -> Dict:
         history = self._node_engine.getNodeHistoryById(node_id)
         if history:
-            return dbus.Dictionary(history.getResourcesProvidedHistory(), signature='sv')
+            return dbus.Dictionary(history.getResourcesProvidedHistory(self._convertNumSamples(num_samples), resolution),
+                                   signature='sv')
         return {}
 
-    @dbus.service.method("com.frivengi.nodes", out_signature="ad", in_signature="ss")
-    def getAdditionalPropertyHistory(self, node_id: str, prop: str) -> List[float]:
+    @dbus.service.method("com.frivengi.nodes", out_signature="ad", in_signature="ssii")
+    def getAdditionalPropertyHistory(self, node_id: str, prop: str, resolution: int = 1, num_samples: int = 0) \
+            -> List[float]:
         history = self._node_engine.getNodeHistoryById(node_id)
         if history:
-            return history.getAdditionalPropertiesHistory().get(prop, [])
+            return history.getAdditionalPropertiesHistory(self._convertNumSamples(num_samples), resolution).get(prop, [])
         return []
 
-    @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
-    def getHistoryOffset(self, node_id: str):
+    @dbus.service.method("com.frivengi.nodes", in_signature="si", out_signature="d")
+    def getHistoryOffset(self, node_id: str, resolution: int = 1):
         """
         Not all data of the entire history is stored (because that would get out of hand).
         In order to still display the data correctly, we track the amount of ticks that we deleted
         :param node_id:
+        :param resolution: Number of ticks per sample of the history that the offset is requested for.
         :return:
         """
         history = self._node_engine.getNodeHistoryById(node_id)
         if history:
-            return history.getTickOffset()
+            return history.getTickOffset(resolution)
+        return 0
+
+    @dbus.service.method("com.frivengi.nodes", in_signature="sii", out_signature="a{sa{sa{sad}}}")
+    def getHistoryStatistics(self, node_id: str, resolution: int, num_samples: int) -> Dict[str, Any]:
+        """
+        Get the minimum, mean and maximum of all the history of a node.
+
+        .. seealso:: :func:`Nodes.NodeHistory.NodeHistory.getHistoryStatistics`
+        :param node_id: Id of the node to get the history of.
+        :param resolution: Number of ticks per sample (1, 10 or 100)
+        :param num_samples: How many of the newest samples to get. 0 to get all of them.
+        :return: Dict with the statistics per category and key.
+        """
+        history = self._node_engine.getNodeHistoryById(node_id)
+        if not history:
+            return dbus.Dictionary({}, signature = "sa{sa{sad}}")
+        statistics = history.getHistoryStatistics(resolution, self._convertNumSamples(num_samples))
+        # Most of the levels can be empty (eg; a node that doesn't produce anything, or keys without any complete
+        # points yet) and DBus can't guess the signature of those, so every level is converted explicitly.
+        return dbus.Dictionary({
+            category: dbus.Dictionary({
+                key: dbus.Dictionary({statistic: dbus.Array(values, signature = "d")
+                                      for statistic, values in key_statistics.items()}, signature = "sad")
+                for key, key_statistics in category_statistics.items()}, signature = "sa{sad}")
+            for category, category_statistics in statistics.items()}, signature = "sa{sa{sad}}")
+
+    @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="x")
+    def getHistoryMemoryUsage(self, node_id: str) -> int:
+        """
+        How much memory is used to store the history of a node?
+        :param node_id: Id of the node to get it for. If it's empty, the total of all nodes is given.
+        :return: Memory usage in bytes.
+        """
+        if not node_id:
+            return sum(self._node_engine.getHistoryMemoryUsage().values())
+        history = self._node_engine.getNodeHistoryById(node_id)
+        if history:
+            return history.getMemoryUsage()
         return 0
 
     @dbus.service.method("com.frivengi.nodes", out_signature="as", in_signature="s")
     def getAdditionalProperties(self, node_id: str) -> List[str]:
-        node = self._node_engine.getNodeById(node_id)
-        if not node:
+        state = self._getNodeState(node_id)
+        if not state:
             return []
-        return node.additional_properties
+        return list(state["additional_properties"])
 
     @dbus.service.method("com.frivengi.nodes", in_signature="ss", out_signature="d")
     def getAdditionalPropertyValue(self, node_id: str, prop: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if not node:
-            return -1
-        try:
-            return getattr(node, prop)
-        except AttributeError:
+        state = self._getNodeState(node_id)
+        if not state:
             return -1
+        if prop in state["additional_property_values"]:
+            return state["additional_property_values"][prop]
+        return state.get(prop, -1)
 
     @dbus.service.method("com.frivengi.nodes", in_signature="ss", out_signature="d")
     def getMaxAdditionalPropertyValue(self, node_id, prop: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if not node:
-            return -1
-        try:
-            return getattr(node, "max_" + prop)
-        except AttributeError:
+        state = self._getNodeState(node_id)
+        if not state:
             return -1
+        if prop in state["max_additional_property_values"]:
+            return state["max_additional_property_values"][prop]
+        return state.get("max_" + prop, -1)
+
+    @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="a{sv}")
+    def getNodeSnapshot(self, node_id: str) -> Dict[str, Any]:
+        """
+        Get all the (frequently requested) data of a node in one go. This saves a lot of separate calls.
+        The properties that never change during a run are not included; These can be requested with
+        getAllStaticProperties.
+        :param node_id: ID of the node to get the data for.
+        :return: Dict with all the data of the node. Empty if the node doesn't exist.
+        """
+        state = self._getNodeState(node_id)
+        if not state:
+            return dbus.Dictionary({}, signature = "sv")
+        return self._createNodeSnapshot(state)
+
+    @dbus.service.method("com.frivengi.nodes", out_signature="aa{sv}")
+    def getAllNodeSnapshots(self) -> List[Dict[str, Any]]:
+        """
+        Get all the (frequently requested) data of all the nodes in one go.
+        :return: List with the data of all nodes (see getNodeSnapshot)
+        """
+        return dbus.Array([self._createNodeSnapshot(state)
+                           for state in self._node_engine.getSnapshot().getAllNodeStates().values()],
+                          signature = "a{sv}")
+
+    @dbus.service.method("com.frivengi.nodes", out_signature="a{sa{sv}}")
+    def getAllStaticProperties(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the properties of all nodes that can never change once a run has started.
+        :return: Dict with the static properties per node id.
+        """
+        result = {}  # type: Dict[str, Any]
+        for node_id, state in self._node_engine.getSnapshot().getAllNodeStates().items():
+            node = self._node_engine.getNodeById(node_id)
+            # The supported modifiers only depend on the type (and tags) of the node, so they aren't in the snapshot.
+            supported_modifiers = ModifierFactory.getSupportedModifiersForNode(node) if node else []
+            result[node_id] = dbus.Dictionary({
+                "surface_area": float(state["surface_area"]),
+                "description": state["description"],
+                "custom_description": state["custom_description"],
+                "has_settable_performance": bool(state["has_settable_performance"]),
+                "supported_modifiers": dbus.Array(supported_modifiers, signature = "s"),
+                "label": state["label"],
+                "node_type": state["node_type"]
+            }, signature = "sv")
+        return dbus.Dictionary(result, signature = "sa{sv}")
+
+    def _getNodeState(self, node_id: str) -> Optional[Mapping[str, Any]]:
+        """
+        Get the state of a node from the last snapshot that the engine published. This never waits for a tick that is
+        in progress (and never shows the state halfway through a tick).
+        :param node_id: ID of the node to get the state of.
+        :return: The state of the node (see EngineSnapshot.createNodeState), or None if the node doesn't exist.
+        """
+        return self._node_engine.getSnapshot().getNodeState(node_id)
+
+    @staticmethod
+    def _createNodeSnapshot(state: Mapping[str, Any]) -> Dict[str, Any]:
+        """
+        Convert the state of a single node to DBus types. The values are the same as the ones that are returned by the
+        separate calls (eg; getTemperature, getPerformance, getResourcesRequired, etc). The properties that never change
+        during a run are not part of this (see getAllStaticProperties)
+        :param state: The state of the node, from the snapshot of the engine.
+        :return: Dict with all the data of the node.
+        """
+        additional_properties = []
+        for prop in state["additional_properties"]:
+            additional_properties.append(dbus.Dictionary({
+                "key": prop,
+                "value": float(state["additional_property_values"][prop]),
+                "max_value": float(state["max_additional_property_values"][prop])}, signature = "sv"))
+
+        return dbus.Dictionary({
+            "node_id": state["node_id"],
+            "temperature": float(state["temperature"]),
+            "enabled": bool(state["enabled"]),
+            "active": bool(state["active"]),
+            "performance": float(state["performance"]),
+            "target_performance": float(state["target_performance"]),
+            "min_performance": float(state["min_performance"]),
+            "max_performance": float(state["max_performance"]),
+            "max_safe_temperature": float(state["max_safe_temperature"]),
+            "heat_convection": float(state["heat_convection_coefficient"]),
+            "heat_emissivity": float(state["heat_emissivity"]),
+            "health": float(state["health"]),
+            "is_temperature_dependant": bool(state["is_temperature_dependant"]),
+            "optimal_temperature": float(state["optimal_temperature"]),
+            "effectiveness_factor": float(state["effectiveness_factor"]),
+            "resources_required": dbus.Dictionary(state["resources_required"], signature = "sd"),
+            "optional_resources_required": dbus.Dictionary(state["optional_resources_required"], signature = "sd"),
+            "resources_received": dbus.Dictionary(state["resources_received"], signature = "sd"),
+            "resources_produced": dbus.Dictionary(state["resources_produced"], signature = "sd"),
+            "resources_provided": dbus.Dictionary(state["resources_provided"], signature = "sd"),
+            "additional_properties": dbus.Array(additional_properties, signature = "a{sv}")
+        }, signature = "sv")
 
     @dbus.service.method("com.frivengi.nodes", out_signature="as")
     def getAllNodeIds(self) -> List[str]:
-        return self._node_engine.getAllNodeIds()
+        return self._node_engine.getSnapshot().getAllNodeIds()
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="b")
     def doesNodeExist(self, node_id) -> bool:
-        return node_id in self._node_engine.getAllNodeIds()
+        return self._getNodeState(node_id) is not None
 
     @dbus.service.method("com.frivengi.nodes")
     def doTick(self) -> None:
@@ -262,21 +475,52 @@ class NodesDBusService(dbus.service.Object):
 
     @dbus.service.method("com.frivengi.nodes", out_signature = "v")
     def getCurrentTick(self) -> int:
-        return self._node_engine.tick_count
+        # The tick count of the engine goes up before the snapshot of that tick is published, so the tick of the
+        # snapshot is used to match what the other getters return.
+        return self._node_engine.getSnapshot().tick_count
+
+    @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}")
+    def getTickProfile(self) -> Dict[str, Any]:
+        """
+        Get how much time (in seconds) the engine spent on average in each phase of the last ticks and, if enabled, per
+        type of node.
+        :return: The summary of the tick profiler.
+        """
+        summary = dict(self._node_engine.getTickProfiler().getSummary())
+        # DBus can't guess the signature of empty dicts and lists (which they are before the first tick, or when the
+        # node classes are not profiled), so these are set explicitly.
+        summary["phases"] = dbus.Dictionary(summary["phases"], signature = "sd")
+        summary["node_classes"] = dbus.Dictionary(summary["node_classes"], signature = "sd")
+        summary["sub_ticks"] = dbus.Array(summary["sub_ticks"], signature = "d")
+        return dbus.Dictionary(summary, signature = "sv")
+
+    @dbus.service.method("com.frivengi.nodes", out_signature="aa{sv}")
+    def getComponentDiagnostics(self) -> List[Dict[str, Any]]:
+        """
+        Get which nodes are connected with each other and what the engine did for each of these components in the last
+        tick.
+        :return: List with the nodes, state and duration (in seconds) of each component.
+        """
+        return dbus.Array([dbus.Dictionary(component, signature = "sv")
+                           for component in self._node_engine.getComponentDiagnostics()], signature = "a{sv}")
+
+    @dbus.service.method("com.frivengi.nodes", in_signature="b")
+    def setNodeClassProfilingEnabled(self, enabled: bool) -> None:
+        self._node_engine.getTickProfiler().profile_node_classes = bool(enabled)
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="b")
     def isNodeEnabled(self, node_id: str) -> bool:
-        node = self._node_engine.getNodeById(node_id)
-        if not node:
+        state = self._getNodeState(node_id)
+        if not state:
             return False
-        return node.enabled
+        return state["enabled"]
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="s")
     def getNodeType(self, node_id: str) -> str:
-        node = self._node_engine.getNodeById(node_id)
-        if not node:
+        state = self._getNodeState(node_id)
+        if not state:
             return ""
-        return type(node).__name__
+        return state["node_type"]
 
 
     @dbus.service.method("com.frivengi.nodes", in_signature="sb")
@@ -284,27 +528,20 @@ class NodesDBusService(dbus.service.Object):
         node = self._node_engine.getNodeById(node_id)
         if node:
             node.enabled = bool(enabled)
+            self._node_engine.updateSnapshot([node_id])
 
     @dbus.service.method("com.frivengi.nodes", out_signature="aa{sv}", in_signature="s")
     def getIncomingConnections(self, node_id) -> List[Dict[str, str]]:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            all_connections = node.getAllIncomingConnections()
-            return [{"target": connection.target.getId(),
-                     "origin": connection.origin.getId(),
-                     "resource_type": connection.resource_type}
-                    for connection in all_connections]
+        state = self._getNodeState(node_id)
+        if state:
+            return [dict(connection) for connection in state["incoming_connections"]]
         return []
 
     @dbus.service.method("com.frivengi.nodes", out_signature="aa{sv}", in_signature="s")
     def getOutgoingConnections(self, node_id) -> List[Dict[str, str]]:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            all_connections = node.getAllOutgoingConnections()
-            return [{"target": connection.target.getId(),
-                     "origin": connection.origin.getId(),
-                     "resource_type": connection.resource_type}
-                    for connection in all_connections]
+        state = self._getNodeState(node_id)
+        if state:
+            return [dict(connection) for connection in state["outgoing_connections"]]
         return []
 
     @dbus.service.method("com.frivengi.nodes")
@@ -318,65 +555,65 @@ class NodesDBusService(dbus.service.Object):
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getMinPerformance(self, node_id: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.min_performance
+        state = self._getNodeState(node_id)
+        if state:
+            return state["min_performance"]
         return 1.
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getMaxPerformance(self, node_id: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.max_performance
+        state = self._getNodeState(node_id)
+        if state:
+            return state["max_performance"]
         return 1.
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="b")
     def getIsTemperatureDependant(self, node_id: str) -> bool:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.isTemperatureDependant
+        state = self._getNodeState(node_id)
+        if state:
+            return state["is_temperature_dependant"]
         return False
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getOptimalTemperature(self, node_id: str) -> float:
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.optimal_temperature
+        state = self._getNodeState(node_id)
+        if state:
+            return state["optimal_temperature"]
         return -1
 
     @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="s")
     def getResourcesRequired(self, node_id: str):
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.getResourcesRequiredLastTick()
+        state = self._getNodeState(node_id)
+        if state:
+            return dict(state["resources_required"])
         return {}
 
     @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="s")
     def getResourcesReceived(self, node_id: str):
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.getResourcesReceivedLastTick()
+        state = self._getNodeState(node_id)
+        if state:
+            return dict(state["resources_received"])
         return {}
 
     @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="s")
     def getOptionalResourcesRequired(self, node_id: str):
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.getOptionalResourcesRequiredLastTick()
+        state = self._getNodeState(node_id)
+        if state:
+            return dict(state["optional_resources_required"])
         return {}
 
     @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="s")
     def getResourcesProduced(self, node_id: str):
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.getResourcesProducedLastTick()
+        state = self._getNodeState(node_id)
+        if state:
+            return dict(state["resources_produced"])
         return {}
 
     @dbus.service.method("com.frivengi.nodes", out_signature="a{sv}", in_signature="s")
     def getResourcesProvided(self, node_id: str):
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.getResourcesProvidedLastTick()
+        state = self._getNodeState(node_id)
+        if state:
+            return dict(state["resources_provided"])
         return {}
 
     @dbus.service.method("com.frivengi.nodes", out_signature="as", in_signature="s")
@@ -388,16 +625,16 @@ class NodesDBusService(dbus.service.Object):
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="d")
     def getEffectivenessFactor(self, node_id: str):
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.effectiveness_factor
+        state = self._getNodeState(node_id)
+        if state:
+            return state["effectiveness_factor"]
         else:
             return 1
 
     @dbus.service.method("com.frivengi.nodes", in_signature="s", out_signature="s")
     def getLabel(self, node_id: str):
-        node = self._node_engine.getNodeById(node_id)
-        if node:
-            return node.label
+        state = self._getNodeState(node_id)
+        if state:
+            return state["label"]
         else:
             return "Unknown"
\ No newline at end of file
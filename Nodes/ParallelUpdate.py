@@ -0,0 +1,259 @@
+"""
+Experimental parallel version of the update phase of the NodeEngine.
+
+Nodes can only exchange resources through connections, so during the update the nodes of one connected component (eg;
+the water loop) can't influence the nodes of another component (eg; the oxygen loop). The components are divided over a
+number of worker processes, which do the sub tick updates of their nodes and send the resulting state back.
+
+To guarantee that the result is exactly the same as the serial update, the order of the nodes is still determined
+(in the main process) by shuffling all the node ids, just like the serial update does. Every worker updates its nodes in
+that same order, it just skips the nodes of the other components. Since the nodes of other components don't affect its
+own nodes, the result is the same.
+
+The workers are forked at the start of every update, so that they start with an exact copy of the current state. This
+means that this only works on platforms that support forking (eg; not on Windows) and that every update pays for
+forking the workers, so it only helps for setups where the update takes a lot longer than that. It also means that it can't be
+combined with anything that runs on other threads (eg; the tick scheduler, the DBus service or writing the storage
+asynchronously); A forked child only gets a copy of the forking thread, so a lock that another thread held at that
+moment (eg; the one of stdout) is never released in the child and can deadlock it. The engine only uses the parallel
+update while it's the only thread (see isForkSafe).
+"""
+import multiprocessing
+import random
+import threading
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from Nodes.Node import Node
+from Nodes.Util import getAllAttributes
+
+if TYPE_CHECKING:
+    from Nodes.Connection import Connection
+
+_PRIMITIVE_TYPES = (bool, int, float, str, type(None))
+
+_worker_context = None  # type: Optional[Dict[str, Any]]
+"""What the workers need to know to do their update. It's set before the workers are forked, so they get a copy."""
+
+_worker_context_lock = Lock()
+
+
+def isParallelUpdateSupported() -> bool:
+    """
+    :return: Can the parallel update be used on this platform?
+    """
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def isForkSafe() -> bool:
+    """
+    Check if the workers can be forked right now. That's only the case if there are no other threads that could hold a
+    lock that the workers need.
+    :return: True if this is the only thread.
+    """
+    return threading.active_count() == 1
+
+
+def getConnectedComponents(nodes: Dict[str, Node]) -> List[List[str]]:
+    """
+    Split the nodes into groups that are connected with each other (ignoring the direction of the connections).
+    :param nodes: The nodes to split, with their ids as keys.
+    :return: List of components, each being a list of node ids (in the same order as the nodes were provided). The
+             components are in the order in which their first node was provided.
+    """
+    component_indices = {}  # type: Dict[str, int]
+    components = []  # type: List[List[str]]
+    for node_id, node in nodes.items():
+        if node_id in component_indices:
+            continue
+        component_index = len(components)
+        component_indices[node_id] = component_index
+        nodes_to_visit = [node]
+        while nodes_to_visit:
+            current_node = nodes_to_visit.pop()
+            for connection in current_node.getAllIncomingConnections() + current_node.getAllOutgoingConnections():
+                for connected_node in (connection.origin, connection.target):
+                    connected_id = connected_node.getId()
+                    if connected_id not in component_indices and connected_id in nodes:
+                        component_indices[connected_id] = component_index
+                        nodes_to_visit.append(connected_node)
+        components.append([])
+
+    for node_id in nodes:
+        components[component_indices[node_id]].append(node_id)
+    return components
+
+
+def divideComponents(components: List[List[str]], num_groups: int) -> List[List[str]]:
+    """
+    Divide the components over a number of groups, so that every group has about the same number of nodes.
+    :param components: The components to divide.
+    :param num_groups: The maximum number of groups to create.
+    :return: List of groups, each being the list of node ids of all the components in it. Empty groups are left out.
+    """
+    groups = [[] for _ in range(max(1, num_groups))]  # type: List[List[str]]
+    # Biggest component first, so that the smaller ones can fill up the gaps.
+    for component in sorted(components, key = len, reverse = True):
+        smallest_group = min(groups, key = len)
+        smallest_group.extend(component)
+    return [group for group in groups if group]
+
+
+def _isTransferable(value: Any) -> bool:
+    """
+    Check if a value only consists of plain data (and not of references to other objects, like nodes or signals).
+    :param value: The value to check.
+    :return: True if the value can be sent back from the worker.
+    """
+    if isinstance(value, _PRIMITIVE_TYPES):
+        return True
+    if isinstance(value, list):
+        return all(_isTransferable(item) for item in value)
+    if isinstance(value, dict):
+        return all(isinstance(key, _PRIMITIVE_TYPES) and _isTransferable(item) for key, item in value.items())
+    return False
+
+
+def getTransferableState(obj: Any) -> Dict[str, Any]:
+    """
+    Get all the attributes of an object that only consist of plain data.
+    :param obj: The object (node or connection) to get the state of.
+    :return: Dict with the attribute names and their values.
+    """
+    return {name: value for name, value in getAllAttributes(obj).items() if _isTransferable(value)}
+
+
+def applyTransferableState(obj: Any, state: Dict[str, Any]) -> None:
+    """
+    Overwrite the attributes of an object with a state that was created by getTransferableState.
+    Dicts and lists are updated in place, since other objects could hold a reference to them.
+    :param obj: The object to change.
+    :param state: The state to apply.
+    """
+    for name, value in state.items():
+        current_value = getattr(obj, name, None)
+        if isinstance(value, dict) and isinstance(current_value, dict):
+            current_value.clear()
+            current_value.update(value)
+        elif isinstance(value, list) and isinstance(current_value, list):
+            current_value[:] = value
+        else:
+            setattr(obj, name, value)
+
+
+def _getConnectionsOfNode(node: Node) -> List["Connection"]:
+    """
+    The connections that are updated together with a node. Every connection belongs to the node it originates from.
+    :param node: The node to get the connections of.
+    :return: The outgoing connections of the node.
+    """
+    return node.getAllOutgoingConnections()
+
+
+def _updateGroup(nodes: Dict[str, Node], group: List[str], orders: List[List[str]], sub_tick_modifier: float) -> None:
+    """
+    Do all the sub tick updates for a group of nodes.
+    :param nodes: All the nodes of the engine.
+    :param group: The ids of the nodes to update.
+    :param orders: For each sub tick, the order in which the (complete set of) nodes should be updated.
+    :param sub_tick_modifier: The part of a full tick that a single sub tick is.
+    """
+    group_ids = set(group)
+    for order in orders:
+        for node_id in order:
+            if node_id not in group_ids:
+                continue
+            node = nodes[node_id]
+            if node.enabled:
+                node.update(sub_tick_modifier)
+            node.cleanupAfterUpdate()
+
+
+def _getGroupState(nodes: Dict[str, Node], group: List[str]) \
+        -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """
+    :param nodes: All the nodes of the engine.
+    :param group: The ids of the nodes to get the state of.
+    :return: The state of the nodes and the state of their outgoing connections.
+    """
+    node_states = {node_id: getTransferableState(nodes[node_id]) for node_id in group}
+    connection_states = {node_id: [getTransferableState(connection)
+                                   for connection in _getConnectionsOfNode(nodes[node_id])] for node_id in group}
+    return node_states, connection_states
+
+
+def _updateGroupInWorker(group_index: int) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """
+    Entry point of the worker processes.
+    :param group_index: Which group of nodes should be updated by this worker.
+    :return: The state of the updated nodes and connections (see _getGroupState)
+    """
+    assert _worker_context is not None
+    nodes = _worker_context["nodes"]
+    group = _worker_context["groups"][group_index]
+    _updateGroup(nodes, group, _worker_context["orders"], _worker_context["sub_tick_modifier"])
+    return _getGroupState(nodes, group)
+
+
+def _applyGroupResult(nodes: Dict[str, Node], node_states: Dict[str, Dict[str, Any]],
+                      connection_states: Dict[str, List[Dict[str, Any]]]) -> None:
+    """
+    Copy the state that was calculated by a worker to the nodes (and connections) in this process.
+    :param nodes: All the nodes of the engine.
+    :param node_states: The state of the nodes, as returned by the worker.
+    :param connection_states: The state of the connections, as returned by the worker.
+    """
+    for node_id, state in node_states.items():
+        node = nodes[node_id]
+        applyTransferableState(node, state)
+        for connection, connection_state in zip(_getConnectionsOfNode(node), connection_states[node_id]):
+            applyTransferableState(connection, connection_state)
+
+
+def createSubTickOrders(node_ids: List[str], num_sub_ticks: int) -> List[List[str]]:
+    """
+    Create the order in which the nodes are updated in every sub tick. This uses the global random generator in exactly
+    the same way as the serial update does.
+    :param node_ids: The ids of all the nodes.
+    :param num_sub_ticks: The number of sub ticks.
+    :return: For every sub tick, a shuffled list of the node ids.
+    """
+    orders = []
+    for _ in range(num_sub_ticks):
+        keys = list(node_ids)
+        random.shuffle(keys)
+        orders.append(keys)
+    return orders
+
+
+def updateInParallel(nodes: Dict[str, Node], groups: List[List[str]], orders: List[List[str]],
+                     sub_tick_modifier: float) -> None:
+    """
+    Do the sub tick updates of all the groups at the same time. The first group is updated by this process, the others
+    are updated by forked worker processes, after which their results are copied back.
+
+    Note that the updateCalled signal of the nodes in the other groups is emitted in the workers, so anything connected
+    to it in this process is not called.
+    :param nodes: All the nodes of the engine.
+    :param groups: The groups of node ids that can be updated independently.
+    :param orders: For each sub tick, the order in which the (complete set of) nodes should be updated.
+    :param sub_tick_modifier: The part of a full tick that a single sub tick is.
+    """
+    global _worker_context
+    if len(groups) < 2:
+        _updateGroup(nodes, groups[0] if groups else [], orders, sub_tick_modifier)
+        return
+
+    context = multiprocessing.get_context("fork")
+    with _worker_context_lock:
+        _worker_context = {"nodes": nodes, "groups": groups, "orders": orders, "sub_tick_modifier": sub_tick_modifier}
+        try:
+            with context.Pool(len(groups) - 1) as pool:
+                results = pool.map_async(_updateGroupInWorker, range(1, len(groups)))
+                _updateGroup(nodes, groups[0], orders, sub_tick_modifier)
+                group_results = results.get()
+        finally:
+            _worker_context = None
+
+    for node_states, connection_states in group_results:
+        _applyGroupResult(nodes, node_states, connection_states)
@@ -1,4 +1,5 @@
-from typing import Optional, Dict, Any
+import math
+from typing import Optional, Dict, Any, Tuple
 
 from Nodes.Node import Node
 from Nodes.Constants import WEIGHT_PER_UNIT, GAS_PHASE_CHANGE_TEMPERATURE, GAS_PHASE_SPECIFIC_HEAT, SPECIFIC_HEAT
@@ -101,6 +102,16 @@ class ResourceStorage(Node):
 
         return gas_phase_temperature + energy_left / self.weight / self._specific_heat
 
+    def _getTemperatureModel(self) -> Optional[Tuple[float, float, float, bool, float]]:
+        resource_specific_heat = SPECIFIC_HEAT[self._resource_type]
+        divisor = self._weight * self._specific_heat + self._amount * self._resource_weight_per_unit * resource_specific_heat
+        max_stored_heat = math.inf
+        if self._resource_type in GAS_PHASE_CHANGE_TEMPERATURE:
+            # Above the phase change the temperature no longer scales linearly with the heat.
+            combined_specific_heat = (self._weight * self._specific_heat) + (self._amount * resource_specific_heat)
+            max_stored_heat = GAS_PHASE_CHANGE_TEMPERATURE[self._resource_type] * combined_specific_heat
+        return divisor, 1.0, 0., True, max_stored_heat
+
     @property
     def weight(self) -> float:
         return self._weight + self._resource_weight_per_unit * self.amount_stored
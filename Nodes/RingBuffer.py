@@ -0,0 +1,101 @@
+from array import array
+from typing import Iterable, List, Optional, Tuple
+
+
+class RingBuffer:
+    """
+    Fixed size FIFO of floats, backed by a preallocated array. Once it's full, appending a value overwrites the oldest.
+    Compared to a deque of (boxed) floats this uses 8 bytes per value and reading the last N values doesn't need to go
+    over the whole buffer.
+    """
+
+    def __init__(self, capacity: int, values: Optional[Iterable[float]] = None) -> None:
+        """
+        Fixed size FIFO of floats, backed by a preallocated array.
+        :param capacity: Maximum number of values that can be stored.
+        :param values: Values to start with. If there are more than the capacity, only the newest are kept.
+        """
+        if capacity < 1:
+            raise ValueError("The capacity of a RingBuffer must be at least 1, not %s" % capacity)
+        self._data = array("d", bytes(8 * capacity))
+        self._capacity = capacity
+        self._start = 0  # Index of the oldest value
+        self._size = 0
+        if values is not None:
+            self.extend(values)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        return iter(self.getLast())
+
+    def append(self, value: float) -> None:
+        """
+        Add a value. If the buffer is full, the oldest value is dropped.
+        :param value: The value to add.
+        """
+        if self._size < self._capacity:
+            self._data[(self._start + self._size) % self._capacity] = value
+            self._size += 1
+        else:
+            self._data[self._start] = value
+            self._start = (self._start + 1) % self._capacity
+
+    def extend(self, values: Iterable[float]) -> None:
+        """
+        Add multiple values (oldest first).
+        :param values: The values to add.
+        """
+        for value in values:
+            self.append(value)
+
+    def clear(self) -> None:
+        """
+        Remove all the values (the memory stays allocated).
+        """
+        self._start = 0
+        self._size = 0
+
+    def resize(self, capacity: int) -> None:
+        """
+        Change the capacity. If the new capacity is smaller than the number of values, the oldest values are dropped.
+        :param capacity: The new capacity.
+        """
+        if capacity < 1:
+            raise ValueError("The capacity of a RingBuffer must be at least 1, not %s" % capacity)
+        values = self.getLast(capacity)
+        self._data = array("d", bytes(8 * capacity))
+        self._capacity = capacity
+        self.clear()
+        self.extend(values)
+
+    def _getLastRange(self, num_values: int) -> Tuple[int, int]:
+        """
+        Get where the last values start in the (wrapping) data.
+        :param num_values: How many values (at most) are requested.
+        :return: The index of the first value and the number of values that can actually be provided.
+        """
+        num_values = max(0, min(num_values, self._size))
+        return (self._start + self._size - num_values) % self._capacity, num_values
+
+    def getLast(self, num_values: Optional[int] = None) -> List[float]:
+        """
+        Get a copy of the last values.
+        :param num_values: How many values (at most) to get. None to get all of them.
+        :return: List of the values, oldest first.
+        """
+        first_index, num_values = self._getLastRange(self._size if num_values is None else num_values)
+        if first_index + num_values <= self._capacity:
+            return self._data[first_index: first_index + num_values].tolist()
+        return self._data[first_index:].tolist() + self._data[:first_index + num_values - self._capacity].tolist()
+
+    def getMemoryUsage(self) -> int:
+        """
+        :return: The number of bytes that are used to store the values.
+        """
+        return self._data.buffer_info()[1] * self._data.itemsize
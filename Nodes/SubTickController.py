@@ -0,0 +1,117 @@
+import math
+from typing import Dict, Iterable, Optional
+
+from Nodes.Node import Node
+from Nodes.ResourceStorage import ResourceStorage
+
+
+class SubTickController:
+    """
+    Chooses how many sub ticks the engine should do, based on how much the flows changed in the last tick.
+    When nothing changes, the order in which nodes are updated doesn't matter much and a few sub ticks are enough. When
+    storages fill up or drain quickly or the nodes suddenly can't get what they reserved anymore, more sub ticks are
+    needed to prevent fluctuating behavior.
+
+    Two things are measured every tick:
+    - The change of the rate at which the storages fill up or drain, relative to how much they can hold.
+    - The change of the reservation deficiency; The part of the requested resources that can't be provided after the
+      replanning.
+    The biggest of these changes is the volatility of the tick, which is scaled linearly to a number of sub ticks.
+    """
+
+    def __init__(self, min_sub_ticks: int = 2, max_sub_ticks: int = 30, volatility_for_max_sub_ticks: float = 0.05) \
+            -> None:
+        """
+        Chooses how many sub ticks the engine should do.
+        :param min_sub_ticks: The number of sub ticks when nothing changes.
+        :param max_sub_ticks: The number of sub ticks when the volatility is volatility_for_max_sub_ticks (or more).
+        :param volatility_for_max_sub_ticks: The relative change (eg; 0.05 for 5%) at which the maximum is used.
+        """
+        if min_sub_ticks < 1:
+            raise ValueError("The minimum number of sub ticks must be at least 1, not %s" % min_sub_ticks)
+        if max_sub_ticks < min_sub_ticks:
+            raise ValueError("The maximum number of sub ticks (%s) can't be lower than the minimum (%s)" %
+                             (max_sub_ticks, min_sub_ticks))
+        self._min_sub_ticks = min_sub_ticks
+        self._max_sub_ticks = max_sub_ticks
+        self._volatility_for_max_sub_ticks = volatility_for_max_sub_ticks
+
+        self._storage_amounts = {}  # type: Dict[str, float]
+        self._storage_flows = {}  # type: Dict[str, float]
+        self._reservation_deficiency = None  # type: Optional[float]
+        self._storage_change = 0.
+        self._deficiency_change = 0.
+        self._num_ticks_measured = 0
+
+    @property
+    def min_sub_ticks(self) -> int:
+        return self._min_sub_ticks
+
+    @property
+    def max_sub_ticks(self) -> int:
+        return self._max_sub_ticks
+
+    @property
+    def volatility(self) -> float:
+        """
+        The biggest relative change that was measured in the last tick.
+        """
+        return max(self._storage_change, self._deficiency_change)
+
+    def measureReservations(self, nodes: Iterable[Node]) -> None:
+        """
+        Measure how much of the requested resources can't be provided. This must be done after the replanning.
+        :param nodes: All the nodes of the engine.
+        """
+        total_requested = 0.
+        total_deficiency = 0.
+        for node in nodes:
+            if not node.enabled:
+                continue
+            for connection in node.getAllIncomingConnections():
+                total_requested += connection.reserved_requested_amount
+                total_deficiency += max(connection.getReservationDeficiency(), 0.)
+        deficiency = total_deficiency / total_requested if total_requested > 0 else 0.
+
+        if self._reservation_deficiency is not None:
+            self._deficiency_change = abs(deficiency - self._reservation_deficiency)
+        self._reservation_deficiency = deficiency
+
+    def measureStorages(self, nodes: Iterable[Node]) -> None:
+        """
+        Measure how much the amounts in the storages changed. This must be done after the post update.
+        :param nodes: All the nodes of the engine.
+        """
+        storage_change = 0.
+        for node in nodes:
+            if not isinstance(node, ResourceStorage):
+                continue
+            node_id = node.getId()
+            amount = node.amount_stored
+            previous_amount = self._storage_amounts.get(node_id)
+            self._storage_amounts[node_id] = amount
+            if previous_amount is None:
+                continue
+            # A storage that fills up (or drains) at a steady rate is no reason for more sub ticks. A change of that
+            # rate is.
+            flow = amount - previous_amount
+            previous_flow = self._storage_flows.get(node_id)
+            self._storage_flows[node_id] = flow
+            if previous_flow is None:
+                continue
+            capacity = node.max_amount_stored
+            if capacity <= 0:  # Storage without a limit
+                capacity = max(amount, previous_amount)
+            storage_change = max(storage_change, abs(flow - previous_flow) / max(capacity, 1.))
+        self._storage_change = storage_change
+        self._num_ticks_measured += 1
+
+    def getSubTicksForNextTick(self) -> int:
+        """
+        :return: The number of sub ticks that the next tick should do. Until enough ticks were measured to tell how much
+                 the flows change, this is the maximum.
+        """
+        if self._num_ticks_measured < 3:
+            return self._max_sub_ticks
+        fraction = min(self.volatility / self._volatility_for_max_sub_ticks, 1.)
+        return self._min_sub_ticks + math.ceil((self._max_sub_ticks - self._min_sub_ticks) * fraction)
@@ -0,0 +1,129 @@
+from collections import deque
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional
+
+
+class TickProfiler:
+    """
+    Keeps track of how much (wall) time the engine spent in the various phases of the last ticks.
+    Optionally it also tracks how much time was spent per type of node, so that it's possible to see what kind of nodes
+    are responsible for slow ticks. The get functions are thread safe, so they can be called from other threads.
+    """
+
+    def __init__(self, max_ticks_to_store: int = 50) -> None:
+        """
+        Keeps track of how much (wall) time the engine spent in the various phases of the last ticks.
+        :param max_ticks_to_store: How many ticks should be kept? Older ticks are dropped.
+        """
+        self._tick_profiles = deque(maxlen = max_ticks_to_store)  # type: Deque[Dict[str, Any]]
+        self._current_profile = None  # type: Optional[Dict[str, Any]]
+        self._data_lock = Lock()
+
+        self.profile_node_classes = False
+        """Should the time spent per type of node be tracked? This has some overhead, so it's off by default."""
+
+    def startTick(self, tick_number: int) -> None:
+        """
+        Start the profile of a new tick.
+        :param tick_number: The number of the tick that is started.
+        """
+        self._current_profile = {"tick": tick_number,
+                                 "total": 0.,
+                                 "phases": {},
+                                 "sub_ticks": [],
+                                 "replan_iterations": 0,
+                                 "sub_tick_count": 0,
+                                 "node_classes": {}}
+
+    def addPhaseTime(self, phase: str, duration: float) -> None:
+        """
+        Add the time that was spent on a phase of the tick.
+        :param phase: Name of the phase
+        :param duration: Time spent (in seconds)
+        """
+        if self._current_profile is None:
+            return
+        phases = self._current_profile["phases"]
+        phases[phase] = phases.get(phase, 0.) + duration
+
+    def addSubTickTime(self, duration: float) -> None:
+        """
+        Add the time that was spent on a single sub tick of the update.
+        :param duration: Time spent (in seconds)
+        """
+        if self._current_profile is None:
+            return
+        self._current_profile["sub_ticks"].append(duration)
+
+    def addNodeClassTimes(self, node_class_times: Dict[str, float]) -> None:
+        """
+        Add the time that was spent per type of node.
+        :param node_class_times: Time spent (in seconds) per name of the node class.
+        """
+        if self._current_profile is None:
+            return
+        node_classes = self._current_profile["node_classes"]
+        for node_class, duration in node_class_times.items():
+            node_classes[node_class] = node_classes.get(node_class, 0.) + duration
+
+    def finishTick(self, total_duration: float, replan_iterations: int, sub_tick_count: int = 0) -> None:
+        """
+        Finish the profile of the current tick and store it.
+        :param total_duration: The time that the complete tick took (in seconds)
+        :param replan_iterations: How many iterations the replanning of the reservations needed
+        :param sub_tick_count: How many sub ticks the update was divided in.
+        """
+        if self._current_profile is None:
+            return
+        self._current_profile["total"] = total_duration
+        self._current_profile["replan_iterations"] = replan_iterations
+        self._current_profile["sub_tick_count"] = sub_tick_count
+        with self._data_lock:
+            self._tick_profiles.append(self._current_profile)
+        self._current_profile = None
+
+    def getTickProfiles(self) -> List[Dict[str, Any]]:
+        """
+        Get the profiles of all the ticks that are stored (oldest first).
+        :return: List with a profile per tick.
+        """
+        with self._data_lock:
+            return list(self._tick_profiles)
+
+    def getSummary(self) -> Dict[str, Any]:
+        """
+        Get the average time spent per phase, sub tick and node type over all the stored ticks.
+        :return: Dict with the number of ticks, the average total duration, replan iterations and sub tick count and per
+                 phase, sub tick and node class the average duration (all durations are in seconds)
+        """
+        profiles = self.getTickProfiles()
+        num_ticks = len(profiles)
+        summary = {"num_ticks": num_ticks,
+                   "total": 0.,
+                   "replan_iterations": 0.,
+                   "sub_tick_count": 0.,
+                   "phases": {},
+                   "sub_ticks": [],
+                   "node_classes": {}}  # type: Dict[str, Any]
+        if not num_ticks:
+            return summary
+
+        sub_tick_totals = []  # type: List[float]
+        sub_tick_counts = []  # type: List[int]
+        for profile in profiles:
+            summary["total"] += profile["total"] / num_ticks
+            summary["replan_iterations"] += profile["replan_iterations"] / num_ticks
+            summary["sub_tick_count"] += profile["sub_tick_count"] / num_ticks
+            for phase, duration in profile["phases"].items():
+                summary["phases"][phase] = summary["phases"].get(phase, 0.) + duration / num_ticks
+            for node_class, duration in profile["node_classes"].items():
+                summary["node_classes"][node_class] = summary["node_classes"].get(node_class, 0.) + duration / num_ticks
+            for index, duration in enumerate(profile["sub_ticks"]):
+                if index == len(sub_tick_totals):
+                    sub_tick_totals.append(0.)
+                    sub_tick_counts.append(0)
+                sub_tick_totals[index] += duration
+                sub_tick_counts[index] += 1
+
+        summary["sub_ticks"] = [total / count for total, count in zip(sub_tick_totals, sub_tick_counts)]
+        return summary
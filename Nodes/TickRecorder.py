@@ -0,0 +1,267 @@
+"""
+Records the state of all the nodes after every tick, so that long runs can be analysed afterwards (eg; with NumPy)
+without having to replay the simulation.
+
+A recording consists of two files:
+- <name>.meta.json: The names of the columns (eg; "generator/temperature"), which are fixed when the recording starts.
+- <name>.data: One row per tick with a float64 (little endian) for every column. Rows are only ever appended.
+
+Since every row has the same size, the data file can be memory-mapped as a (ticks x columns) matrix and every column can
+be read as a view on that matrix, without loading (or parsing) the rest of the file.
+"""
+import json
+import os
+import sys
+from array import array
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional
+
+from Nodes.Node import Node
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore
+
+if TYPE_CHECKING:
+    from Nodes.NodeEngine import NodeEngine
+
+FORMAT_VERSION = 1
+
+NODE_FIELDS = ["temperature", "health", "performance", "active", "enabled"]
+"""The fields that are recorded for every node."""
+
+RESOURCE_FIELDS = ["received", "produced", "provided"]
+"""The fields that are recorded for every resource that a node can receive or provide."""
+
+
+def getMetaDataPath(path: str) -> str:
+    """
+    :param path: The base name of the recording.
+    :return: The path of the file that describes the columns.
+    """
+    return path + ".meta.json"
+
+
+def getDataPath(path: str) -> str:
+    """
+    :param path: The base name of the recording.
+    :return: The path of the file that holds the rows.
+    """
+    return path + ".data"
+
+
+class TickRecorder:
+    """
+    Appends a row with the state of all the nodes to a recording every time the engine completes a tick.
+    """
+
+    def __init__(self, engine: "NodeEngine", path: str, record_on_tick: bool = True) -> None:
+        """
+        Start (or continue) a recording of the nodes of an engine.
+        If the recording already exists, new ticks are appended to it. This is only possible if the nodes (and thus the
+        columns) are still the same.
+        :param engine: The engine to record the nodes of.
+        :param path: The base name of the recording (the files get a .meta.json and a .data extension)
+        :param record_on_tick: Should a row be recorded automatically every time a tick is completed?
+        """
+        self._engine = engine
+        self._path = path
+        self._nodes = list(engine.getAllNodes().values())
+        self._resource_types = {node.getId(): self._getRecordedResourceTypes(node) for node in self._nodes}
+        self._columns = self._createColumnNames()
+
+        self._writeOrCheckMetaData()
+        self._data_file = open(getDataPath(path), "ab")  # type: Optional[BinaryIO]
+        self._removeIncompleteRow()
+        self._num_ticks_recorded = 0
+
+        self._record_on_tick = record_on_tick
+        if record_on_tick:
+            self._engine.tickCompleted.connect(self.recordTick)
+
+    @staticmethod
+    def _getRecordedResourceTypes(node: Node) -> List[str]:
+        """
+        Get the resources that a node can receive or provide, which are the resources that we record the flows of.
+        :param node: The node to get the resources of.
+        :return: Sorted list of resource types.
+        """
+        resource_types = set(node.getAllResourcesRequiredPerTick())
+        for connection in node.getAllIncomingConnections() + node.getAllOutgoingConnections():
+            resource_types.add(connection.resource_type)
+        return sorted(resource_types)
+
+    def _createColumnNames(self) -> List[str]:
+        """
+        :return: The names of all the columns, in the order that they are written.
+        """
+        columns = ["tick"]
+        for node in self._nodes:
+            node_id = node.getId()
+            columns.extend("%s/%s" % (node_id, field) for field in NODE_FIELDS)
+            for resource_type in self._resource_types[node_id]:
+                columns.extend("%s/%s/%s" % (node_id, field, resource_type) for field in RESOURCE_FIELDS)
+        return columns
+
+    def _writeOrCheckMetaData(self) -> None:
+        """
+        Write the names of the columns for a new recording, or check that they match with the existing recording.
+        """
+        meta_data_path = getMetaDataPath(self._path)
+        meta_data = {"version": FORMAT_VERSION, "columns": self._columns}
+        if os.path.exists(meta_data_path):
+            with open(meta_data_path) as f:
+                existing_meta_data = json.load(f)
+            if existing_meta_data != meta_data:
+                raise ValueError("Unable to append to the recording %s, since the nodes have changed" % self._path)
+            return
+        with open(meta_data_path, "w") as f:
+            json.dump(meta_data, f)
+
+    def _removeIncompleteRow(self) -> None:
+        """
+        If the last tick of an existing recording was only partially written (eg; because it crashed), remove it.
+        Otherwise all the rows that are appended would be shifted.
+        """
+        if self._data_file is None:
+            return
+        row_size = len(self._columns) * 8
+        size = os.path.getsize(getDataPath(self._path))
+        if size % row_size:
+            self._data_file.truncate(size - size % row_size)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def num_ticks_recorded(self) -> int:
+        """
+        Number of ticks that were recorded by this recorder (so not counting the ticks that were already recorded)
+        """
+        return self._num_ticks_recorded
+
+    def recordTick(self) -> None:
+        """
+        Append the current state of all the nodes as a single row.
+        """
+        if self._data_file is None:
+            return
+        row = [float(self._engine.tick_count)]
+        for node in self._nodes:
+            row.append(node.temperature)
+            row.append(node.health)
+            row.append(node.performance)
+            row.append(1. if node.active else 0.)
+            row.append(1. if node.enabled else 0.)
+            # Since the tick is complete, the flows of the tick that just happened are the "last tick" ones.
+            received = node.getResourcesReceivedLastTick()
+            produced = node.getResourcesProducedLastTick()
+            provided = node.getResourcesProvidedLastTick()
+            for resource_type in self._resource_types[node.getId()]:
+                row.append(received.get(resource_type, 0.))
+                row.append(produced.get(resource_type, 0.))
+                row.append(provided.get(resource_type, 0.))
+
+        row_data = array("d", row)
+        if sys.byteorder == "big":
+            row_data.byteswap()  # The recording is always little endian.
+        row_data.tofile(self._data_file)
+        self._data_file.flush()
+        self._num_ticks_recorded += 1
+
+    def close(self) -> None:
+        """
+        Stop recording and close the file.
+        """
+        if self._record_on_tick:
+            self._engine.tickCompleted.disconnect(self.recordTick)
+            self._record_on_tick = False
+        if self._data_file is not None:
+            self._data_file.close()
+            self._data_file = None
+
+
+class TickRecordingReader:
+    """
+    Reads a recording that was made by a TickRecorder. The data is memory-mapped, so only the parts that are actually
+    used are read from disk. This requires NumPy.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open a recording that was made by a TickRecorder.
+        :param path: The base name of the recording (without the .meta.json / .data extension)
+        """
+        if numpy is None:
+            raise ImportError("Reading a tick recording requires numpy")
+        with open(getMetaDataPath(path)) as f:
+            meta_data = json.load(f)
+        if meta_data.get("version") != FORMAT_VERSION:
+            raise ValueError("Unsupported version of the tick recording: %s" % meta_data.get("version"))
+        self._columns = meta_data["columns"]  # type: List[str]
+        self._column_indices = {name: index for index, name in enumerate(self._columns)}
+
+        data_path = getDataPath(path)
+        row_size = len(self._columns) * 8
+        # If a tick was only partially written (eg; because it crashed), it's ignored.
+        num_rows = os.path.getsize(data_path) // row_size
+        self._data = numpy.zeros((0, len(self._columns)), dtype = "<f8")  # type: Any
+        if num_rows:
+            self._data = numpy.memmap(data_path, dtype = "<f8", mode = "r", shape = (num_rows, len(self._columns)))
+
+    @property
+    def num_ticks(self) -> int:
+        return self._data.shape[0]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def getNodeIds(self) -> List[str]:
+        """
+        :return: The ids of all the nodes in the recording (in the order they are stored)
+        """
+        node_ids = []  # type: List[str]
+        for column in self._columns[1:]:
+            node_id = column.split("/")[0]
+            if not node_ids or node_ids[-1] != node_id:
+                node_ids.append(node_id)
+        return node_ids
+
+    def getData(self) -> Any:
+        """
+        :return: All the data as a (ticks x columns) NumPy array. This is a memory-mapped view, not a copy.
+        """
+        return self._data
+
+    def getTicks(self) -> Any:
+        """
+        :return: NumPy array with the tick number of each row.
+        """
+        return self._data[:, 0]
+
+    def getColumn(self, node_id: str, field: str, resource_type: Optional[str] = None) -> Any:
+        """
+        Get the recorded values of a single field of a node.
+        :param node_id: The id of the node.
+        :param field: One of the NODE_FIELDS or (in combination with a resource_type) one of the RESOURCE_FIELDS.
+        :param resource_type: The resource to get the field for.
+        :return: NumPy array (a view on the memory-mapped data) with a value per tick.
+        """
+        name = "%s/%s" % (node_id, field)
+        if resource_type is not None:
+            name += "/" + resource_type
+        if name not in self._column_indices:
+            raise KeyError("The recording has no column %s" % name)
+        return self._data[:, self._column_indices[name]]
+
+    def getNodeData(self, node_id: str) -> Dict[str, Any]:
+        """
+        Get all the recorded values of a node.
+        :param node_id: The id of the node.
+        :return: Dict with the column name (without the node id, eg; "temperature" or "received/water") and the values.
+        """
+        prefix = node_id + "/"
+        return {name[len(prefix):]: self._data[:, index] for name, index in self._column_indices.items()
+                if name.startswith(prefix)}
@@ -0,0 +1,241 @@
+import math
+import time
+from threading import Condition, Thread, current_thread
+from typing import Any, Callable, Dict, Optional
+
+CATCH_UP_SKIP = "skip"
+"""When a tick overruns, the ticks that should have started in the meantime are skipped."""
+CATCH_UP_BURST = "burst"
+"""When a tick overruns, the ticks that should have started in the meantime are done right away (up to a maximum)."""
+CATCH_UP_SLOW_DOWN = "slow_down"
+"""When a tick overruns, the next tick starts right away and the schedule is shifted, so the rate drops."""
+
+CATCH_UP_POLICIES = (CATCH_UP_SKIP, CATCH_UP_BURST, CATCH_UP_SLOW_DOWN)
+
+
+class TickScheduler:
+    """
+    Calls a target at a fixed rate on a single (long lived) thread. The moments at which the target should be called
+    are computed from a monotonic clock, so the time that the target takes doesn't add up over time (unlike waiting for
+    the interval after every call). When the target takes longer than the interval (an overrun), the catch up policy
+    decides what happens with the calls that should have started in the meantime.
+    The interval and catch up policy can be changed (and the scheduler paused) at any time, from any thread, without
+    restarting the thread.
+    """
+
+    def __init__(self, interval: float, target: Callable[[], Any], catch_up_policy: str = CATCH_UP_SKIP,
+                 max_burst: int = 5, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Calls a target at a fixed rate. The thread is only created when the scheduler is started for the first time.
+        :param interval: How much seconds should be between the start of the calls.
+        :param target: Function that needs to be called.
+        :param catch_up_policy: What to do if a call overruns (one of CATCH_UP_POLICIES).
+        :param max_burst: With the burst policy, how many calls can be done right after each other to catch up. Calls
+                          that are even further behind are skipped.
+        :param clock: The (monotonic) clock to use, in seconds.
+        """
+        self._checkInterval(interval)
+        self._checkCatchUpPolicy(catch_up_policy)
+        self._interval = interval
+        self._target = target
+        self._catch_up_policy = catch_up_policy
+        self._max_burst = max(1, max_burst)
+        self._clock = clock
+
+        self._condition = Condition()
+        self._thread = None  # type: Optional[Thread]
+        self._is_started = False
+        self._is_executing = False
+        self._should_stop = False
+        self._next_deadline = 0.
+
+        self._num_ticks = 0
+        self._num_overruns = 0
+        self._num_skipped = 0
+        self._num_failed = 0
+        self._last_duration = 0.
+        self._max_duration = 0.
+        self._max_lateness = 0.
+        self._total_lateness = 0.
+
+    @staticmethod
+    def _checkInterval(interval: float) -> None:
+        if interval <= 0:
+            raise ValueError("The interval must be positive, not %s" % interval)
+
+    @staticmethod
+    def _checkCatchUpPolicy(catch_up_policy: str) -> None:
+        if catch_up_policy not in CATCH_UP_POLICIES:
+            raise ValueError("Unknown catch up policy %s, should be one of %s" %
+                             (catch_up_policy, ", ".join(CATCH_UP_POLICIES)))
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    @property
+    def catch_up_policy(self) -> str:
+        return self._catch_up_policy
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Is the scheduler started (and not paused)? This doesn't say if the target is being called at the moment.
+        """
+        return self._is_started
+
+    @property
+    def is_executing(self) -> bool:
+        """
+        Is the target being called at the moment?
+        """
+        return self._is_executing
+
+    def setInterval(self, interval: float) -> None:
+        """
+        Change the interval. The next call is moved so that it's the new interval after the start of the previous call
+        (or the moment the scheduler was started), which can mean that it's done right away.
+        :param interval: How much seconds should be between the start of the calls.
+        """
+        self._checkInterval(interval)
+        with self._condition:
+            if not self._is_executing:
+                # Otherwise the next call is determined (with the new interval) once the current call is done.
+                self._next_deadline += interval - self._interval
+            self._interval = interval
+            self._condition.notify_all()
+
+    def setCatchUpPolicy(self, catch_up_policy: str) -> None:
+        """
+        :param catch_up_policy: What to do if a call overruns (one of CATCH_UP_POLICIES).
+        """
+        self._checkCatchUpPolicy(catch_up_policy)
+        with self._condition:
+            self._catch_up_policy = catch_up_policy
+
+    def start(self) -> None:
+        """
+        Start (or resume) calling the target. The first call is done one interval after starting.
+        """
+        with self._condition:
+            if self._should_stop:
+                raise RuntimeError("Unable to start a scheduler that was shut down")
+            if self._is_started:
+                return
+            self._is_started = True
+            self._next_deadline = self._clock() + self._interval
+            if self._thread is None:
+                self._thread = Thread(target = self._run, name = "TickScheduler", daemon = True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def pause(self) -> None:
+        """
+        Stop calling the target, until the scheduler is started again. A call that is in progress is finished.
+        """
+        with self._condition:
+            self._is_started = False
+            self._condition.notify_all()
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop the thread. The scheduler can't be started again afterwards.
+        :param timeout: Maximum time to wait for a call in progress to finish (in seconds). None waits for as long as it
+                        takes.
+        :return: True if the thread was stopped, False if the timeout expired first.
+        """
+        with self._condition:
+            self._should_stop = True
+            self._is_started = False
+            self._condition.notify_all()
+        if self._thread is None or self._thread is current_thread():
+            return True
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def getStatistics(self) -> Dict[str, Any]:
+        """
+        Get information about the calls that were done.
+        :return: Dict with the number of calls, overruns (calls during which the next call should have started), skipped
+                 and failed calls, the last and maximum duration of a call and the average and maximum lateness (how long after
+                 the scheduled moment a call started), all in seconds.
+        """
+        with self._condition:
+            return {"num_ticks": self._num_ticks,
+                    "num_overruns": self._num_overruns,
+                    "num_skipped": self._num_skipped,
+                    "num_failed": self._num_failed,
+                    "last_duration": self._last_duration,
+                    "max_duration": self._max_duration,
+                    "average_lateness": self._total_lateness / self._num_ticks if self._num_ticks else 0.,
+                    "max_lateness": self._max_lateness}
+
+    def _getNextDeadline(self, deadline: float, start_time: float, now: float) -> float:
+        """
+        Determine when the next call should be done. Also counts the overruns and skipped calls.
+        :param deadline: The moment the previous call should have started.
+        :param start_time: The moment the previous call actually started.
+        :param now: The moment the previous call finished.
+        :return: The moment the next call should start.
+        """
+        next_deadline = deadline + self._interval
+        if now <= next_deadline:
+            return next_deadline
+        if start_time <= next_deadline:
+            # Calls that catch up (with the burst policy) already start after the next deadline. They didn't miss it
+            # themselves, so they are not counted.
+            self._num_overruns += 1
+        # How many calls should already have started (not counting the one that is due now)?
+        num_missed = math.floor((now - next_deadline) / self._interval)
+        if self._catch_up_policy == CATCH_UP_SKIP:
+            self._num_skipped += num_missed + 1
+            return next_deadline + (num_missed + 1) * self._interval
+        if self._catch_up_policy == CATCH_UP_BURST:
+            num_skipped = max(0, num_missed + 1 - self._max_burst)
+            self._num_skipped += num_skipped
+            return next_deadline + num_skipped * self._interval
+        return now  # Slow down; Start right away and continue the schedule from there.
+
+    def _run(self) -> None:
+        """
+        Keep on calling the target at the right moments, until the scheduler is shut down.
+        """
+        while True:
+            with self._condition:
+                while True:
+                    if self._should_stop:
+                        return
+                    if not self._is_started:
+                        self._condition.wait()
+                        continue
+                    remaining = self._next_deadline - self._clock()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                deadline = self._next_deadline
+                self._is_executing = True
+
+            start_time = self._clock()
+            succeeded = True
+            try:
+                self._target()
+            except Exception as e:
+                print("Failed to do a scheduled tick:", e)
+                succeeded = False
+            end_time = self._clock()
+
+            with self._condition:
+                self._is_executing = False
+                duration = end_time - start_time
+                lateness = start_time - deadline
+                self._num_ticks += 1
+                if not succeeded:
+                    self._num_failed += 1
+                self._last_duration = duration
+                self._max_duration = max(self._max_duration, duration)
+                self._total_lateness += lateness
+                self._max_lateness = max(self._max_lateness, lateness)
+                # Unless the scheduler was restarted in the meantime, the schedule continues from the moment this call
+                # should have started.
+                if self._next_deadline == deadline:
+                    self._next_deadline = self._getNextDeadline(deadline, start_time, end_time)
@@ -1,3 +1,24 @@
+from typing import Any, Dict
+
+
 
 def enforcePositive(value: float) -> float:
     return max(value, 0)
+
+
+def getAllAttributes(obj: Any) -> Dict[str, Any]:
+    """
+    Get all the attributes of an object. Unlike vars(), this includes the attributes that are stored in __slots__.
+    :param obj: The object to get the attributes of.
+    :return: Dict with the attribute names and their values.
+    """
+    attributes = dict(vars(obj)) if hasattr(obj, "__dict__") else {}
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if name in ("__dict__", "__weakref__"):
+                continue
+            if name.startswith("__") and not name.endswith("__"):
+                name = "_%s%s" % (cls.__name__.lstrip("_"), name)  # Private names are mangled
+            if hasattr(obj, name):
+                attributes[name] = getattr(obj, name)
+    return attributes
@@ -70,5 +70,7 @@ class Controller(Resource):
     @api.expect(api.model('Controller', {'sensor_value': fields.Float}), code=201)
     def put(self, controller_id):
         manager = HardwareControllerManager.getInstance()
+        # The changed sensor values are sent to the engine in the background. The server invalidates the cached data
+        # of the nodes once they are sent.
         manager.updateController(controller_id, json.loads(request.data))
         manager.getController(controller_id).version_string = request.user_agent.string
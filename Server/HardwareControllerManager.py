@@ -1,20 +1,34 @@
-from typing import Dict, Optional
+import time
+from collections import deque
+from threading import Condition, Thread
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 
 from Server.HardwareController import HardwareController
+from Signal import signalemitter, Signal
 import dbus
 import dbus.exceptions
 
 
+@signalemitter
 class HardwareControllerManager:
     """
     There can be multiple external pieces of hardware that report sensor values to us. The HWCManager keeps track of
     these and the mapping of these values. This allows for sensors to directly control / set properties of Nodes
+    The changed values are collected per node for a short while and then sent to the engine in one DBus call (on a
+    separate thread), so that the requests of the controllers never wait for DBus.
     """
     __instance = None
 
-    def __init__(self) -> None:
-        """
+    targetPerformancesSent = Signal()
+    """Emitted (from the flush thread) with the ids of the nodes that got a new target performance."""
 
+    def __init__(self, coalesce_window: float = 0.05, max_latencies_to_store: int = 100) -> None:
+        """
+        Keeps track of the hardware controllers. Changed sensor values are collected and sent to the engine in batches,
+        so that a lot of controllers that update often don't all have to wait for DBus.
+        :param coalesce_window: How long (in seconds) to collect the sensor values before sending them. If the value of
+                                a sensor changes multiple times in this window, only the last value is sent.
+        :param max_latencies_to_store: For how many updates should the ingest latency be kept?
         """
         self._controllers = {}  # type: Dict[str, HardwareController]
 
@@ -37,6 +51,23 @@ class HardwareControllerManager:
         self._bus: Optional[dbus.SessionBus] = None
         self._dbus = None
 
+        self._coalesce_window = coalesce_window
+        self._condition = Condition()
+        self._pending_performances = {}  # type: Dict[str, Tuple[float, float]]
+        self._is_flushing = False
+        self._flush_thread = None  # type: Optional[Thread]
+
+        # Which nodes exist only changes if the engine is restarted or loads other nodes (a new generation).
+        self._engine_generation = None  # type: Optional[str]
+        self._existing_node_ids = None  # type: Optional[Set[str]]
+
+        self._num_updates_received = 0
+        self._num_updates_coalesced = 0
+        self._num_updates_sent = 0
+        self._num_updates_dropped = 0
+        self._num_batches_sent = 0
+        self._ingest_latencies = deque(maxlen = max_latencies_to_store)  # type: Deque[float]
+
     def _initDBUS(self) -> None:
         """
         Create DBUS object.
@@ -53,19 +84,6 @@ class HardwareControllerManager:
             except dbus.exceptions.DBusException as exception:
                 self._dbus = None
 
-    def _setupDBUS(self) -> None:
-        """
-        Ensure that the DBUS is setup and handled
-        :return:
-        """
-        self._initDBUS()
-        try:
-            self._dbus.checkAlive()  # type: ignore
-        except dbus.exceptions.DBusException:
-            self._dbus = None
-            # It could be that the service was rebooted, so we should try this again.
-            self._initDBUS()
-
     def getMappedIdFromSensor(self, controller_id: str, sensor_id: str) -> Optional[str]:
         """
         Get what sensor of a given controller is mapped to what node.
@@ -82,10 +100,10 @@ class HardwareControllerManager:
 
     def _onSensorValueChanged(self, controller_id: str, sensor_id: str) -> None:
         """
-        Handle the changes when a value of a sensor was changed.
-        :param controller_id:
-        :param sensor_id:
-        :return:
+        Handle the changes when a value of a sensor was changed. The new value isn't sent to the engine right away, but
+        added to the pending updates (see _flushPendingPerformances).
+        :param controller_id: The hardware controller that reported the change.
+        :param sensor_id: The sensor of that controller that changed.
         """
         new_value = self._controllers[controller_id].getSensorValue(sensor_id)
         if new_value is None:
@@ -103,19 +121,132 @@ class HardwareControllerManager:
         if node_id is None:
             return
 
-        self._setupDBUS()
-        if self._dbus is None:
-            print("Couldn't create dbus")
-            # Couldn't make the changes.
-            # We should probably store this somewhere so we can try later...
-            return
-        if not self._dbus.doesNodeExist(node_id):
-            print("Node doesn't exist", node_id)
-            # Node doesn't exist. Something went wrong here :(
+        with self._condition:
+            self._num_updates_received += 1
+            if node_id in self._pending_performances:
+                # Only the last value matters, but the latency is measured from the first value that is waiting.
+                self._num_updates_coalesced += 1
+                self._pending_performances[node_id] = (float(new_value), self._pending_performances[node_id][1])
+            else:
+                self._pending_performances[node_id] = (float(new_value), time.monotonic())
+            self._ensureFlushThread()
+            self._condition.notify_all()
+
+    def _ensureFlushThread(self) -> None:
+        """
+        Start the thread that sends the pending updates to the engine, if it isn't running yet. This must be called
+        while holding the condition.
+        """
+        if self._flush_thread is None:
+            self._flush_thread = Thread(target = self._runFlushThread, name = "HardwareControllerFlush", daemon = True)
+            self._flush_thread.start()
+
+    def _runFlushThread(self) -> None:
+        """
+        Keep on sending the pending updates to the engine. Once an update comes in, the thread waits for the coalesce
+        window, so all the updates that come in during that window (of any controller) are sent in one go.
+        """
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: bool(self._pending_performances))
+            time.sleep(self._coalesce_window)
+            with self._condition:
+                pending_performances = self._pending_performances
+                self._pending_performances = {}
+                self._is_flushing = True
+            try:
+                self._flushPendingPerformances(pending_performances)
+            except Exception as e:
+                print("Failed to send the sensor values to the engine:", e)
+            with self._condition:
+                self._is_flushing = False
+                self._condition.notify_all()
+
+    def _flushPendingPerformances(self, pending_performances: Dict[str, Tuple[float, float]]) -> None:
+        """
+        Send the target performances to the engine in a single call.
+        :param pending_performances: The new target performance and the time the (first) update was received, per node.
+        """
+        performances = {node_id: performance for node_id, (performance, _) in pending_performances.items()}
+        sent_node_ids = self._sendPerformances(performances)
+        if sent_node_ids is None:
+            # The engine couldn't be reached. There is no point in trying later, since newer values will come in.
+            print("Couldn't send the target performances to the engine")
+            with self._condition:
+                self._num_updates_dropped += len(performances)
             return
 
-        # For the moment we only support setting the target performance.
-        self._dbus.setTargetPerformance(node_id, float(new_value))
+        now = time.monotonic()
+        with self._condition:
+            self._num_batches_sent += 1
+            self._num_updates_sent += len(sent_node_ids)
+            self._num_updates_dropped += len(performances) - len(sent_node_ids)
+            for node_id in sent_node_ids:
+                self._ingest_latencies.append(now - pending_performances[node_id][1])
+        if sent_node_ids:
+            self.targetPerformancesSent.emit(sent_node_ids)
+
+    def _sendPerformances(self, performances: Dict[str, float]) -> Optional[List[str]]:
+        """
+        Send the target performances of the nodes that exist to the engine. If the engine was restarted (or the service
+        became unreachable) in the meantime, this is tried once more.
+        :param performances: The new target performance per node id.
+        :return: The ids of the nodes that the performance was set for, None if the engine couldn't be reached.
+        """
+        for _ in range(2):
+            self._initDBUS()
+            if self._dbus is None:
+                return None
+            try:
+                if self._existing_node_ids is None:
+                    self._engine_generation = str(self._dbus.getEngineGeneration())
+                    self._existing_node_ids = set(self._dbus.getAllNodeIds())
+                to_send = {node_id: performance for node_id, performance in performances.items()
+                           if node_id in self._existing_node_ids}
+                generation = str(self._dbus.setTargetPerformances(dbus.Dictionary(to_send, signature = "sd")))
+            except dbus.exceptions.DBusException:
+                # It could be that the service was rebooted, so we should try this again.
+                self._dbus = None
+                self._existing_node_ids = None
+                continue
+            if generation != self._engine_generation:
+                # The nodes of the engine changed since we asked for them, so which nodes exist needs to be checked
+                # again before sending the updates again (setting the same target performance twice does no harm).
+                self._existing_node_ids = None
+                continue
+            for node_id in performances:
+                if node_id not in to_send:
+                    print("Node doesn't exist", node_id)
+            return list(to_send)
+        return None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all the pending sensor values are sent to the engine.
+        :param timeout: Maximum time to wait (in seconds). None waits for as long as it takes.
+        :return: True if everything was sent, False if the timeout expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending_performances and not self._is_flushing, timeout)
+
+    def getIngestStatistics(self) -> Dict[str, Any]:
+        """
+        Get information about the sensor values that were sent to the engine.
+        :return: Dict with the number of received, coalesced (replaced by a newer value before they were sent), sent and
+                 dropped (unknown node or no engine) updates, the number of batches and the last, average and maximum
+                 ingest latency (the time between receiving a value and sending it to the engine, in seconds).
+        """
+        with self._condition:
+            latencies = list(self._ingest_latencies)
+            return {"num_updates_received": self._num_updates_received,
+                    "num_updates_coalesced": self._num_updates_coalesced,
+                    "num_updates_sent": self._num_updates_sent,
+                    "num_updates_dropped": self._num_updates_dropped,
+                    "num_batches_sent": self._num_batches_sent,
+                    "pending_updates": len(self._pending_performances),
+                    "last_latency": latencies[-1] if latencies else 0.,
+                    "average_latency": sum(latencies) / len(latencies) if latencies else 0.,
+                    "max_latency": max(latencies) if latencies else 0.}
 
     def updateController(self, controller_id: str, data: Dict[str, float]) -> None:
         """
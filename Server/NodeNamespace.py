@@ -5,8 +5,9 @@ from flask import current_app
 from flask_restx import Resource, fields, Namespace
 
 from Nodes.Constants import SPECIFIC_HEAT
+from Nodes.NodeHistory import HISTORY_RESOLUTIONS
 from Nodes.NodesDBusService import NodesDBusService
-from Server.Server import Server
+from Server.Server import Server, cached_response
 from Server.Database import getDBSession
 from Server.Blueprint import api
 
@@ -137,6 +138,24 @@ amount_parser.add_argument("amount", location = "json", required = True, type =
 show_last_parser = api.parser()
 show_last_parser.add_argument("showLast", type = str, location='args')
 
+history_parser = show_last_parser.copy()
+history_parser.add_argument("resolution", type = int, location = "args", default = 1, choices = HISTORY_RESOLUTIONS,
+                            help = "Number of ticks per sample. Above 1, each sample is the mean of those ticks")
+
+
+def getNumSamplesToShow(show_last: Optional[str]) -> int:
+    """
+    Convert the showLast argument to the number of samples to request from the engine.
+    :param show_last: The argument as it was provided.
+    :return: The number of samples, or 0 if all of them should be shown (also if the argument is not a valid number).
+    """
+    if not show_last:
+        return 0
+    try:
+        return max(0, int(show_last))
+    except ValueError:
+        return 0
+
 
 def checkIfNodeExists(nodes: "NodesDBusService", node_id: str) -> bool:
     try:
@@ -150,13 +169,16 @@ def checkIfNodeExists(nodes: "NodesDBusService", node_id: str) -> bool:
 class Node(Resource):
     @api.response(200, "success", node)
     @api.response(404, "Unknown Node")
+    @cached_response
     def get(self, node_id):
         nodes = app.getNodeDBusObject()
-        data = getNodeData(node_id)
-        if data is None:
+        snapshot = nodes.getNodeSnapshot(node_id)
+        if not snapshot:
             return UNKNOWN_NODE_RESPONSE
-        data["surface_area"] = nodes.getSurfaceArea(node_id)  # type: ignore
-        data["description"] = nodes.getDescription(node_id)  # type: ignore
+        data = convertSnapshotToNodeData(snapshot)
+        static_properties = app.getStaticNodeProperties(node_id) or {}
+        data["surface_area"] = static_properties.get("surface_area", 0.)
+        data["description"] = static_properties.get("description", "")
         return data
 
 
@@ -181,6 +203,7 @@ class Damage(Resource):
         except KeyError:
             return Response("No amount to damage was given", status = 400, mimetype='application/json')
         nodes.damage(node_id, amount_to_damage)
+        app.invalidateResponseCache(node_id)
 
 
 @node_namespace.route("/<string:node_id>/repair/")
@@ -204,6 +227,7 @@ class Repair(Resource):
         except KeyError:
             return Response("No amount to repair was given", status = 400, mimetype='application/json')
         nodes.repair(node_id, amount_to_repair)
+        app.invalidateResponseCache(node_id)
 
 
 @node_namespace.route('/<string:node_id>/enabled/')
@@ -224,6 +248,7 @@ class Enabled(Resource):
         if not checkIfNodeExists(nodes, node_id):
             return UNKNOWN_NODE_RESPONSE
         nodes.setNodeEnabled(node_id, not nodes.isNodeEnabled(node_id))
+        app.invalidateResponseCache(node_id)
         return bool(nodes.isNodeEnabled(node_id))
 
 
@@ -265,6 +290,7 @@ class Performance(Resource):
         current_target_performance = nodes.getTargetPerformance(node_id)
         card_id = request.args.get("accessCardID")
         nodes.setTargetPerformance(node_id, float(new_performance))
+        app.invalidateResponseCache(node_id)
         new_target_performance = nodes.getTargetPerformance(node_id)
         if card_id:
             access_card = AccessCard.query.filter_by(id=card_id).first()
@@ -313,6 +339,7 @@ class TargetPerformance(Resource):
         card_id = request.args.get("accessCardID")
 
         nodes.setTargetPerformance(node_id, float(new_performance))
+        app.invalidateResponseCache(node_id)
 
         new_target_performance = nodes.getTargetPerformance(node_id)
         if card_id:
@@ -330,20 +357,14 @@ class TargetPerformance(Resource):
 class TemperatureHistory(Resource):
     @api.response(200, "success", fields.List(fields.Float))
     @api.response(404, "Unknown Node")
-    @api.expect(show_last_parser)
+    @api.expect(history_parser)
+    @cached_response
     def get(self, node_id):
+        args = history_parser.parse_args()
         nodes = app.getNodeDBusObject()
         if not checkIfNodeExists(nodes, node_id):
             return UNKNOWN_NODE_RESPONSE
-        result = nodes.getTemperatureHistory(node_id)  # type: ignore
-        args = show_last_parser.parse_args()
-        show_last = args.get("showLast")
-        if show_last is not None and show_last:
-            try:
-                result = result[-int(show_last):]
-            except ValueError:
-                pass
-        return result
+        return nodes.getTemperatureHistory(node_id, args["resolution"], getNumSamplesToShow(args.get("showLast")))
 
 
 @node_namespace.route("/<string:node_id>/temperature/")
@@ -365,12 +386,16 @@ class Temperature(Resource):
 class AdditionalPropertyHistory(Resource):
     @api.response(404, "Unknown Node")
     @api.response(200, "success", fields.List(fields.Float))
+    @api.expect(history_parser)
+    @cached_response
     def get(self, node_id, prop):
+        args = history_parser.parse_args()
         nodes = app.getNodeDBusObject()
         if not checkIfNodeExists(nodes, node_id):
             return UNKNOWN_NODE_RESPONSE
         try:
-            return nodes.getAdditionalPropertyHistory(node_id, prop)
+            return nodes.getAdditionalPropertyHistory(node_id, prop, args["resolution"],
+                                                      getNumSamplesToShow(args.get("showLast")))
         except:
             return UNKNOWN_PROPERTY_RESPONSE
 
@@ -408,47 +433,62 @@ class AdditionalProperties(Resource):
 class AllProperties(Resource):
     @api.response(200, "success")
     @api.response(404, "Unknown Node")
-    @api.expect(show_last_parser)
+    @api.expect(history_parser)
+    @cached_response
     def get(self, node_id):
-        args = show_last_parser.parse_args()
-        show_last = args.get("showLast")
+        args = history_parser.parse_args()
+        resolution = args["resolution"]
+        num_samples = getNumSamplesToShow(args.get("showLast"))
         nodes = app.getNodeDBusObject()
         if not checkIfNodeExists(nodes, node_id):
             return UNKNOWN_NODE_RESPONSE
 
         all_property_histories = {}
-        all_property_histories["offset"] = nodes.getHistoryOffset(node_id)
+        all_property_histories["offset"] = nodes.getHistoryOffset(node_id, resolution)
         for prop in nodes.getAdditionalProperties(node_id):
             try:
-                all_property_histories[prop] = nodes.getAdditionalPropertyHistory(node_id, prop)
+                all_property_histories[prop] = nodes.getAdditionalPropertyHistory(node_id, prop, resolution, num_samples)
             except ValueError:
                 pass
 
-        all_property_histories["temperature"] = nodes.getTemperatureHistory(node_id)
+        all_property_histories["temperature"] = nodes.getTemperatureHistory(node_id, resolution, num_samples)
         try:
-            resources_gained = nodes.getResourcesGainedHistory(node_id)
+            resources_gained = nodes.getResourcesGainedHistory(node_id, resolution, num_samples)
         except:
             resources_gained = {}
 
         for key in resources_gained:
             all_property_histories["%s received" % key] = resources_gained[key]
 
-        resources_produced = nodes.getResourcesProducedHistory(node_id)
+        resources_produced = nodes.getResourcesProducedHistory(node_id, resolution, num_samples)
         for key in resources_produced:
             all_property_histories["%s produced" % key] = resources_produced[str(key)]
-        resources_provided = nodes.getResourcesProvidedHistory(node_id)
+        resources_provided = nodes.getResourcesProvidedHistory(node_id, resolution, num_samples)
         for key in resources_provided:
             all_property_histories["%s provided" % key] = resources_provided[str(key)]
 
-        for key in all_property_histories:
-            if show_last is not None and show_last and key != "offset":
-                try:
-                    all_property_histories[key] = all_property_histories[key][-int(show_last):]
-                except ValueError:
-                    pass
         return all_property_histories
 
 
+@node_namespace.route("/<string:node_id>/history_statistics/")
+@node_namespace.doc(params={'node_id': 'Identifier of the node'},
+                    description = "Get the minimum, mean and maximum of all the properties that have a history. With a "
+                                  "resolution of 10 or 100 a long period can be shown with a limited number of points")
+class HistoryStatistics(Resource):
+    @api.response(200, "success")
+    @api.response(404, "Unknown Node")
+    @api.expect(history_parser)
+    @cached_response
+    def get(self, node_id):
+        args = history_parser.parse_args()
+        nodes = app.getNodeDBusObject()
+        if not checkIfNodeExists(nodes, node_id):
+            return UNKNOWN_NODE_RESPONSE
+        result = {"offset": nodes.getHistoryOffset(node_id, args["resolution"])}  # type: Dict[str, Any]
+        result.update(nodes.getHistoryStatistics(node_id, args["resolution"], getNumSamplesToShow(args.get("showLast"))))
+        return result
+
+
 @node_namespace.route("/<string:node_id>/connections/incoming/")
 @node_namespace.doc(params={'node_id': 'Identifier of the node'},
                     description = "Get a list of all connections that connect to this node")
@@ -541,6 +581,7 @@ class Modifiers(Resource):
         successful = nodes.addModifierToNode(node_id, data["modifier_name"])
         if not successful:
             return UNKNOWN_MODIFIER
+        app.invalidateResponseCache(node_id)
 
         # Check if it was a modifier that was "replaced". Basically users can place a modifier again to reset the
         # duration. In that case it shouldn't add another item to the DB.
@@ -563,17 +604,17 @@ class StaticProperties(Resource):
     @api.response(404, "Unknown Node")
     @api.response(200, "Success", static_properties)
     def get(self, node_id):
-        nodes = app.getNodeDBusObject()
-        if not checkIfNodeExists(nodes, node_id):
+        static_properties = app.getStaticNodeProperties(node_id)
+        if static_properties is None:
             return UNKNOWN_NODE_RESPONSE
         data = {}
-        data["surface_area"] = nodes.getSurfaceArea(node_id)
-        data["description"] = nodes.getDescription(node_id)
-        data["custom_description"] = nodes.getCustomDescription(node_id)
-        data["has_settable_performance"] = bool(nodes.hasSettablePerformance(node_id))
-        data["supported_modifiers"] = nodes.getSupportedModifiers(node_id)
-        data["label"] = nodes.getLabel(node_id)
-        data["node_type"] = nodes.getNodeType(node_id)
+        data["surface_area"] = static_properties["surface_area"]
+        data["description"] = static_properties["description"]
+        data["custom_description"] = static_properties["custom_description"]
+        data["has_settable_performance"] = bool(static_properties["has_settable_performance"])
+        data["supported_modifiers"] = list(static_properties["supported_modifiers"])
+        data["label"] = static_properties["label"]
+        data["node_type"] = static_properties["node_type"]
         return data
 
 
@@ -598,63 +639,56 @@ class AdditionalProperty(Resource):
 @node_namespace.doc(description = "Get all the known nodes.")
 class Nodes(Resource):
     @api.response(200, "Sucess", fields.List(fields.Nested(node)))
+    @cached_response
     def get(self):
         nodes = app.getNodeDBusObject()
-        display_data = []
-        for node_id in nodes.getAllNodeIds():  # type: ignore
-            data = getNodeData(node_id)
-            display_data.append(data)
-        return display_data
+        return [convertSnapshotToNodeData(snapshot) for snapshot in nodes.getAllNodeSnapshots()]
 
 
 def getNodeData(node_id: str) -> Optional[Dict[str, Any]]:
     nodes = app.getNodeDBusObject()
-    if node_id not in nodes.getAllNodeIds():
+    snapshot = nodes.getNodeSnapshot(node_id)
+    if not snapshot:
         return None
-
-    required_resources = []
-
-    for key, value in nodes.getResourcesRequired(node_id).items():
-        required_resources.append({"resource_type": key, "value": value})
-
-    received_resources = []
-    for key, value in nodes.getResourcesReceived(node_id).items():
-        received_resources.append({"resource_type": key, "value": value})
-
-    optional_required_resources = []
-    for key, value in nodes.getOptionalResourcesRequired(node_id).items():
-        optional_required_resources.append({"resource_type": key, "value": value})
-        
-    resources_produced = []
-    for key, value in nodes.getResourcesProduced(node_id).items():
-        resources_produced.append({"resource_type": key, "value": value})
-
-    resources_provided = []
-    for key, value in nodes.getResourcesProvided(node_id).items():
-        resources_provided.append({"resource_type": key, "value": value})
-
-    data = {"node_id": node_id,
-            "node_type": nodes.getNodeType(node_id),
-            "temperature": nodes.getTemperature(node_id),
-            "enabled": nodes.isNodeEnabled(node_id),
-            "active": nodes.isNodeActive(node_id),
-            "performance": nodes.getPerformance(node_id),
-            "target_performance": nodes.getTargetPerformance(node_id),
-            "min_performance": nodes.getMinPerformance(node_id),
-            "max_performance": nodes.getMaxPerformance(node_id),
-            "max_safe_temperature": nodes.getMaxSafeTemperature(node_id),
-            "heat_convection": nodes.getHeatConvectionCoefficient(node_id),
-            "heat_emissivity": nodes.getHeatEmissivity(node_id),
-            "health": nodes.getAdditionalPropertyValue(node_id, "health"),
-            "is_temperature_dependant": bool(nodes.getIsTemperatureDependant(node_id)),
-            "optimal_temperature": nodes.getOptimalTemperature(node_id),
-            "resources_required": required_resources,
-            "optional_resources_required": optional_required_resources,
-            "resources_received": received_resources,
-            "resources_produced": resources_produced,
-            "resources_provided": resources_provided,
-            "additional_properties": getAdditionalPropertiesForNode(node_id),
-            "effectiveness_factor": nodes.getEffectivenessFactor(node_id),
-            "label": nodes.getLabel(node_id)
+    return convertSnapshotToNodeData(snapshot)
+
+
+def convertSnapshotToNodeData(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert the snapshot of a node (as provided by the NodesDBusService) to the data that the API provides.
+    :param snapshot: The snapshot of a single node
+    :return: The data of the node.
+    """
+    node_id = str(snapshot["node_id"])
+    static_properties = app.getStaticNodeProperties(node_id) or {}
+
+    def convertResources(resources: Dict[str, float]) -> List[Dict[str, Any]]:
+        return [{"resource_type": str(key), "value": float(value)} for key, value in resources.items()]
+
+    additional_properties = [{"key": str(prop["key"]), "value": float(prop["value"]), "max_value": float(prop["max_value"])}
+                             for prop in snapshot["additional_properties"]]
+
+    return {"node_id": node_id,
+            "node_type": str(static_properties.get("node_type", "")),
+            "temperature": float(snapshot["temperature"]),
+            "enabled": bool(snapshot["enabled"]),
+            "active": bool(snapshot["active"]),
+            "performance": float(snapshot["performance"]),
+            "target_performance": float(snapshot["target_performance"]),
+            "min_performance": float(snapshot["min_performance"]),
+            "max_performance": float(snapshot["max_performance"]),
+            "max_safe_temperature": float(snapshot["max_safe_temperature"]),
+            "heat_convection": float(snapshot["heat_convection"]),
+            "heat_emissivity": float(snapshot["heat_emissivity"]),
+            "health": float(snapshot["health"]),
+            "is_temperature_dependant": bool(snapshot["is_temperature_dependant"]),
+            "optimal_temperature": float(snapshot["optimal_temperature"]),
+            "resources_required": convertResources(snapshot["resources_required"]),
+            "optional_resources_required": convertResources(snapshot["optional_resources_required"]),
+            "resources_received": convertResources(snapshot["resources_received"]),
+            "resources_produced": convertResources(snapshot["resources_produced"]),
+            "resources_provided": convertResources(snapshot["resources_provided"]),
+            "additional_properties": additional_properties,
+            "effectiveness_factor": float(snapshot["effectiveness_factor"]),
+            "label": str(static_properties.get("label", node_id))
             }
-    return data
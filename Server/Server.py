@@ -4,14 +4,17 @@ import dbus
 import dbus.exceptions
 import flask
 
-from typing import Optional, cast, Any, List, Dict, TYPE_CHECKING
+from threading import Lock, Thread
+from typing import Optional, cast, Any, Callable, List, Dict, Tuple, TYPE_CHECKING
 
 from functools import wraps, partial
 from flask import Flask, Response, render_template, request
 
 
 from Server.Database import init_db, createDBSession, getDBSession
+from Server.HardwareControllerManager import HardwareControllerManager
 from Server.models import User, Ability, AccessCard, Modifier
+from sqlalchemy import and_, or_
 from werkzeug.exceptions import Forbidden, Unauthorized
 
 if TYPE_CHECKING:
@@ -66,6 +69,19 @@ def requires_user_ability(ability: str):
     return wrapper
 
 
+def cached_response(func):
+    """
+    Decorator that marks a given endpoint as only changing when a tick has passed. The result is cached by the server
+    until the next tick (or until the cache is invalidated).
+    Note that results that are a Response (eg; errors) are never cached.
+    """
+    @wraps(func)
+    def inner(*args, **kwargs):
+        server = cast(Server, flask.current_app)
+        return server.getCachedResponse(request.full_path, kwargs.get("node_id", ""), partial(func, *args, **kwargs))
+    return inner
+
+
 class Server(Flask):
     """
     The server provides the REST API for the engine. It connects to the engine via DBUS. This might be seen as a bit
@@ -75,8 +91,8 @@ class Server(Flask):
     own python instance. This has the added benefit that each of them has their own GIL. It should be noted that DBUS
     itself can cause calls to be blocked, so there is some waiting that can occur.
 
-    In the future it might be needed to cache results if it turns out that the many DBUS calls cause delays, but this
-    seems to not have been an issue so far.
+    Since the state of the engine only changes once per tick, the results of the endpoints that only read data can be
+    cached until the tick changes (see cached_response). Endpoints that change a node invalidate the cache of that node.
 
     The server itself uses various blueprints to actually create the various API's and document them.
     """
@@ -108,6 +124,32 @@ class Server(Flask):
         self._modifiers = None
         self._last_known_tick = 0
 
+        self._tick_listener_active = False
+        self._tick_listener_thread = None  # type: Optional[Thread]
+        self._signal_bus = None  # type: Optional[dbus.SessionBus]
+        # Set if we might have missed some ticks (or if the engine was restarted). In that case we need to ask the
+        # engine for the current tick and check all the modifiers again.
+        self._tick_resync_needed = True
+        # Set (from the listener thread) if the engine (dis)appeared from the bus. The objects that belong to the old
+        # engine are then dropped by the next request, so that they are never swapped out halfway through one.
+        self._node_service_changed = False
+
+        self._response_cache = {}  # type: Dict[Tuple[str, str, int], Any]
+        self._response_cache_lock = Lock()
+        # How often the whole cache and the responses of each node were invalidated. A response is only stored if there
+        # was no invalidation for it while it was being created, since it could hold the data from before the change.
+        self._num_cache_clears = 0
+        self._num_node_cache_invalidations = {}  # type: Dict[str, int]
+        self._total_node_cache_invalidations = 0
+
+        # The properties of the nodes that can't change while the engine is running. These are requested once (and
+        # again when the engine has been restarted).
+        self._static_node_properties = None  # type: Optional[Dict[str, Dict[str, Any]]]
+
+        # The sensor values of the hardware controllers are sent to the engine in the background. Once they have been
+        # sent, the cached data of those nodes is outdated.
+        HardwareControllerManager.getInstance().targetPerformancesSent.connect(self._onTargetPerformancesSent)
+
         createDBSession(db_location)
         init_db()
 
@@ -153,6 +195,7 @@ class Server(Flask):
         if exception.get_dbus_name() == "org.freedesktop.DBus.Error.ServiceUnknown":
             # We couldn't find the server on the other side. No need to log it more
             self._nodes = None
+            self._static_node_properties = None
             return Response('{"message": "The engine cant be found. Ensure that its running before trying again"}',
                             status = 503,
                             mimetype="application/json")
@@ -176,25 +219,189 @@ class Server(Flask):
             print(e)
 
     def _setupNodeDBUS(self) -> None:
+        if self._node_service_changed:
+            self._node_service_changed = False
+            self._nodes = None
+            self._static_node_properties = None
         self._initNodeDBUS()
+        if self._tick_listener_active and not self._tick_resync_needed:
+            # The tickCompleted signal of the engine keeps us up to date, so there is no need to ask for it.
+            return
         try:
             self._nodes.checkAlive()  # type: ignore
-            # Since getting DBUS signals to work properly with flask proved to be annoying, we just use ask what the
-            # last tick that we saw was. Based on that we can decide if an update is needed.
+            # If we don't listen to the tickCompleted signal (or missed some of them), we just ask what the last tick
+            # was. Based on that we can decide if an update is needed.
             # Since this function is always called before any update, we should never get outdated info.
             tick_number = self._nodes.getCurrentTick()  # type: ignore
-            if self._last_known_tick != tick_number:
+            if self._last_known_tick != tick_number or self._tick_resync_needed:
                 self._last_known_tick = tick_number
+                self._tick_resync_needed = False
+                self.invalidateResponseCache()
                 self._handleTickUpdate()
 
         except dbus.exceptions.DBusException:
             self._nodes = None
-            # It could be that the service was rebooted, so we should try this again.
+            # It could be that the service was rebooted, so we should try this again. The static properties of the
+            # nodes could also have been changed by that.
+            self._static_node_properties = None
             self._initNodeDBUS()
         except AttributeError:
             self._nodes = None
+            self._static_node_properties = None
             self._initNodeDBUS()
 
+    def startTickListener(self) -> bool:
+        """
+        Start listening to the tickCompleted signal of the engine. This is done on a background thread. Once it's
+        started, the server no longer needs to ask the engine what tick it is for every request.
+        :return: True if the listener was started. False if this isn't possible (eg; GLib is not installed)
+        """
+        if self._tick_listener_active:
+            return True
+        try:
+            from gi.repository import GLib
+            import dbus.mainloop.glib
+        except ImportError:
+            return False
+
+        dbus.mainloop.glib.threads_init()
+        # The signals are received on a separate connection, which is handled by the main loop of the listener thread.
+        signal_bus = dbus.SessionBus(private = True, mainloop = dbus.mainloop.glib.DBusGMainLoop())
+        signal_bus.add_signal_receiver(self._onTickCompleted,
+                                       signal_name = "tickCompleted",
+                                       dbus_interface = "com.frivengi.nodes",
+                                       path = "/com/frivengi/nodes")
+        signal_bus.watch_name_owner("com.frivengi.nodes", self._onNodeServiceOwnerChanged)
+        self._signal_bus = signal_bus
+
+        self._tick_listener_thread = Thread(target = GLib.MainLoop().run, daemon = True)
+        self._tick_listener_thread.start()
+        self._tick_listener_active = True
+        return True
+
+    def _onNodeServiceOwnerChanged(self, owner: str) -> None:
+        """
+        Called when the engine (dis)appeared from the bus. If that happens, the engine has been (re)started, so
+        everything that we know about it might be outdated.
+        :param owner: The (unique) name of the new owner. Empty if there is no owner.
+        """
+        # This is called from the listener thread, so only tell the requests that they need to set up things again.
+        self._node_service_changed = True
+        self._tick_resync_needed = True
+        self.invalidateResponseCache()
+
+    def _onTickCompleted(self, tick_number: int, expired_modifiers: List[Dict[str, str]]) -> None:
+        """
+        Called (from the listener thread) when the engine has completed a tick.
+        :param tick_number: The number of the tick that was completed.
+        :param expired_modifiers: The modifiers that expired during that tick (dicts with the node_id and type)
+        """
+        tick_number = int(tick_number)
+        previous_tick = self._last_known_tick
+        self._last_known_tick = tick_number
+        self.invalidateResponseCache()
+        if tick_number != previous_tick + 1:
+            # We missed one or more ticks, so we don't know all the modifiers that expired. The next request will
+            # check all of them.
+            self._tick_resync_needed = True
+            return
+        self._removeExpiredModifiers(expired_modifiers)
+
+    @staticmethod
+    def _removeExpiredModifiers(expired_modifiers: List[Dict[str, str]]) -> None:
+        """
+        Remove the modifiers that expired from the database (in a single query)
+        :param expired_modifiers: The modifiers that expired (dicts with the node_id and type)
+        """
+        if not expired_modifiers:
+            return
+        conditions = [and_(Modifier.node_id == str(expired_modifier["node_id"]),
+                           Modifier.name == str(expired_modifier["type"]))
+                      for expired_modifier in expired_modifiers]
+        try:
+            Modifier.query.filter(or_(*conditions)).delete(synchronize_session = False)
+            getDBSession().commit()  # type: ignore
+        except Exception as e:
+            print(e)
+        finally:
+            getDBSession().remove()  # type: ignore
+
+    def getCachedResponse(self, endpoint: str, node_id: str, create_response: Callable[[], Any]) -> Any:
+        """
+        Get the response for an endpoint from the cache. If it's not in the cache (for the current tick), it's created.
+        :param endpoint: The endpoint (including the arguments) that the response is for.
+        :param node_id: The node that the response is about (empty if it's not about a single node)
+        :param create_response: Function that creates the response if it's not cached.
+        :return: The response.
+        """
+        # Ensure that we know what the current tick is. This is the tick of the snapshot that the engine serves the
+        # requests from (both the polled tick and the tick of the tickCompleted signal), so the response that is created
+        # is never older than the tick it's stored for.
+        self._setupNodeDBUS()
+        key = (endpoint, node_id, self._last_known_tick)
+        with self._response_cache_lock:
+            if key in self._response_cache:
+                return self._response_cache[key]
+            num_invalidations = self._getNumCacheInvalidations(node_id)
+
+        response = create_response()
+        if not isinstance(response, Response):
+            with self._response_cache_lock:
+                if self._getNumCacheInvalidations(node_id) == num_invalidations:
+                    self._response_cache[key] = response
+        return response
+
+    def _getNumCacheInvalidations(self, node_id: str) -> int:
+        """
+        How often were the cached responses about a node invalidated? This must be called while holding the lock of
+        the response cache.
+        :param node_id: The node that the responses are about (empty for responses that are about all nodes, which are
+                        invalidated by changes to any node)
+        :return: The number of invalidations.
+        """
+        if not node_id:
+            return self._num_cache_clears + self._total_node_cache_invalidations
+        return self._num_cache_clears + self._num_node_cache_invalidations.get(node_id, 0)
+
+    def getStaticNodeProperties(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the properties of a node that can never change once a run has started. These are requested from the engine
+        for all nodes at once the first time (and after the engine was restarted), so this normally doesn't need DBUS.
+        :param node_id: The node to get the static properties for.
+        :return: The static properties or None if the node is unknown.
+        """
+        static_node_properties = self._static_node_properties
+        if static_node_properties is None:
+            self._setupNodeDBUS()
+            all_static_properties = self._nodes.getAllStaticProperties()  # type: ignore
+            static_node_properties = {str(key): dict(properties) for key, properties in all_static_properties.items()}
+            self._static_node_properties = static_node_properties
+        return static_node_properties.get(node_id)
+
+    def _onTargetPerformancesSent(self, node_ids: List[str]) -> None:
+        """
+        Called (from the flush thread of the hardware controllers) when new target performances were sent to the engine.
+        :param node_ids: The nodes that got a new target performance.
+        """
+        for node_id in node_ids:
+            self.invalidateResponseCache(node_id)
+
+    def invalidateResponseCache(self, node_id: Optional[str] = None) -> None:
+        """
+        Remove responses from the cache. This must be done when the state of a node is changed.
+        :param node_id: The node to remove the responses for. Responses that are about all nodes are also removed. If
+                        no node_id is set, the whole cache is cleared.
+        """
+        with self._response_cache_lock:
+            if node_id is None:
+                self._num_cache_clears += 1
+                self._response_cache.clear()
+                return
+            self._total_node_cache_invalidations += 1
+            self._num_node_cache_invalidations[node_id] = self._num_node_cache_invalidations.get(node_id, 0) + 1
+            self._response_cache = {key: value for key, value in self._response_cache.items()
+                                    if key[1] not in (node_id, "")}
+
     def _initNodeDBUS(self) -> None:
         """
         Create DBUS object for the nodes.
@@ -246,6 +453,27 @@ class Server(Flask):
 
         return Response(flask.json.dumps({"message": ""}), status=200, mimetype="application/json")
 
+    @register_route("/profile", ["get"])
+    def getTickProfile(self) -> Response:
+        self._setupNodeDBUS()
+
+        return Response(flask.json.dumps(self._nodes.getTickProfile()), status=200, mimetype="application/json")  # type: ignore
+
+    @register_route("/profile/components", ["get"])
+    def getComponentDiagnostics(self) -> Response:
+        self._setupNodeDBUS()
+
+        return Response(flask.json.dumps(self._nodes.getComponentDiagnostics()), status=200, mimetype="application/json")  # type: ignore
+
+    @register_route("/profile/node_classes", ["put"])
+    def setNodeClassProfilingEnabled(self) -> Response:
+        self._setupNodeDBUS()
+
+        data = json.loads(request.data)
+        self._nodes.setNodeClassProfilingEnabled(bool(data["value"]))  # type: ignore
+
+        return Response(flask.json.dumps({"message": ""}), status=200, mimetype="application/json")
+
     @register_route("/paused", ["get"])
     def isPaused(self) -> Response:
         self._setupNodeDBUS()
@@ -35,21 +35,44 @@ class Signal:
     Loosely based on http://code.activestate.com/recipes/577980-improved-signalsslots-implementation-in-python/
     :see_also SignalEmitter
     """
+    # Every node has a couple of signals, so they are kept as small as possible. Connecting and disconnecting is rare
+    # (compared to emitting, which doesn't need it), so a single lock is shared by all signals.
+    __lock = threading.Lock()  # Guards changes to the fields that are set in __init__
+
     def __init__(self, **kwargs) -> None:
         """
         Create a signal. A signal can be fired by calling .emit.
         :param kwargs:
         """
-        # These collections must be treated as immutable otherwise we lose thread safety.
-        self.__functions = WeakImmutableList()  # type: WeakImmutableList[Callable[..., None]]
-        self.__methods = WeakImmutablePairList()  # type: WeakImmutablePairList[Any, Callable[..., None]]
-        self.__signals = WeakImmutableList()  # type: WeakImmutableList[Signal]
+        # These collections must be treated as immutable otherwise we lose thread safety. For the same reason, the empty
+        # collections can be shared by all signals.
+        self.__functions = _EMPTY_LIST  # type: WeakImmutableList[Callable[..., None]]
+        self.__methods = _EMPTY_PAIR_LIST  # type: WeakImmutablePairList[Any, Callable[..., None]]
+        self.__signals = _EMPTY_LIST  # type: WeakImmutableList[Signal]
 
-        self.__lock = threading.Lock()  # Guards access to the fields above.
+        # All the slots of the collections above, resolved into a single tuple so that emitting is cheap. It's only
+        # replaced (never modified), so it can be read without taking the lock. See __createSlots.
+        self.__slots = ()  # type: Tuple[Tuple[ReferenceType, Optional[Callable[..., None]]], ...]
 
     def __call__(self):
         raise NotImplementedError("Call emit() to emit a signal")
 
+    def __createSlots(self) -> Tuple[Tuple[ReferenceType, Optional[Callable[..., None]]], ...]:
+        """
+        Resolve the connected functions, methods and signals (in the order in which they are called) into a tuple of
+        (weak reference, function) pairs. For methods, the function is the (unbound) function of the method and the
+        reference is to the object it's called on. For signals, the function is Signal.emit. For plain functions there
+        is no function, since the referenced object is the function itself.
+        Only the functions are referenced strongly; Holding on to the objects would keep them from being destroyed.
+        Must be called with the lock held.
+        :return: The slots.
+        """
+        slots = []  # type: List[Tuple[ReferenceType, Optional[Callable[..., None]]]]
+        slots.extend((weakref.ref(func), None) for func in self.__functions)
+        slots.extend((weakref.ref(dest), func) for dest, func in self.__methods)
+        slots.extend((weakref.ref(signal), Signal.emit) for signal in self.__signals)
+        return tuple(slots)
+
     def emit(self, *args, **kwargs) -> None:
         """
         Emit the signal which directly calls all of the connected slots.
@@ -57,26 +80,27 @@ class Signal:
         :param kwargs: The keyword arguments to pass along. (can be anything!)
         :return:
         """
+        # Reading a single field is atomic, so this is a consistent snapshot of all the slots without taking the lock.
+        slots = self.__slots
+        if not slots:
+            return
+
+        found_dead_slot = False
+        for reference, func in slots:
+            target = reference()
+            if target is None:
+                found_dead_slot = True
+                continue
+            if func is None:
+                target(*args, **kwargs)
+            else:
+                func(target, *args, **kwargs)
 
-        # Quickly make some private references to the collections we need to process.
-        # Although the these fields are always safe to use read and use with regards to threading,
-        # we want to operate on a consistent snapshot of the whole set of fields.
-        with self.__lock:
-            functions = self.__functions
-            methods = self.__methods
-            signals = self.__signals
-
-        # Call handler functions
-        for func in functions:
-            func(*args, **kwargs)
-
-        # Call handler methods
-        for dest, func in methods:
-            func(dest, *args, **kwargs)
-
-        # Emit connected signals
-        for signal in signals:
-            signal.emit(*args, **kwargs)
+        if found_dead_slot:
+            # Something that was connected was destroyed, so drop it from the slots.
+            with self.__lock:
+                if self.__slots is slots:
+                    self.__slots = self.__createSlots()
 
     def connect(self, connector: Union["Signal", Callable[..., None]]) -> None:
         """
@@ -94,6 +118,7 @@ class Signal:
             else:
                 # Once again, update the list of functions using a whole new list.
                 self.__functions = self.__functions.append(connector)
+            self.__slots = self.__createSlots()
 
     def disconnect(self, connector: Union["Signal", Callable[[], None]]) -> None:
         """
@@ -108,6 +133,7 @@ class Signal:
                 self.__methods = self.__methods.remove(cast(Any, connector).__self__, cast(Any, connector).__func__)
             else:
                 self.__functions = self.__functions.remove(connector)
+            self.__slots = self.__createSlots()
 
     def disconnectAll(self) -> None:
         """
@@ -115,9 +141,10 @@ class Signal:
         :return:
         """
         with self.__lock:
-            self.__functions = WeakImmutableList()
-            self.__methods = WeakImmutablePairList()
-            self.__signals = WeakImmutableList()
+            self.__functions = _EMPTY_LIST
+            self.__methods = _EMPTY_PAIR_LIST
+            self.__signals = _EMPTY_LIST
+            self.__slots = ()
 
 
 def signalemitter(cls):
@@ -302,4 +329,8 @@ class WeakImmutablePairListIterator:
             left = pair[0]()
             right = pair[1]()
 
-        return left, right
\ No newline at end of file
+        return left, right
+
+
+_EMPTY_LIST = WeakImmutableList()  # type: WeakImmutableList[Any]
+_EMPTY_PAIR_LIST = WeakImmutablePairList()  # type: WeakImmutablePairList[Any, Any]
@@ -0,0 +1,167 @@
+"""
+Generates synthetic configurations (in the same format as configuration.json) of any size, so that the performance of
+the engine can be measured for bases that are a lot bigger than the ones we actually have.
+
+The nodes are divided over a number of resource networks, which are not connected with each other. Within a network,
+every resource that is used gets one or more storages. The nodes that need a resource are connected to some of its
+storages (fan in) and the nodes that produce a resource are connected to some of its storages (fan out). If a network
+has more resources than storages, the nodes are connected directly to the producers of that resource instead.
+"""
+import random
+from typing import Any, Dict, List, Optional, Set
+
+from Nodes.Node import Node
+from Nodes.NodeFactory import NodeFactory
+
+NODE_TEMPLATES = {
+    "ResourceStorage": {"amount": 5000, "max_storage": 10000},
+    "Generator": {"fuel_type": "fuel", "energy_factor": 2.5, "performance": 1, "target_performance": 1},
+    "Valve": {"resource_type": "water", "fluid_per_tick": 135},
+    "FluidCooler": {"resource_type": "water", "fluid_per_tick": 110},
+    "ResourcePump": {"resource_type": "water", "amount": 15},
+    "FluctuatingResourceGenerator": {"resource_type": "waste", "amount": 0.5, "frequencies": [0.01, 0.06, 0.1],
+                                     "amplitudes": [0.1, 0.02, 0.03]},
+    "EnergyBalancer": {"performance": 1, "target_performance": 1},
+    "Lights": {"resource_type": "energy", "amount": 1.6},
+    "Scanner": {"resources_required": {"data": 5, "energy": 1}, "min_performance": 0.2, "max_performance": 1.5,
+                "performance": 0.2},
+    "OilExtractor": {},
+    "PlantPress": {},
+    "ResourceDestroyer": {"resource_type": "oxygen", "amount": 10},
+    "HydroponicsBay": {},
+    "WindTurbine": {"amount": 10, "frequencies": [0.011, 0.06, 0.1, 0.009], "amplitudes": [3.2, 0.9, 0.2, 1.2]},
+    "ComputationNode": {},
+    "MedicineCreator": {},
+    "WaterPurifier": {},
+    "SoundSystem": {"amount": 0.5},
+    "Toilets": {},
+}  # type: Dict[str, Dict[str, Any]]
+"""The type specific settings that are used for every node of that type (resource storages get their resource_type)"""
+
+DEFAULT_NODE_TYPE_MIX = {"ResourceStorage": 19, "Valve": 6, "FluidCooler": 4, "Generator": 3, "Lights": 3,
+                         "Scanner": 3, "ResourcePump": 2, "FluctuatingResourceGenerator": 2, "EnergyBalancer": 2,
+                         "OilExtractor": 1, "PlantPress": 1, "ResourceDestroyer": 1, "HydroponicsBay": 1,
+                         "WindTurbine": 1, "ComputationNode": 1, "MedicineCreator": 1, "WaterPurifier": 1,
+                         "SoundSystem": 1, "Toilets": 1}  # type: Dict[str, float]
+"""The relative number of nodes per type, which is the same as in configuration.json"""
+
+
+def _getConsumedResources(node: Node) -> Set[str]:
+    """
+    :param node: The node to get the resources of.
+    :return: The resources that the node requests (including the optional ones) or accepts.
+    """
+    return set(node.getAllResourcesRequiredPerTick()) | set(node._acceptable_resources)
+
+
+def _getProvidedResources(node: Node) -> Set[str]:
+    """
+    :param node: The node to get the resources of.
+    :return: The resources that the node can provide.
+    """
+    return set(node._providable_resources)
+
+
+def _createNodeData(node_type: str, **kwargs: Any) -> Dict[str, Any]:
+    """
+    :param node_type: The type of the node.
+    :param kwargs: Settings that are added to (or override) the ones from the template.
+    :return: The configuration data of a single node.
+    """
+    data = {"type": node_type}  # type: Dict[str, Any]
+    data.update(NODE_TEMPLATES[node_type])
+    data.update(kwargs)
+    return data
+
+
+def _divide(total: int, num_parts: int) -> List[int]:
+    """
+    Divide a number into (almost) equal parts.
+    :param total: The number to divide.
+    :param num_parts: The number of parts.
+    :return: The size of each part. The first parts get the remainder.
+    """
+    return [total // num_parts + (1 if index < total % num_parts else 0) for index in range(num_parts)]
+
+
+def generateConfiguration(num_nodes: int, node_type_mix: Optional[Dict[str, float]] = None, fan_in: int = 2,
+                          fan_out: int = 2, num_networks: int = 1, seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate a synthetic configuration. The same arguments always result in the same configuration.
+    :param num_nodes: The total number of nodes.
+    :param node_type_mix: The relative number of nodes per type (eg; {"Generator": 1, "Lights": 3}). Types that are not
+                          mentioned are not used. If the mix has no ResourceStorage, every network still gets a single
+                          storage. Defaults to DEFAULT_NODE_TYPE_MIX.
+    :param fan_in: To how many sources (storages or producers) every node is connected, per resource it consumes.
+    :param fan_out: To how many storages every node is connected, per resource it provides.
+    :param num_networks: The number of networks (that are not connected with each other) to divide the nodes over.
+    :param seed: Seed for the random choices.
+    :return: Dict with the nodes & connections, which can be passed to NodeEngine.deserialize.
+    """
+    mix = DEFAULT_NODE_TYPE_MIX if node_type_mix is None else node_type_mix  # type: Dict[str, float]
+    unknown_types = set(mix) - set(NODE_TEMPLATES)
+    if unknown_types:
+        raise ValueError("Unable to generate nodes of type(s) %s" % ", ".join(sorted(unknown_types)))
+    if num_networks < 1 or num_nodes < 2 * num_networks:
+        raise ValueError("Every network needs at least 2 nodes, so %s nodes can't be divided over %s networks" %
+                         (num_nodes, num_networks))
+    if fan_in < 1 or fan_out < 1:
+        raise ValueError("The fan in and fan out must be at least 1")
+
+    rng = random.Random(seed)
+    storage_fraction = mix.get("ResourceStorage", 0) / sum(mix.values())
+    other_types = sorted(node_type for node_type in mix if node_type != "ResourceStorage")
+    other_weights = [mix[node_type] for node_type in other_types]
+    if not other_types:
+        raise ValueError("The node type mix needs at least one type other than ResourceStorage")
+
+    # Create the nodes once (without adding them to the configuration) to know which resources they use.
+    consumed_resources = {}  # type: Dict[str, Set[str]]
+    provided_resources = {}  # type: Dict[str, Set[str]]
+    for node_type in other_types:
+        node = NodeFactory.createNode(node_type, _createNodeData(node_type))
+        consumed_resources[node_type] = _getConsumedResources(node)
+        provided_resources[node_type] = _getProvidedResources(node)
+
+    nodes = {}  # type: Dict[str, Dict[str, Any]]
+    connections = []  # type: List[Dict[str, str]]
+
+    for network, network_size in enumerate(_divide(num_nodes, num_networks)):
+        num_storages = min(max(1, round(network_size * storage_fraction)), network_size - 1)
+        network_types = rng.choices(other_types, weights = other_weights, k = network_size - num_storages)
+        network_node_ids = ["n%s_%s_%s" % (network, index, node_type.lower())
+                            for index, node_type in enumerate(network_types)]
+        for node_id, node_type in zip(network_node_ids, network_types):
+            nodes[node_id] = _createNodeData(node_type)
+
+        network_resources = set()  # type: Set[str]
+        for node_type in network_types:
+            network_resources |= consumed_resources[node_type] | provided_resources[node_type]
+        # Prefer storages for the resources that are used by the most nodes.
+        resources_by_use = sorted(network_resources, key = lambda resource: (
+            -sum(resource in consumed_resources[node_type] or resource in provided_resources[node_type]
+                 for node_type in network_types), resource))
+        storages_per_resource = {}  # type: Dict[str, List[str]]
+        for index in range(num_storages):
+            resource_type = resources_by_use[index % len(resources_by_use)] if resources_by_use else "water"
+            storage_id = "n%s_storage_%s_%s" % (network, index, resource_type)
+            nodes[storage_id] = _createNodeData("ResourceStorage", resource_type = resource_type)
+            storages_per_resource.setdefault(resource_type, []).append(storage_id)
+
+        producers_per_resource = {}  # type: Dict[str, List[str]]
+        for node_id, node_type in zip(network_node_ids, network_types):
+            for resource_type in provided_resources[node_type]:
+                producers_per_resource.setdefault(resource_type, []).append(node_id)
+
+        for node_id, node_type in zip(network_node_ids, network_types):
+            for resource_type in sorted(consumed_resources[node_type]):
+                sources = storages_per_resource.get(resource_type) or producers_per_resource.get(resource_type, [])
+                sources = [source for source in sources if source != node_id]
+                for source in rng.sample(sources, min(fan_in, len(sources))):
+                    connections.append({"from": source, "to": node_id, "resource_type": resource_type})
+            for resource_type in sorted(provided_resources[node_type]):
+                storages = storages_per_resource.get(resource_type, [])
+                for storage in rng.sample(storages, min(fan_out, len(storages))):
+                    connections.append({"from": node_id, "to": storage, "resource_type": resource_type})
+
+    return {"nodes": nodes, "connections": connections}
@@ -0,0 +1,47 @@
+"""
+pytest-benchmark cases for the tick throughput. These are not collected by the normal test run; Run them with:
+    python3 -m pytest benchmarks/bench_NodeEngine.py
+"""
+import random
+import tracemalloc
+
+import pytest
+
+from benchmarks.run_benchmarks import SCENARIOS, createEngine, measureMemoryPerNode
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_doTick(benchmark, scenario):
+    engine = createEngine(scenario)
+    random.seed(0)
+    benchmark.pedantic(engine.doTick, kwargs = {"print_tick_info": False}, rounds = 10, warmup_rounds = 1)
+
+    summary = engine.getTickProfiler().getSummary()
+    benchmark.extra_info["num_nodes"] = len(engine.getAllNodes())
+    benchmark.extra_info["replan_iterations"] = summary["replan_iterations"]
+    benchmark.extra_info["phases"] = summary["phases"]
+
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_peakMemory(benchmark, scenario):
+    engine = createEngine(scenario)
+    random.seed(0)
+
+    def doTraced():
+        tracemalloc.start()
+        try:
+            engine.doTick(print_tick_info = False)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    peak = benchmark.pedantic(doTraced, rounds = 1)
+    benchmark.extra_info["peak_memory_mib"] = peak / (1024 * 1024)
+
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_memoryPerNode(benchmark, scenario):
+    memory_per_node = benchmark.pedantic(measureMemoryPerNode, args = (scenario, ), rounds = 1)
+    benchmark.extra_info["memory_per_node_bytes"] = memory_per_node
@@ -0,0 +1,206 @@
+"""
+Measure how the tick throughput of the engine scales with the size of the base, using generated configurations.
+The results are compared with the baseline that is checked in (benchmarks/baseline.json), so that it's clear if a change
+made the engine slower. Since the absolute numbers depend on the machine, the baseline should be updated (on the same
+machine) before comparing a change with it.
+
+Example:
+    python3 -m benchmarks.run_benchmarks
+    python3 -m benchmarks.run_benchmarks --update-baseline
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from Nodes.NodeEngine import NodeEngine
+from benchmarks.ConfigurationGenerator import generateConfiguration
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+SCENARIOS = {
+    "small": {"num_nodes": 54, "num_networks": 1},
+    "medium": {"num_nodes": 250, "num_networks": 2},
+    "large": {"num_nodes": 1000, "num_networks": 4},
+    "large_dense": {"num_nodes": 1000, "num_networks": 1, "fan_in": 4, "fan_out": 4},
+}  # type: Dict[str, Dict[str, Any]]
+"""The arguments for generateConfiguration of every benchmark"""
+
+HISTORY_FILES = ("*NodeHistory.py", "*RingBuffer.py", "*HistoryRollup.py")
+"""The files in which the history of the nodes is allocated"""
+
+WARMUP_TICKS = 3
+"""Ticks that are done before measuring, since the first ticks (where all storages start at the same level) behave
+differently from the rest."""
+
+
+def createEngine(scenario: str, configuration: Optional[Dict[str, Any]] = None) -> NodeEngine:
+    """
+    :param scenario: The name of the scenario (one of SCENARIOS).
+    :param configuration: The generated configuration of the scenario, if it was already generated.
+    :return: An engine with the generated configuration of the scenario, with the warmup ticks already done.
+    """
+    if configuration is None:
+        configuration = generateConfiguration(**SCENARIOS[scenario])
+    engine = NodeEngine()
+    engine.deserialize(configuration)
+    random.seed(0)  # So that the nodes are updated in the same order every time.
+    engine.runTicks(WARMUP_TICKS)
+    return engine
+
+
+def measurePeakMemory(scenario: str, num_ticks: int) -> float:
+    """
+    Measure how much memory is needed to load the scenario and do a number of ticks. This is done separately from the
+    timing, since tracing the memory allocations slows the engine down a lot.
+    :param scenario: The name of the scenario (one of SCENARIOS).
+    :param num_ticks: The number of ticks to do after the warmup ticks.
+    :return: The peak memory usage in MiB.
+    """
+    tracemalloc.start()
+    try:
+        engine = createEngine(scenario)
+        engine.runTicks(num_ticks)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def measureMemoryPerNode(scenario: str) -> float:
+    """
+    Measure how much memory a node (including its connections and signals) takes on average, once the warmup ticks
+    are done. The history of the nodes is left out, since its size depends on the history depth and not on the nodes.
+    :param scenario: The name of the scenario (one of SCENARIOS).
+    :return: The number of bytes per node.
+    """
+    configuration = generateConfiguration(**SCENARIOS[scenario])
+    gc.collect()
+    tracemalloc.start()
+    try:
+        engine = createEngine(scenario, configuration)
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, pattern) for pattern in HISTORY_FILES])
+    return sum(stat.size for stat in snapshot.statistics("filename")) / len(engine.getAllNodes())
+
+
+def runScenario(scenario: str, num_ticks: int, measure_memory: bool = True) -> Dict[str, Any]:
+    """
+    Run a single benchmark.
+    :param scenario: The name of the scenario (one of SCENARIOS).
+    :param num_ticks: The number of ticks to measure (at most 50, which is what the tick profiler keeps).
+    :param measure_memory: Should the peak memory and the memory per node be measured as well? This needs extra
+                           (slower) runs.
+    :return: Dict with the results (see the baseline file).
+    """
+    engine = createEngine(scenario)
+    profiler = engine.getTickProfiler()
+    engine.runTicks(num_ticks)
+    profiles = profiler.getTickProfiles()[-num_ticks:]  # Leave out the warmup ticks.
+    # The median is a lot less sensitive to the odd slow tick (eg; because of garbage collection) than the mean.
+    tick_duration = statistics.median(profile["total"] for profile in profiles)
+    phases = {}  # type: Dict[str, float]
+    for profile in profiles:
+        for phase, duration in profile["phases"].items():
+            phases[phase] = phases.get(phase, 0.) + duration / len(profiles)
+    result = {"num_nodes": len(engine.getAllNodes()),
+              "num_connections": sum(len(node.getAllOutgoingConnections()) for node in engine.getAllNodes().values()),
+              "num_components": len(engine.getConnectedComponents()),
+              "ticks_per_second": 1 / tick_duration if tick_duration > 0 else float("inf"),
+              "replan_iterations": statistics.mean(profile["replan_iterations"] for profile in profiles),
+              "phases": phases}  # type: Dict[str, Any]
+    if measure_memory:
+        result["peak_memory_mib"] = measurePeakMemory(scenario, min(num_ticks, 5))
+        result["memory_per_node_bytes"] = measureMemoryPerNode(scenario)
+    return result
+
+
+def compareWithBaseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                        tolerance: float) -> List[str]:
+    """
+    Find the benchmarks that got worse than the baseline.
+    :param results: The results per scenario.
+    :param baseline: The baseline results per scenario.
+    :param tolerance: How much worse (eg; 0.2 for 20%) a result may be before it's a regression.
+    :return: A description of every regression. Scenarios that are not in the baseline are ignored.
+    """
+    regressions = []
+    for scenario, result in results.items():
+        expected = baseline.get(scenario)
+        if expected is None:
+            continue
+        if result["ticks_per_second"] < expected["ticks_per_second"] * (1 - tolerance):
+            regressions.append("%s: %.1f ticks/second (baseline %.1f)" %
+                               (scenario, result["ticks_per_second"], expected["ticks_per_second"]))
+        # The replanning is deterministic, so any increase is a real change.
+        if result["replan_iterations"] > expected["replan_iterations"] + 1e-6:
+            regressions.append("%s: %.2f replan iterations (baseline %.2f)" %
+                               (scenario, result["replan_iterations"], expected["replan_iterations"]))
+        if "peak_memory_mib" in result and "peak_memory_mib" in expected and \
+                result["peak_memory_mib"] > expected["peak_memory_mib"] * (1 + tolerance):
+            regressions.append("%s: %.1f MiB peak memory (baseline %.1f)" %
+                               (scenario, result["peak_memory_mib"], expected["peak_memory_mib"]))
+        if "memory_per_node_bytes" in result and "memory_per_node_bytes" in expected and \
+                result["memory_per_node_bytes"] > expected["memory_per_node_bytes"] * (1 + tolerance):
+            regressions.append("%s: %d bytes per node (baseline %d)" %
+                               (scenario, result["memory_per_node_bytes"], expected["memory_per_node_bytes"]))
+    return regressions
+
+
+def createArgumentParser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description = "Benchmark the engine with generated configurations.")
+    parser.add_argument("--scenario", action = "append", choices = sorted(SCENARIOS),
+                        help = "Only run this scenario (can be used multiple times)")
+    parser.add_argument("--ticks", type = int, default = 20, help = "How many ticks to measure per scenario")
+    parser.add_argument("--tolerance", type = float, default = 0.2,
+                        help = "How much worse than the baseline a result may be (eg; 0.2 for 20%%)")
+    parser.add_argument("--baseline", default = BASELINE_PATH, help = "The baseline to compare with")
+    parser.add_argument("--update-baseline", action = "store_true",
+                        help = "Store the results as the new baseline instead of comparing with it")
+    parser.add_argument("--output", help = "Also write the results (as JSON) to this file")
+    parser.add_argument("--no-memory", action = "store_true", help = "Don't measure the peak memory (which is slow)")
+    return parser
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    args = createArgumentParser().parse_args(arguments)
+    results = {}  # type: Dict[str, Dict[str, Any]]
+    for scenario in args.scenario or list(SCENARIOS):
+        result = runScenario(scenario, args.ticks, measure_memory = not args.no_memory)
+        results[scenario] = result
+        memory = ""
+        if "peak_memory_mib" in result:
+            memory = " %.1f MiB (%d bytes per node)" % (result["peak_memory_mib"], result["memory_per_node_bytes"])
+        print("%-12s %5d nodes %8.1f ticks/second %5.2f replan iterations%s" %
+              (scenario, result["num_nodes"], result["ticks_per_second"], result["replan_iterations"], memory))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent = 2, sort_keys = True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent = 2, sort_keys = True)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("There is no baseline to compare with (%s)" % args.baseline)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compareWithBaseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print("Regression: " + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,7 +19,8 @@ with open("configuration.json") as f:
     engine.setOutsideTemperatureHandler(PreScriptedTemperatureHandler())
 
 
-storage = NodeStorage(engine)
+# Write the state on a separate thread, so that the disk doesn't slow down the ticks.
+storage = NodeStorage(engine, write_asynchronously = True)
 #modifier = ModifierFactory.createModifier("OverrideDefaultSafetyControlsModifier")
 #engine.getNodeById("generator_1").addModifier(modifier)
 storage.restoreNodeState()
@@ -33,11 +34,16 @@ engine.doTick()
 #engine.start()
 
 dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+# The ticks (and thus the tickCompleted signal) are done from the timer thread.
+dbus.mainloop.glib.threads_init()
 
 loop = GLib.MainLoop()
 object = NodesDBusService(engine)
 object_2 = ModifiersDBusService()
-loop.run()
+try:
+    loop.run()
+finally:
+    storage.shutdown()
 
 
 print("done")
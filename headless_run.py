@@ -0,0 +1,111 @@
+"""
+Run the engine without DBus or a timer, as fast as possible. This can be used to pre-simulate the base for a certain
+amount of ticks (eg; a whole weekend) before it's actually used.
+
+Example:
+    python3 headless_run.py --ticks 1440 --restore
+"""
+import argparse
+import json
+from typing import List, Optional
+
+from Nodes.BinaryNodeStorage import BinaryNodeStorage
+from Nodes.NodeEngine import NodeEngine
+from Nodes.NodeStorage import NodeStorage
+from Nodes.TemperatureHandlers.PreScriptedTemperatureHandler import PreScriptedTemperatureHandler
+from Nodes.TickRecorder import TickRecorder
+
+
+def createArgumentParser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description = "Fast forward the node engine for a number of ticks.")
+    parser.add_argument("--ticks", type = int, required = True, help = "How many ticks should be simulated")
+    parser.add_argument("--config", default = "configuration.json", help = "The configuration to load the nodes from")
+    parser.add_argument("--storage", help = "Name of the file to restore and store the state (defaults to "
+                                            "node_state.json or node_state.bin, depending on the format)")
+    parser.add_argument("--storage-format", choices = ["json", "binary"], default = "json",
+                        help = "Store the state as a single JSON file or as incremental binary checkpoints. The state "
+                               "can be restored from either format")
+    parser.add_argument("--restore", action = "store_true", help = "Restore the stored state before simulating")
+    parser.add_argument("--store", choices = ["never", "end", "tick"], default = "end",
+                        help = "When should the state be stored; Never, once at the end or after every tick")
+    parser.add_argument("--write-asynchronously", action = "store_true",
+                        help = "Write the state on a separate thread, so that the ticks don't wait for the disk")
+    parser.add_argument("--history-depth", type = int, help = "How many ticks of history should be kept per node")
+    parser.add_argument("--record-ticks", metavar = "NAME",
+                        help = "Record the state of all nodes after every tick (in NAME.data & NAME.meta.json)")
+    parser.add_argument("--parallel-processes", type = int, default = 1,
+                        help = "Divide the update of unconnected parts of the setup over this many processes (experimental)")
+    parser.add_argument("--collapse-quiescent-nodes", action = "store_true",
+                        help = "Update nodes that have nothing to do only once per tick instead of every sub tick")
+    parser.add_argument("--adaptive-sub-ticks", type = int, nargs = 2, metavar = ("MIN", "MAX"),
+                        help = "Choose the number of sub ticks per tick (between MIN and MAX) based on how much the flows change")
+    parser.add_argument("--print-ticks", action = "store_true", help = "Print the start and end of each tick")
+    parser.add_argument("--no-signals", action = "store_true",
+                        help = "Don't emit the signals of the engine (the nodes still emit theirs)")
+    parser.add_argument("--scripted-temperature", action = "store_true",
+                        help = "Use the pre scripted outside temperature (as the normal engine does)")
+    return parser
+
+
+def main(arguments: Optional[List[str]] = None) -> NodeEngine:
+    parser = createArgumentParser()
+    args = parser.parse_args(arguments)
+    if args.store == "tick" and args.no_signals:
+        parser.error("Storing the state every tick requires the signals to be emitted")
+    if args.record_ticks is not None and args.no_signals:
+        parser.error("Recording the ticks requires the signals to be emitted")
+    if args.parallel_processes > 1 and args.write_asynchronously:
+        parser.error("The parallel update can't be combined with writing asynchronously, since the workers can't be "
+                     "forked safely while the writer thread is running")
+
+    engine = NodeEngine()
+    with open(args.config) as f:
+        engine.deserialize(json.loads(f.read()))
+
+    if args.history_depth is not None:
+        engine.setHistoryDepth(args.history_depth)
+
+    engine.setCollapseQuiescentNodes(args.collapse_quiescent_nodes)
+    try:
+        engine.setParallelUpdateProcesses(args.parallel_processes)
+        if args.adaptive_sub_ticks is not None:
+            engine.setAdaptiveSubTicks(True, *args.adaptive_sub_ticks)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.scripted_temperature:
+        engine.setOutsideTemperatureHandler(PreScriptedTemperatureHandler())
+
+    store_on_tick = args.store == "tick"
+    if args.storage_format == "binary":
+        storage = BinaryNodeStorage(engine, store_on_tick = store_on_tick,
+                                    write_asynchronously = args.write_asynchronously)  # type: NodeStorage
+    else:
+        storage = NodeStorage(engine, store_on_tick = store_on_tick, write_asynchronously = args.write_asynchronously)
+    if args.storage is not None:
+        storage.storage_name = args.storage
+    if args.restore:
+        storage.restoreNodeState()
+
+    recorder = None
+    if args.record_ticks is not None:
+        recorder = TickRecorder(engine, args.record_ticks)
+
+    start_tick = engine.tick_count
+    duration = engine.runTicks(args.ticks, print_tick_info = args.print_ticks, emit_signals = not args.no_signals)
+
+    if recorder is not None:
+        recorder.close()
+
+    if args.store == "end":
+        storage.storeNodeState()
+    storage.shutdown()
+
+    ticks_per_second = args.ticks / duration if duration > 0 else float("inf")
+    print(f"Simulated tick {start_tick + 1} to {engine.tick_count} in {duration:.2f} seconds "
+          f"({ticks_per_second:.1f} ticks/second)")
+    return engine
+
+
+if __name__ == "__main__":
+    main()
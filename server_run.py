@@ -21,6 +21,9 @@ api.add_namespace(RFID_namespace)
 api.add_namespace(User_namespace)
 app.register_blueprint(blueprint)
 
+if not app.startTickListener():
+    print("Unable to listen to the ticks of the engine, falling back to requesting them")
+
 
 def get_ip():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
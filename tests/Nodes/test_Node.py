@@ -6,6 +6,7 @@ import pytest
 
 from Nodes.Constants import WEIGHT_PER_UNIT
 from Nodes.Node import InvalidConnection
+from Nodes.Util import getAllAttributes
 
 
 @pytest.fixture
@@ -89,6 +90,26 @@ def test_connect():
     assert len(node_2.getAllIncomingConnectionsByType("energy")) == 1
 
 
+def test_connectionsAreIndexedByType():
+    node_1 = Node.Node("zomg")
+    node_2 = Node.Node("omg")
+    node_1._providable_resources.update(["energy", "water"])
+    node_2._acceptable_resources.update(["energy", "water"])
+
+    node_1.connectWith("energy", node_2)
+    node_1.connectWith("Water", node_2)
+    node_1.connectWith("energy", node_2)
+
+    assert len(node_1.getAllOutgoingConnectionsByType("energy")) == 2
+    assert len(node_1.getAllOutgoingConnectionsByType("water")) == 1
+    assert len(node_2.getAllIncomingConnectionsByType("energy")) == 2
+    assert len(node_2.getAllIncomingConnectionsByType("water")) == 1
+    assert node_2.getAllIncomingConnectionsByType("fuel") == []
+
+    # Order must be the same as the order in which the connections were made
+    assert node_1.getAllOutgoingConnectionsByType("energy") == [connection for connection in node_1.getAllOutgoingConnections() if connection.resource_type == "energy"]
+
+
 def test_invalidConnect():
     node_1 = Node.Node("zomg")
     node_2 = Node.Node("omg")
@@ -209,6 +230,25 @@ def test__getReservedResourceByType():
     assert node._getReservedResourceByType("zomg", 1) == 209
 
 
+def test_isQuiescent(node_energy_left):
+    node = Node.Node("zomg")
+    assert node.isQuiescent()
+
+    # A node that still has resources left over might still be able to get rid of them.
+    assert not node_energy_left.isQuiescent()
+
+    node._resources_provided_last_tick["water"] = 2
+    assert not node.isQuiescent()
+
+    node._resources_provided_last_tick["water"] = 0
+    connection = createConnection(True, 0)
+    node._incoming_connections.append(connection)
+    assert node.isQuiescent()
+
+    connection.reserved_requested_amount = 5
+    assert not node.isQuiescent()
+
+
 def test_replanReservations():
     node = Node.Node("")
     node.getResourcesRequiredPerTick()["water"] = 10
@@ -470,6 +510,32 @@ def test_modifiedProperty(modifier_value, factor_value, result, property_to_modi
     assert node_property == result
 
 
+def test_modifiedPropertyCacheIsCleared():
+    node = Node.Node("ModifiedNode", heat_emissivity = 1)
+    assert node.heat_emissivity == 1
+
+    modifier = Modifier.Modifier(modifiers = {"heat_emissivity": 2}, duration = 1)
+    node.addModifier(modifier)
+    assert node.heat_emissivity == 3
+
+    # Changing the modifier while it's on the node should also be picked up
+    modifier.deserialize({"modifiers": {"heat_emissivity": 4}, "factors": {}, "duration": 1})
+    assert node.heat_emissivity == 5
+
+    # Modifier expires, so the property should be back to normal
+    assert node.updateModifiers() == [modifier]
+    assert not node.getModifiers()
+    assert node.heat_emissivity == 1
+
+
+def test_modifiedPropertyIsClampedByMax():
+    node = Node.Node("ModifiedNode", performance = 2, max_performance = 1.5)
+    assert node.performance == 1.5
+
+    node.addModifier(Modifier.Modifier(factors = {"max_performance": 2}))
+    assert node.performance == 2
+
+
 def test_connectNodes():
     node = Node.Node("SuchNode!")
     node_2 = Node.Node("anotherNode")
@@ -491,4 +557,11 @@ def test_massiveHeatDamage():
     node._recalculateTemperature()
     node._dealDamageFromHeat()
 
-    assert node.health == 0  # No amount of damage should ever let the health go below 0
\ No newline at end of file
+    assert node.health == 0  # No amount of damage should ever let the health go below 0
+
+def test_slots():
+    node = Node.Node("zomg")
+    # The attributes of the node itself are all stored in slots, so it doesn't need a (big) dict for them.
+    assert "_health" not in vars(node)
+    assert getAllAttributes(node)["_health"] == 100.
+    assert getAllAttributes(node)["_Node__stefan_boltzmann_constant"] > 0
@@ -0,0 +1,63 @@
+from unittest.mock import MagicMock
+
+from Nodes import ParallelUpdate
+from Nodes.ResourceStorage import ResourceStorage
+from tests.testHelpers import createEngineFromConfigs
+
+
+def test_getConnectedComponents():
+    engine = createEngineFromConfigs(["WaterPurifierSetup.json", "HydroponicsSetup.json"])
+
+    components = ParallelUpdate.getConnectedComponents(engine.getAllNodes())
+
+    assert sorted(len(component) for component in components) == [1, 4, 5]
+    assert sorted(node_id for component in components for node_id in component) == sorted(engine.getAllNodeIds())
+    for component in components:
+        # Nodes of different configurations are never in the same component.
+        assert len({node_id.split("_")[0] for node_id in component}) == 1
+
+
+def test_divideComponents():
+    components = [["a"], ["b", "c", "d"], ["e", "f"], ["g"]]
+
+    assert ParallelUpdate.divideComponents(components, 2) == [["b", "c", "d", "g"], ["e", "f", "a"]]
+    assert ParallelUpdate.divideComponents(components, 1) == [["b", "c", "d", "e", "f", "a", "g"]]
+    # Never more groups than components
+    assert len(ParallelUpdate.divideComponents(components, 10)) == 4
+
+
+def test_transferableState():
+    obj = MagicMock()
+    original_dict = {"water": 2.}
+    obj.__dict__.update({"amount": 1., "received": original_dict, "names": ["a"], "node": MagicMock(),
+                         "connections": [MagicMock()]})
+
+    state = ParallelUpdate.getTransferableState(obj)
+    assert set(state.keys()) >= {"amount", "received", "names"}
+    assert "node" not in state
+    assert "connections" not in state
+
+    ParallelUpdate.applyTransferableState(obj, {"amount": 3., "received": {"energy": 4.}})
+    assert obj.amount == 3.
+    assert obj.received is original_dict  # Dicts are updated in place
+    assert original_dict == {"energy": 4.}
+
+
+def test_transferableStateOfNode():
+    node = ResourceStorage("storage", "water", 10, max_storage = 100)
+    node._resources_received_this_tick["water"] = 2.
+
+    state = ParallelUpdate.getTransferableState(node)
+    # Both the attributes in the slots of Node and the ones of the subclass are included.
+    assert state["_health"] == 100.
+    assert state["_resources_received_this_tick"] == {"water": 2.}
+    assert state["_amount"] == 10
+
+    other_node = ResourceStorage("storage", "water", 50, max_storage = 100)
+    received = other_node._resources_received_this_tick
+    other_node.damage(20)
+    ParallelUpdate.applyTransferableState(other_node, state)
+    assert other_node.health == 100.
+    assert other_node.amount_stored == 10
+    assert other_node._resources_received_this_tick is received
+    assert received == {"water": 2.}
@@ -0,0 +1,50 @@
+import pytest
+
+from Nodes.RingBuffer import RingBuffer
+
+
+def test_appendUntilFull():
+    buffer = RingBuffer(3)
+    assert buffer.getLast() == []
+
+    buffer.extend([1, 2, 3])
+    assert len(buffer) == 3
+    assert buffer.getLast() == [1, 2, 3]
+
+    buffer.append(4)  # Should push out the oldest
+    assert len(buffer) == 3
+    assert buffer.getLast() == [2, 3, 4]
+    assert list(buffer) == [2, 3, 4]
+
+
+def test_createWithMoreValuesThanCapacity():
+    buffer = RingBuffer(2, [1, 2, 3, 4])
+    assert buffer.getLast() == [3, 4]
+
+
+@pytest.mark.parametrize("num_values, result", [(0, []), (1, [5]), (2, [4, 5]), (4, [2, 3, 4, 5]), (10, [2, 3, 4, 5])])
+def test_getLast(num_values, result):
+    buffer = RingBuffer(4, [1, 2, 3, 4, 5])
+    assert buffer.getLast(num_values) == result
+
+
+@pytest.mark.parametrize("capacity, result", [(2, [4, 5]), (4, [2, 3, 4, 5]), (10, [2, 3, 4, 5])])
+def test_resize(capacity, result):
+    buffer = RingBuffer(4, [1, 2, 3, 4, 5])
+    buffer.resize(capacity)
+    assert buffer.capacity == capacity
+    assert buffer.getLast() == result
+    buffer.append(6)
+    assert buffer.getLast() == (result + [6])[-capacity:]
+
+
+def test_getMemoryUsage():
+    assert RingBuffer(10).getMemoryUsage() == 80
+    assert RingBuffer(10000).getMemoryUsage() == 80000
+
+
+def test_invalidCapacity():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+    with pytest.raises(ValueError):
+        RingBuffer(2).resize(0)
@@ -22,4 +22,24 @@ def setupForIdealState(config_file, target_node_id):
         node._temperature = target_node._optimal_temperature
         node.outside_temp = target_node._optimal_temperature
         node.ensureSaneValues()
-    return engine
\ No newline at end of file
+    return engine
+
+def createEngineFromConfigs(config_files) -> NodeEngine:
+    """
+    Create an engine with the nodes of multiple configurations (which are not connected with each other). The ids of
+    the nodes get the index of their configuration as prefix, so that they stay unique.
+    """
+    engine = NodeEngine()
+    combined_data = {"nodes": {}, "connections": []}
+    for index, config_file in enumerate(config_files):
+        with open("tests/configurations/" + config_file) as f:
+            loaded_data = json.loads(f.read())
+        for node_id, node_data in loaded_data["nodes"].items():
+            combined_data["nodes"]["%s_%s" % (index, node_id)] = node_data
+        for connection in loaded_data["connections"]:
+            connection = dict(connection)
+            connection["from"] = "%s_%s" % (index, connection["from"])
+            connection["to"] = "%s_%s" % (index, connection["to"])
+            combined_data["connections"].append(connection)
+    engine.deserialize(combined_data)
+    return engine
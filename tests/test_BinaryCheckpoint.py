@@ -0,0 +1,56 @@
+import pytest
+
+from Nodes import BinaryCheckpoint
+
+
+def _createFile(*records):
+    return BinaryCheckpoint.HEADER + b"".join(BinaryCheckpoint.encodeRecord(record_type, payload)
+                                              for record_type, payload in records)
+
+
+def test_readCheckpoint():
+    data = _createFile((BinaryCheckpoint.NODE_RECORD, {"node_id": "a", "data": {"node_id": "a", "value": 1}}),
+                       (BinaryCheckpoint.HISTORY_RECORD, {"node_id": "a", "data": {"temperature_history": [1, 2],
+                                                                                   "resources_gained_history": {}}}),
+                       (BinaryCheckpoint.CHECKPOINT_RECORD, {"tick": 1}),
+                       (BinaryCheckpoint.NODE_RECORD, {"node_id": "a", "data": {"node_id": "a", "value": 2}}),
+                       (BinaryCheckpoint.HISTORY_APPEND_RECORD, {"node_id": "a", "data": {"temperature_history": [3],
+                                                                                          "resources_gained_history": {"water": [4]}}}),
+                       (BinaryCheckpoint.CHECKPOINT_RECORD, {"tick": 2}))
+
+    result = BinaryCheckpoint.readCheckpoint(data)
+
+    assert result["current_tick"] == 2
+    assert result["nodes"] == [{"node_id": "a", "value": 2}]
+    assert result["histories"]["a"] == {"temperature_history": [1, 2, 3], "resources_gained_history": {"water": [4]}}
+
+
+@pytest.mark.parametrize("bytes_to_remove", [0, 1, 5])
+def test_readCheckpointIgnoresUnfinishedCheckpoint(bytes_to_remove):
+    data = _createFile((BinaryCheckpoint.NODE_RECORD, {"node_id": "a", "data": {"value": 1}}),
+                       (BinaryCheckpoint.CHECKPOINT_RECORD, {"tick": 1}),
+                       (BinaryCheckpoint.NODE_RECORD, {"node_id": "a", "data": {"value": 2}}))
+    # The last record can also be partially written.
+    data = data[:len(data) - bytes_to_remove]
+
+    result = BinaryCheckpoint.readCheckpoint(data)
+
+    assert result["current_tick"] == 1
+    assert result["nodes"] == [{"value": 1}]
+
+
+def test_decodeRecordsWrongHeader():
+    with pytest.raises(ValueError):
+        BinaryCheckpoint.decodeRecords(b"{\"nodes\": []}")
+
+
+@pytest.mark.parametrize("old_values, new_values, max_length, result", [([], [1, 2], 5, [1, 2]),
+                                                                        ([1, 2], [1, 2, 3], 5, [3]),
+                                                                        ([1, 2], [1, 2], 5, []),
+                                                                        ([1, 2, 3], [2, 3, 4], 3, [4]),
+                                                                        ([1, 1, 1], [1, 1, 1], 3, []),
+                                                                        ([1, 2, 3], [4, 5, 6], 3, [4, 5, 6]),
+                                                                        ([1, 2], [2, 2, 3], 5, None),  # Not full, so nothing can be dropped.
+                                                                        ([1, 2], [3], 5, None)])
+def test_getAppendedSamples(old_values, new_values, max_length, result):
+    assert BinaryCheckpoint.getAppendedSamples(old_values, new_values, max_length) == result
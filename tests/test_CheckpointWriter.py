@@ -0,0 +1,79 @@
+from threading import Event
+
+import pytest
+
+from Nodes.CheckpointWriter import CheckpointWriter
+
+
+def test_writeSnapshots():
+    written = []
+    writer = CheckpointWriter(written.append)
+
+    writer.submit({"tick": 1})
+    writer.submit({"tick": 2})
+    assert writer.flush(timeout = 5)
+
+    assert written == [{"tick": 1}, {"tick": 2}]
+    metrics = writer.getMetrics()
+    assert metrics["num_submitted"] == 2
+    assert metrics["num_written"] == 2
+    assert metrics["num_coalesced"] == 0
+    assert metrics["queue_size"] == 0
+    assert metrics["max_write_duration"] >= metrics["average_write_duration"] >= 0
+    writer.stop()
+
+
+def test_coalesceWhenWritingFallsBehind():
+    written = []
+    write_started = Event()
+    continue_writing = Event()
+
+    def slowWrite(snapshot):
+        write_started.set()
+        continue_writing.wait(5)
+        written.append(snapshot)
+
+    writer = CheckpointWriter(slowWrite, max_queue_size = 2)
+    writer.submit({"tick": 1})
+    assert write_started.wait(5)  # Writer is now busy with the first snapshot.
+
+    for tick in range(2, 6):
+        writer.submit({"tick": tick})
+    assert writer.getMetrics()["queue_size"] == 2
+    assert not writer.flush(timeout = 0.01)
+
+    continue_writing.set()
+    assert writer.flush(timeout = 5)
+
+    # Only the newest snapshots that were waiting should have been written.
+    assert written == [{"tick": 1}, {"tick": 4}, {"tick": 5}]
+    assert writer.getMetrics()["num_coalesced"] == 2
+    writer.stop()
+
+
+def test_stopWritesRemainingSnapshots():
+    written = []
+    writer = CheckpointWriter(written.append)
+    for tick in range(0, 2):
+        writer.submit({"tick": tick})
+
+    assert writer.stop(timeout = 5)
+
+    assert not writer.is_running
+    assert len(written) == 2
+    with pytest.raises(RuntimeError):
+        writer.submit({"tick": 3})
+
+
+def test_failedWrite():
+    def failingWrite(snapshot):
+        raise OSError("Disk is full")
+
+    writer = CheckpointWriter(failingWrite)
+    writer.submit({"tick": 1})
+    assert writer.flush(timeout = 5)
+
+    metrics = writer.getMetrics()
+    assert metrics["num_failed"] == 1
+    assert metrics["num_written"] == 0
+    writer.stop()
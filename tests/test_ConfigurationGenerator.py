@@ -0,0 +1,58 @@
+import pytest
+
+from Nodes.NodeEngine import NodeEngine
+from benchmarks.ConfigurationGenerator import generateConfiguration
+from benchmarks.run_benchmarks import compareWithBaseline
+
+
+@pytest.mark.parametrize("num_nodes, num_networks", [(10, 1), (54, 1), (200, 3)])
+def test_generateConfiguration(num_nodes, num_networks):
+    configuration = generateConfiguration(num_nodes, num_networks = num_networks)
+    assert len(configuration["nodes"]) == num_nodes
+    assert configuration == generateConfiguration(num_nodes, num_networks = num_networks)
+
+    engine = NodeEngine()
+    engine.deserialize(configuration)
+    for connection in configuration["connections"]:
+        # Networks are never connected with each other.
+        assert connection["from"].split("_")[0] == connection["to"].split("_")[0]
+        origin = engine.getNodeById(connection["from"])
+        target = engine.getNodeById(connection["to"])
+        assert connection["resource_type"] in origin._providable_resources
+        assert connection["resource_type"] in set(target.getAllResourcesRequiredPerTick()) | \
+            set(target._acceptable_resources)
+    assert len(engine.getConnectedComponents()) >= num_networks
+
+    engine.doTick()
+
+
+def test_generateConfigurationFanIn():
+    configuration = generateConfiguration(100, {"ResourceStorage": 1, "Lights": 1}, fan_in = 3)
+    lights = [node_id for node_id, data in configuration["nodes"].items() if data["type"] == "Lights"]
+    assert len(lights) == 50
+    for light in lights:
+        assert len([connection for connection in configuration["connections"] if connection["to"] == light]) == 3
+
+
+def test_generateConfigurationDifferentSeed():
+    assert generateConfiguration(50, seed = 1) != generateConfiguration(50, seed = 2)
+
+
+@pytest.mark.parametrize("kwargs", [{"num_nodes": 3, "num_networks": 2},
+                                    {"num_nodes": 10, "node_type_mix": {"Unobtainium": 1}},
+                                    {"num_nodes": 10, "node_type_mix": {"ResourceStorage": 1}},
+                                    {"num_nodes": 10, "fan_in": 0}])
+def test_generateConfigurationInvalid(kwargs):
+    with pytest.raises(ValueError):
+        generateConfiguration(**kwargs)
+
+
+def test_compareWithBaseline():
+    baseline = {"small": {"ticks_per_second": 100, "replan_iterations": 2, "peak_memory_mib": 10}}
+    assert compareWithBaseline({"small": {"ticks_per_second": 90, "replan_iterations": 2, "peak_memory_mib": 11}},
+                               baseline, 0.2) == []
+    assert compareWithBaseline({"other": {"ticks_per_second": 1, "replan_iterations": 9}}, baseline, 0.2) == []
+
+    regressions = compareWithBaseline({"small": {"ticks_per_second": 70, "replan_iterations": 3,
+                                                 "peak_memory_mib": 13}}, baseline, 0.2)
+    assert len(regressions) == 3
@@ -1,10 +1,13 @@
 from unittest.mock import MagicMock, patch
 
+import dbus
 import pytest
 
+from Nodes.EngineSnapshot import EngineSnapshot
 from Nodes.Node import Node
 from Nodes.NodesDBusService import NodesDBusService
 from Nodes.NodeEngine import NodeEngine
+from Nodes.TickProfiler import TickProfiler
 
 
 node_dict = {}
@@ -29,6 +32,9 @@ def node_engine():
     node_engine = MagicMock(spec=NodeEngine)
     node_engine.getNodeById = MagicMock(side_effect = lambda r: node_dict.get(r))
     node_engine.getNodeHistoryById = MagicMock(side_effect = lambda r: node_history_dict.get(r))
+    # Take the snapshot when it's requested, so changes to the nodes in the test are always visible.
+    node_engine.getSnapshot = MagicMock(side_effect = lambda: EngineSnapshot(1, 0, {
+        node_id: EngineSnapshot.createNodeState(node) for node_id, node in node_dict.items()}))
     return node_engine
 
 
@@ -100,6 +106,15 @@ def test_setPerformance(DBus, node):
         assert node.target_performance == 2000
 
 
+def test_setTargetPerformances(DBus, node_engine, node):
+    node_engine.generation = "some_generation"
+    with patch.dict(node_dict, {"zomg": node}):
+        assert DBus.setTargetPerformances({"zomg": 0.5, "whatever": 2}) == "some_generation"
+    assert node.target_performance == 0.5
+    node_engine.updateSnapshot.assert_called_once_with(["zomg"])
+    assert DBus.getEngineGeneration() == "some_generation"
+
+
 def test_isNodeActive(DBus):
     inactive_node = MagicMock(active = False)
     active_node = MagicMock(active = True)
@@ -142,6 +157,36 @@ def test_getResourcesProducedHistory(DBus):
         assert DBus.getResourcesProducedHistory("unknown_node") == {}
 
 
+def test_getHistoryWithResolution(DBus):
+    history = MagicMock(getTemperatureHistory = MagicMock(return_value = [10, 20]),
+                        getResourcesProvidedHistory = MagicMock(return_value = {"yay": [1, 2]}))
+
+    with patch.dict(node_history_dict, {"zomg": history}):
+        assert DBus.getTemperatureHistory("zomg", 10, 2) == [10, 20]
+        history.getTemperatureHistory.assert_called_once_with(2, 10)
+        # 0 means that all the samples should be provided.
+        assert DBus.getResourcesProvidedHistory("zomg", 100, 0) == {"yay": [1, 2]}
+        history.getResourcesProvidedHistory.assert_called_once_with(None, 100)
+
+
+def test_getHistoryStatistics(DBus):
+    statistics = {"temperature": {"temperature": {"min": [1], "mean": [2], "max": [3]},
+                                  "new_key": {"min": [], "mean": [], "max": []}},
+                  "resources_produced": {}}
+    history = MagicMock(getHistoryStatistics = MagicMock(return_value = statistics))
+
+    with patch.dict(node_history_dict, {"zomg": history}):
+        result = DBus.getHistoryStatistics("zomg", 10, 0)
+        assert result == statistics
+        history.getHistoryStatistics.assert_called_once_with(10, None)
+        assert DBus.getHistoryStatistics("unknown_node", 10, 0) == {}
+
+    # The empty levels can't be marshalled unless they have an explicit type.
+    assert isinstance(result["resources_produced"], dbus.Dictionary)
+    assert isinstance(result["temperature"]["new_key"], dbus.Dictionary)
+    assert isinstance(result["temperature"]["new_key"]["min"], dbus.Array)
+
+
 def test_getHistoryOffset(DBus):
     history = MagicMock(getTickOffset=MagicMock(return_value=20))
     with patch.dict(node_history_dict, {"history_node": history}):
@@ -149,6 +194,15 @@ def test_getHistoryOffset(DBus):
         assert DBus.getHistoryOffset("unknown_node") == 0
 
 
+def test_getHistoryMemoryUsage(DBus, node_engine):
+    history = MagicMock(getMemoryUsage=MagicMock(return_value=800))
+    node_engine.getHistoryMemoryUsage = MagicMock(return_value={"a": 800, "b": 400})
+    with patch.dict(node_history_dict, {"history_node": history}):
+        assert DBus.getHistoryMemoryUsage("history_node") == 800
+        assert DBus.getHistoryMemoryUsage("unknown_node") == 0
+        assert DBus.getHistoryMemoryUsage("") == 1200
+
+
 def test_addModifierToNode(DBus):
     mod_node = MagicMock()
     modifier = MagicMock()
@@ -187,3 +241,113 @@ def test_isNodeEnabled(DBus):
         assert DBus.isNodeEnabled("node")
         assert not DBus.isNodeEnabled("disabled_node")
         assert not DBus.isNodeEnabled("unknown_node")
+
+
+def test_getTickProfile(DBus, node_engine):
+    profiler = TickProfiler()
+    node_engine.getTickProfiler = MagicMock(return_value = profiler)
+
+    # Before the first tick (and without profiling the node classes) everything is empty.
+    profile = DBus.getTickProfile()
+    assert profile == profiler.getSummary()
+    assert isinstance(profile, dbus.Dictionary)
+    assert isinstance(profile["phases"], dbus.Dictionary)
+    assert isinstance(profile["node_classes"], dbus.Dictionary)
+    assert isinstance(profile["sub_ticks"], dbus.Array)
+
+    DBus.setNodeClassProfilingEnabled(True)
+    assert profiler.profile_node_classes
+
+
+def test_tickScheduler(DBus, node_engine):
+    scheduler = MagicMock()
+    scheduler.getStatistics = MagicMock(return_value = {"num_ticks": 2, "num_overruns": 1})
+    node_engine.getTickScheduler = MagicMock(return_value = scheduler)
+
+    assert DBus.getTickSchedulerStatistics() == {"num_ticks": 2, "num_overruns": 1}
+
+    DBus.setTickCatchUpPolicy("burst")
+    node_engine.setTickCatchUpPolicy.assert_called_once_with("burst")
+
+
+def test_getComponentDiagnostics(DBus, node_engine):
+    diagnostics = [{"nodes": ["a", "b"], "state": "active", "duration": 0.5}]
+    node_engine.getComponentDiagnostics = MagicMock(return_value = diagnostics)
+
+    assert DBus.getComponentDiagnostics() == diagnostics
+
+
+def test_getNodeSnapshot(DBus):
+    node = Node("zomg")
+    with patch.dict(node_dict, {"zomg": node}):
+        snapshot = DBus.getNodeSnapshot("zomg")
+    assert snapshot["node_id"] == "zomg"
+    assert snapshot["temperature"] == node.temperature
+    assert snapshot["health"] == node.health
+    assert DBus.getNodeSnapshot("unknown_node") == {}
+
+
+def test_getAllNodeSnapshots(DBus):
+    with patch.dict(node_dict, {"zomg": Node("zomg"), "omg": Node("omg")}):
+        assert [snapshot["node_id"] for snapshot in DBus.getAllNodeSnapshots()] == ["zomg", "omg"]
+
+
+def test_getAllStaticProperties(DBus):
+    with patch.dict(node_dict, {"zomg": Node("zomg", label = "Zomg")}):
+        properties = DBus.getAllStaticProperties()
+    assert properties["zomg"]["label"] == "Zomg"
+    assert properties["zomg"]["node_type"] == "Node"
+
+
+def test_gettersUseSnapshot(DBus, node_engine):
+    node = Node("zomg")
+    with patch.dict(node_dict, {"zomg": node}):
+        snapshot = EngineSnapshot.createFromNodes([node], 1, 0)
+    node_engine.getSnapshot = MagicMock(return_value = snapshot)
+    temperature = node.temperature
+    node._temperature += 200  # The state halfway through a tick; This should not be visible.
+
+    assert DBus.getTemperature("zomg") == temperature
+    assert DBus.getNodeSnapshot("zomg")["temperature"] == temperature
+    assert DBus.doesNodeExist("zomg")
+    assert not DBus.doesNodeExist("unknown_node")
+    assert DBus.getAllNodeIds() == ["zomg"]
+
+
+def test_changesUpdateSnapshot(DBus, node_engine, node):
+    with patch.dict(node_dict, {"zomg": node}):
+        DBus.setTargetPerformance("zomg", 0.5)
+        DBus.setNodeEnabled("zomg", False)
+    assert node_engine.updateSnapshot.call_count == 2
+    node_engine.updateSnapshot.assert_called_with(["zomg"])
+
+
+def test_tickCompletedSignal(DBus, node_engine):
+    node_engine.tick_count = 13  # The snapshot is what the readers see, so its tick must be sent.
+    node_engine.getSnapshot = MagicMock(return_value = EngineSnapshot(1, 12, {}))
+    node_engine.getExpiredModifiersLastTick = MagicMock(return_value = [("zomg", "BoostCoolingModifier")])
+    DBus.tickCompleted = MagicMock()
+
+    DBus._onTickCompleted()
+
+    DBus.tickCompleted.assert_called_once_with(12, [{"node_id": "zomg", "type": "BoostCoolingModifier"}])
+
+
+def test_getCurrentTickMatchesSnapshot(session_bus, bus_name):
+    engine = NodeEngine()
+    engine.registerNode(Node("zomg"))
+    service = NodesDBusService(engine, session_bus = session_bus, bus_name = bus_name)
+    assert service.getCurrentTick() == 0
+    ticks_while_publishing = []
+    publish_snapshot = engine._publishSnapshot
+
+    def publishSnapshot():
+        # The tick count of the engine was already increased, but the snapshot of the tick isn't published yet.
+        ticks_while_publishing.append((service.getCurrentTick(), engine.getSnapshot().tick_count))
+        publish_snapshot()
+
+    engine._publishSnapshot = publishSnapshot
+    engine.doTick(print_tick_info = False)
+
+    assert ticks_while_publishing == [(0, 0)]
+    assert service.getCurrentTick() == engine.getSnapshot().tick_count == 1
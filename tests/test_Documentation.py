@@ -18,6 +18,7 @@ from Nodes.ResourceStorage import ResourceStorage
 from Nodes.Valve import Valve
 from Nodes.WaterPurifier import WaterPurifier
 from Nodes.ResourcePump import ResourcePump
+from Nodes.TickProfiler import TickProfiler
 from Nodes.Lights import Lights
 from Nodes.Scanner import Scanner
 from Nodes.Toilets import Toilets
@@ -52,7 +53,8 @@ objects_to_check_for_documentation = [Node("whatever"),
                                       ResourcePump("bla", "water"),
                                       Lights("omg", 19),
                                       Scanner("fff", {}),
-                                      Toilets("omg")
+                                      Toilets("omg"),
+                                      TickProfiler()
                                       ]
 
 
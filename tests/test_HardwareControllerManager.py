@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock
+
+import dbus.exceptions
+import pytest
+
+from Server.HardwareControllerManager import HardwareControllerManager
+
+
+@pytest.fixture
+def engine():
+    engine = MagicMock()
+    engine.getAllNodeIds = MagicMock(return_value = ["e_to_h_valve", "h_to_e_valve"])
+    engine.getEngineGeneration = MagicMock(return_value = "1")
+    engine.setTargetPerformances = MagicMock(return_value = "1")
+    return engine
+
+
+@pytest.fixture
+def manager(engine):
+    manager = HardwareControllerManager(coalesce_window = 0.01)
+    manager._bus = MagicMock()
+    manager._bus.get_object = MagicMock(return_value = engine)
+    return manager
+
+
+def test_coalesceSensorValues(manager, engine):
+    on_sent = MagicMock()
+    manager.targetPerformancesSent.connect(on_sent)
+    # Don't let the flush thread send anything until all the values are in.
+    with manager._condition:
+        for value in range(100, 200, 10):
+            manager.updateController("Base-Control-941965", {"sensor_value": value})
+        manager.updateController("Base-Control-C64AF4", {"sensor_value": 64})
+        manager.updateController("Unknown-Controller", {"sensor_value": 12})
+    assert manager.flush(timeout = 5)
+
+    engine.setTargetPerformances.assert_called_once_with({"h_to_e_valve": pytest.approx(188 / 798),
+                                                          "e_to_h_valve": 0})
+    engine.checkAlive.assert_not_called()
+    on_sent.assert_called_once_with(["h_to_e_valve", "e_to_h_valve"])
+
+    statistics = manager.getIngestStatistics()
+    assert statistics["num_updates_received"] == 11
+    assert statistics["num_updates_coalesced"] == 9
+    assert statistics["num_updates_sent"] == 2
+    assert statistics["num_batches_sent"] == 1
+    assert statistics["pending_updates"] == 0
+    assert statistics["max_latency"] >= statistics["average_latency"] > 0
+
+
+def test_nodeExistenceIsCached(manager, engine):
+    manager.updateController("Base-Control-941965", {"sensor_value": 100})
+    assert manager.flush(timeout = 5)
+    manager.updateController("Base-Control-5F7023", {"sensor_value": 500})  # h_to_g_valve doesn't exist.
+    assert manager.flush(timeout = 5)
+
+    engine.getAllNodeIds.assert_called_once_with()
+    assert engine.setTargetPerformances.call_args[0][0] == {}
+    assert manager.getIngestStatistics()["num_updates_dropped"] == 1
+
+
+def test_newEngineGeneration(manager, engine):
+    manager.updateController("Base-Control-941965", {"sensor_value": 100})
+    assert manager.flush(timeout = 5)
+
+    # The engine was restarted with other nodes.
+    engine.getAllNodeIds = MagicMock(return_value = ["h_to_g_valve"])
+    engine.getEngineGeneration = MagicMock(return_value = "2")
+    engine.setTargetPerformances = MagicMock(return_value = "2")
+    manager.updateController("Base-Control-5F7023", {"sensor_value": 500})
+    assert manager.flush(timeout = 5)
+
+    assert engine.setTargetPerformances.call_count == 2
+    assert list(engine.setTargetPerformances.call_args[0][0]) == ["h_to_g_valve"]
+    assert manager.getIngestStatistics()["num_updates_sent"] == 2
+
+
+def test_engineUnreachable(manager, engine):
+    engine.setTargetPerformances = MagicMock(side_effect = dbus.exceptions.DBusException("Nope"))
+    manager.updateController("Base-Control-941965", {"sensor_value": 100})
+    assert manager.flush(timeout = 5)
+
+    # It should have been tried again, in case the engine was restarted.
+    assert engine.setTargetPerformances.call_count == 2
+    statistics = manager.getIngestStatistics()
+    assert statistics["num_updates_sent"] == 0
+    assert statistics["num_updates_dropped"] == 1
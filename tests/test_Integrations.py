@@ -1,14 +1,21 @@
 import json
+from threading import Event, Thread
+from unittest.mock import patch
 
 from Nodes.Modifiers.OverrideDefaultSafetyControlsModifier import OverrideDefaultSafetyControlsModifier
 from Nodes.NodeEngine import NodeEngine
 import pytest
 
+from Nodes.BinaryNodeStorage import BinaryNodeStorage
 from Nodes.NodeStorage import NodeStorage
 import os
+import shutil
 import math
 
 from Signal import Signal
+from tests.testHelpers import createEngineFromConfig, createEngineFromConfigs
+from Nodes import ParallelUpdate
+from Nodes.Util import getAllAttributes
 
 
 @pytest.mark.integration
@@ -59,6 +66,7 @@ def test_restoreFromFile(config_file, ticks_to_run):
     first_node = engine_with_storage.getNodeById(first_key)
     first_node.addModifier(OverrideDefaultSafetyControlsModifier(15))
     assert first_node.getModifiers()  # ensure that it was added
+    first_node._label = "Restored label"
 
     for _ in range(0, ticks_to_run):
         engine_with_storage.doTick()
@@ -68,8 +76,13 @@ def test_restoreFromFile(config_file, ticks_to_run):
     # Time to restore it!
     new_storage = NodeStorage(restored_engine)
     new_storage.storage_name = "test_storage.json"
+    restored_engine.getSnapshot()  # The restored state must also replace what was in the snapshot already.
     new_storage.restoreNodeState()
 
+    snapshot = restored_engine.getSnapshot()
+    assert snapshot.tick_count == ticks_to_run
+    assert snapshot.getNodeState(first_key)["label"] == "Restored label"
+
 
     # We need to remove the file after ourselves
     os.remove(f"{storage.storage_name}.json")
@@ -81,6 +94,26 @@ def test_restoreFromFile(config_file, ticks_to_run):
     storage.purgeAllRevisions()
 
 
+@pytest.mark.parametrize("config_file", ["MultiWaterTankConfig.json", "WaterTanksWithPumps.json", "GeneratorWaterCoolerConfiguration.json", "HydroponicsSetup.json"])
+def test_replanOnlyChangedNodes(config_file):
+    all_nodes_engine = createEngineFromConfig(config_file)
+    all_nodes_engine._replan_only_changed_nodes = False
+    changed_nodes_engine = createEngineFromConfig(config_file)
+
+    for _ in range(0, 20):
+        # The random order of the sub ticks is seeded by the tick count, but the seed is global. So reset it to ensure
+        # that both of them get the same order.
+        all_nodes_engine.resetSeed()
+        all_nodes_engine.doTick()
+        changed_nodes_engine.resetSeed()
+        changed_nodes_engine.doTick()
+        assert changed_nodes_engine.replan_iterations_last_tick == all_nodes_engine.replan_iterations_last_tick
+        assert changed_nodes_engine.replan_nodes_touched_last_tick <= all_nodes_engine.replan_nodes_touched_last_tick
+
+    # Both ways of replanning must result in the exact same state.
+    _compareStatesBetweenEngines(changed_nodes_engine, all_nodes_engine, rel_tol = 0)
+
+
 def _compareStatesBetweenEngines(engine_1, engine_2, rel_tol = 0.0001):
     for node_id, restored_node in engine_1.getAllNodes().items():
         original_node = engine_2.getNodeById(node_id)
@@ -89,9 +122,13 @@ def _compareStatesBetweenEngines(engine_1, engine_2, rel_tol = 0.0001):
 
         assert math.isclose(original_node._stored_heat, restored_node._stored_heat)
         not_matching_values = []
-        for prop, original_value in vars(original_node).items():
+        for prop, original_value in getAllAttributes(original_node).items():
 
             restored_value = getattr(restored_node, prop)
+            if prop in ("_incoming_connections_by_type", "_outgoing_connections_by_type"):
+                continue  # These only index the connections, which are already compared.
+            if prop == "_modified_property_cache":
+                continue  # Cache that is filled on demand; The modifiers themselves are compared.
             if isinstance(original_value, dict):
                 for key, value in original_value.items():
                     result = math.isclose(value, restored_value[key], rel_tol = rel_tol)
@@ -169,4 +206,241 @@ def test_restoreFromFileWithPerformanceChanges():
 
     assert len(engine.getAllNodes()) == len(engine_with_storage.getAllNodes())
 
-    storage.purgeAllRevisions()
\ No newline at end of file
+    storage.purgeAllRevisions()
+
+# The last one is the full base (configuration.json in the root of the project).
+@pytest.mark.parametrize("config_file", ["MultiWaterTankConfig.json", "GeneratorWaterCoolerConfiguration.json", "HydroponicsSetup.json",
+                                         "../../configuration.json"])
+def test_batchedThermalUpdate(config_file):
+    pytest.importorskip("numpy")
+    per_node_engine = createEngineFromConfig(config_file)
+    batched_engine = createEngineFromConfig(config_file)
+    batched_engine.setUseBatchedThermalUpdate(True)
+
+    for _ in range(0, 20):
+        per_node_engine.resetSeed()
+        per_node_engine.doTick()
+        batched_engine.resetSeed()
+        batched_engine.doTick()
+
+    _compareStatesBetweenEngines(batched_engine, per_node_engine, rel_tol = 1e-9)
+
+
+@pytest.mark.parametrize("checkpoints_per_compaction", [0, 3, 100])
+@pytest.mark.parametrize("config_file", ["MultiWaterTankConfig.json", "GeneratorWaterCoolerConfiguration.json", "HydroponicsSetup.json"])
+def test_restoreFromBinaryFile(config_file, checkpoints_per_compaction, tmp_path):
+    engine_with_storage = createEngineFromConfig(config_file)
+    storage = BinaryNodeStorage(engine_with_storage, checkpoints_per_compaction = checkpoints_per_compaction)
+    storage.storage_name = str(tmp_path / "test_storage")
+
+    first_node = next(iter(engine_with_storage.getAllNodes().values()))
+    first_node.addModifier(OverrideDefaultSafetyControlsModifier(15))
+
+    # Run for more ticks than the history keeps, so that the appended samples also push out old ones.
+    for _ in range(0, 60):
+        engine_with_storage.doTick()
+
+    # Both the binary and the JSON storage must be able to read the binary file.
+    json_path = str(tmp_path / "binary_data.json")
+    shutil.copy(storage.base_storage_path, json_path)
+    for storage_type, path in [(BinaryNodeStorage, storage.base_storage_path), (NodeStorage, json_path)]:
+        restored_engine = createEngineFromConfig(config_file)
+        new_storage = storage_type(restored_engine, store_on_tick = False)
+        new_storage.storage_name = path
+        new_storage.restoreNodeState()
+
+        assert restored_engine.tick_count == engine_with_storage.tick_count
+        _compareStatesBetweenEngines(restored_engine, engine_with_storage)
+        for node_id in engine_with_storage.getAllNodes():
+            restored_history = restored_engine.getNodeHistoryById(node_id).serialize()
+            assert restored_history == engine_with_storage.getNodeHistoryById(node_id).serialize()
+
+    storage.purgeAllRevisions()
+
+
+def test_binaryStorageOnlyWritesChanges(tmp_path):
+    engine = createEngineFromConfig("GeneratorWaterCoolerConfiguration.json")
+    storage = BinaryNodeStorage(engine, store_on_tick = False)
+    storage.storage_name = str(tmp_path / "test_storage")
+
+    engine.doTick()
+    storage.storeNodeState()
+    full_size = os.path.getsize(storage.base_storage_path)
+
+    # Nothing changed, so only the checkpoint record should be added.
+    storage.storeNodeState()
+    assert os.path.getsize(storage.base_storage_path) - full_size < 30
+
+    # A tick adds new history samples, but that should still be (a lot) smaller than all the data.
+    size_before_tick = os.path.getsize(storage.base_storage_path)
+    engine.doTick()
+    storage.storeNodeState()
+    assert os.path.getsize(storage.base_storage_path) - size_before_tick < full_size
+
+    storage.purgeAllRevisions()
+
+
+def test_restoreJsonFileWithBinaryStorage(tmp_path):
+    engine_with_storage = createEngineFromConfig("GeneratorWaterCoolerConfiguration.json")
+    storage = NodeStorage(engine_with_storage)
+    storage.storage_name = str(tmp_path / "test_storage")
+    for _ in range(0, 5):
+        engine_with_storage.doTick()
+
+    # The format is detected by the contents, not by the name of the file.
+    binary_path = str(tmp_path / "json_data.bin")
+    shutil.copy(storage.base_storage_path, binary_path)
+    restored_engine = createEngineFromConfig("GeneratorWaterCoolerConfiguration.json")
+    binary_storage = BinaryNodeStorage(restored_engine)
+    binary_storage.storage_name = binary_path
+    binary_storage.restoreNodeState()
+
+    _compareStatesBetweenEngines(restored_engine, engine_with_storage)
+    storage.purgeAllRevisions()
+
+
+@pytest.mark.parametrize("storage_type", [NodeStorage, BinaryNodeStorage])
+def test_restoreFromAsynchronouslyWrittenFile(storage_type, tmp_path):
+    engine_with_storage = createEngineFromConfig("GeneratorWaterCoolerConfiguration.json")
+    storage = storage_type(engine_with_storage, write_asynchronously = True)
+    storage.storage_name = str(tmp_path / "test_storage")
+
+    for _ in range(0, 20):
+        engine_with_storage.doTick()
+    assert storage.shutdown(timeout = 10)
+
+    metrics = storage.getWriterMetrics()
+    assert metrics["num_submitted"] == 20
+    assert metrics["num_written"] + metrics["num_coalesced"] == 20
+
+    restored_engine = createEngineFromConfig("GeneratorWaterCoolerConfiguration.json")
+    new_storage = storage_type(restored_engine, store_on_tick = False)
+    new_storage.storage_name = storage.base_storage_path
+    new_storage.restoreNodeState()
+
+    # Whatever was coalesced, the last tick must always be written.
+    assert restored_engine.tick_count == engine_with_storage.tick_count
+    _compareStatesBetweenEngines(restored_engine, engine_with_storage)
+    storage.purgeAllRevisions()
+
+
+@pytest.mark.parametrize("num_processes", [2, 3])
+@pytest.mark.parametrize("config_files", [["HydroponicsSetup.json"],
+                                          ["GeneratorWaterCoolerConfiguration.json", "WaterPurifierSetup.json", "HydroponicsSetupWithAnimalWaste.json"]])
+def test_parallelUpdate(config_files, num_processes):
+    if not ParallelUpdate.isParallelUpdateSupported():
+        pytest.skip("The parallel update requires fork")
+    serial_engine = createEngineFromConfigs(config_files)
+    parallel_engine = createEngineFromConfigs(config_files)
+    parallel_engine.setParallelUpdateProcesses(num_processes)
+
+    # Other tests leave idle (daemon) threads behind, which would make the engine fall back to the serial update.
+    with patch.object(ParallelUpdate, "isForkSafe", return_value = True), \
+            patch.object(ParallelUpdate, "updateInParallel", wraps = ParallelUpdate.updateInParallel) as update_in_parallel:
+        for _ in range(0, 10):
+            serial_engine.resetSeed()
+            serial_engine.doTick()
+            parallel_engine.resetSeed()
+            parallel_engine.doTick()
+    assert update_in_parallel.call_count == 10
+
+    # Updating the components in separate processes must give the exact same result.
+    _compareStatesBetweenEngines(parallel_engine, serial_engine, rel_tol = 0)
+
+
+def test_parallelUpdateWithOtherThread():
+    if not ParallelUpdate.isParallelUpdateSupported():
+        pytest.skip("The parallel update requires fork")
+    serial_engine = createEngineFromConfigs(["GeneratorWaterCoolerConfiguration.json", "WaterPurifierSetup.json"])
+    parallel_engine = createEngineFromConfigs(["GeneratorWaterCoolerConfiguration.json", "WaterPurifierSetup.json"])
+    parallel_engine.setParallelUpdateProcesses(2)
+    stop_thread = Event()
+    thread = Thread(target = stop_thread.wait)
+    thread.start()
+    try:
+        with patch.object(ParallelUpdate, "updateInParallel") as update_in_parallel:
+            serial_engine.resetSeed()
+            serial_engine.doTick()
+            parallel_engine.resetSeed()
+            parallel_engine.doTick()
+    finally:
+        stop_thread.set()
+        thread.join()
+
+    # Forking while another thread runs isn't safe, so the update must be done in this process.
+    update_in_parallel.assert_not_called()
+    _compareStatesBetweenEngines(parallel_engine, serial_engine, rel_tol = 0)
+
+
+@pytest.mark.parametrize("replan_only_changed_nodes", [True, False])
+def test_skipIdleComponents(replan_only_changed_nodes):
+    config_files = ["GeneratorWaterCoolerConfiguration.json", "WaterPurifierSetup.json", "HydroponicsSetup.json"]
+    all_components_engine = createEngineFromConfigs(config_files)
+    all_components_engine._skip_idle_components = False
+    skipping_engine = createEngineFromConfigs(config_files)
+    for engine in [all_components_engine, skipping_engine]:
+        engine._replan_only_changed_nodes = replan_only_changed_nodes
+        for node_id, node in engine.getAllNodes().items():
+            if node_id.startswith("1_"):
+                node.enabled = False
+
+    for _ in range(0, 10):
+        all_components_engine.resetSeed()
+        all_components_engine.doTick()
+        skipping_engine.resetSeed()
+        skipping_engine.doTick()
+        assert skipping_engine.replan_iterations_last_tick == all_components_engine.replan_iterations_last_tick
+
+    _compareStatesBetweenEngines(skipping_engine, all_components_engine, rel_tol = 0)
+
+    states = {tuple(component["nodes"]): component["state"] for component in skipping_engine.getComponentDiagnostics()}
+    assert states[("1_purifier", "1_dirty_water_storage", "1_water_storage", "1_animal_waste_storage")] == "disabled"
+    assert states[("2_oxygen_storage", )] == "no_requests"
+    assert states[("0_fuel_tank", "0_generator", "0_fluid_cooler_1", "0_water_tank", "0_battery")] == "active"
+
+
+def _getResourceTotals(engine):
+    totals = {"received": {}, "provided": {}, "stored": {}}
+    for node in engine.getAllNodes().values():
+        for key, resources in [("received", node.getResourcesReceivedLastTick()),
+                               ("provided", node.getResourcesProvidedLastTick())]:
+            for resource_type, amount in resources.items():
+                totals[key][resource_type] = totals[key].get(resource_type, 0.) + amount
+        resource_type = getattr(node, "_resource_type", None)
+        if resource_type is not None:
+            totals["stored"][resource_type] = totals["stored"].get(resource_type, 0.) + node.amount_stored
+    return totals
+
+
+@pytest.mark.parametrize("config_file", ["MultiWaterTankConfig.json", "WaterTanksWithPumps.json",
+                                         "GeneratorWaterCoolerConfiguration.json", "HydroponicsSetup.json",
+                                         "HydroponicsSetupWithAnimalWaste.json", "MedicineCreator.json",
+                                         "OilExtractor.json", "PlantPress.json", "WaterPurifierSetup.json",
+                                         "WaterPurifierWithOxygenSetup.json"])
+def test_collapseQuiescentNodes(config_file):
+    sub_ticks_engine = createEngineFromConfig(config_file)
+    collapsing_engine = createEngineFromConfig(config_file)
+    collapsing_engine.setCollapseQuiescentNodes(True)
+
+    for _ in range(0, 20):
+        sub_ticks_engine.resetSeed()
+        sub_ticks_engine.doTick()
+        collapsing_engine.resetSeed()
+        collapsing_engine.doTick()
+
+        sub_ticks_totals = _getResourceTotals(sub_ticks_engine)
+        collapsing_totals = _getResourceTotals(collapsing_engine)
+        for key, totals in sub_ticks_totals.items():
+            assert collapsing_totals[key].keys() == totals.keys()
+            for resource_type, amount in totals.items():
+                assert collapsing_totals[key][resource_type] == pytest.approx(amount, rel = 1e-9), \
+                    f"Total {key} {resource_type} didn't match"
+
+
+def test_collapseQuiescentNodesIsUsed():
+    engine = createEngineFromConfig("HydroponicsSetup.json")
+    engine.setCollapseQuiescentNodes(True)
+    engine.doTick()
+
+    # The oxygen storage isn't connected to anything, so it has nothing to do.
+    assert engine.num_quiescent_nodes_last_tick >= 1
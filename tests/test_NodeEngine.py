@@ -5,6 +5,8 @@ from Nodes.Node import Node
 from Nodes.Generator import Generator  # Your IDE lies. It needs this.
 from Nodes.FluidCooler import FluidCooler
 import pytest
+import time
+from threading import Thread
 
 from Nodes.TemperatureHandlers.TemperatureHandler import TemperatureHandler
 
@@ -20,6 +22,15 @@ def test_registerNode():
     assert engine.getAllNodeIds() == ["ZOMG"]
 
 
+def test_generation():
+    engine = NodeEngine.NodeEngine()
+    generation = engine.generation
+    assert generation != NodeEngine.NodeEngine().generation
+
+    engine.registerNode(createNode("ZOMG"))
+    assert engine.generation != generation
+
+
 def test_registerDuplicateId():
     engine = NodeEngine.NodeEngine()
     engine.registerNode(createNode("ZOMG"))
@@ -39,11 +50,54 @@ def test_replanReservations():
     assert node.replanReservations.call_count == 2
 
 
+def test_replanReservationsAllNodes():
+    engine = NodeEngine.NodeEngine()
+    engine._replan_only_changed_nodes = False
+
+    node = createNode("test")
+    node.requiresReplanning = MagicMock(side_effect = [True, True, False])
+    engine.registerNode(node)
+
+    engine._replanReservations()
+
+    assert node.replanReservations.call_count == 2
+    assert node.updateReservations.call_count == 2
+    assert engine.replan_iterations_last_tick == 3
+
+
+def test_replanReservationsOnlyUpdatesProviders():
+    engine = NodeEngine.NodeEngine()
+    provider = createNode("provider")
+    consumer = createNode("consumer")
+    unrelated = createNode("unrelated")
+    for node in [provider, consumer, unrelated]:
+        node.requiresReplanning = MagicMock(return_value = False)
+        engine.registerNode(node)
+    consumer.requiresReplanning = MagicMock(side_effect = [True, False])
+
+    connection = MagicMock(origin = provider, target = consumer)
+    consumer.getAllIncomingConnections = MagicMock(return_value = [connection])
+    provider.getAllOutgoingConnections = MagicMock(return_value = [connection])
+
+    engine._replanReservations()
+
+    consumer.replanReservations.assert_called_once()
+    provider.updateReservations.assert_called_once()
+    unrelated.updateReservations.assert_not_called()
+    # The unrelated node only gets checked in the first iteration.
+    assert unrelated.requiresReplanning.call_count == 1
+    assert engine.replan_iterations_last_tick == 2
+    # 3 checks in the first iteration, one provider update and a single check in the second iteration
+    assert engine.replan_nodes_touched_last_tick == 5
+
+
 def test_doTick():
     engine = NodeEngine.NodeEngine()
     engine._sub_ticks = 1
     node = createNode("test")
     node.requiresReplanning = MagicMock(return_value = False)
+    # Without any requested resources, the reservations would be skipped.
+    node.getAllIncomingConnections = MagicMock(return_value = [MagicMock(reserved_requested_amount = 1)])
 
     engine.registerNode(node)
 
@@ -94,6 +148,21 @@ def test_getNodeHistoryById():
     assert engine.getNodeHistoryById("BLARG") is None
 
 
+def test_setHistoryDepth():
+    engine = NodeEngine.NodeEngine()
+    engine.registerNode(createNode("before"))
+    engine.setHistoryDepth(10000)
+    engine.registerNode(createNode("after"))
+
+    assert engine.history_depth == 10000
+    assert engine.getNodeHistoryById("before").max_elements_to_store == 10000
+    assert engine.getNodeHistoryById("after").max_elements_to_store == 10000
+    assert engine.getHistoryMemoryUsage() == {"before": 80000, "after": 80000}
+
+    with pytest.raises(ValueError):
+        engine.setHistoryDepth(0)
+
+
 # This is a tad more than just a unit test, but it's good to have it since it checks if nodes can be loaded at all
 @pytest.mark.parametrize("serialized, all_ids", [({"blarg": {"type": "Node"}}, ["blarg"]),
                                                  ({"omg": {"type": "Generator"}, "zomg": {"type": "Node"}}, ["omg", "zomg"]),
@@ -129,6 +198,56 @@ def test_serializeConnection():
     assert node_b_connections[0].origin == node_a
 
 
+def test_connectedComponents():
+    engine = NodeEngine.NodeEngine()
+    nodes = [Node(node_id) for node_id in ["a", "b", "c"]]
+    for node in nodes:
+        node._providable_resources.add("energy")
+        node._acceptable_resources.add("energy")
+        engine.registerNode(node)
+
+    assert engine.getConnectedComponents() == [["a"], ["b"], ["c"]]
+
+    # Connecting nodes merges their components, regardless of the direction of the connection.
+    nodes[2].connectWith("energy", nodes[0])
+    assert engine.getConnectedComponents() == [["a", "c"], ["b"]]
+
+
+def test_componentWithoutRequests():
+    engine = NodeEngine.NodeEngine()
+    engine._sub_ticks = 1
+    node = createNode("test")
+    node.requiresReplanning = MagicMock(return_value = False)
+    engine.registerNode(node)
+
+    engine.doTick()
+
+    # Nothing was requested, so there is nothing to reserve. The update is still needed.
+    node.updateReservations.assert_not_called()
+    node.requiresReplanning.assert_not_called()
+    node.update.assert_called_once()
+    assert engine.getComponentDiagnostics()[0]["state"] == NodeEngine.COMPONENT_WITHOUT_REQUESTS
+
+    engine._skip_idle_components = False
+    engine.doTick()
+    node.updateReservations.assert_called_once()
+
+
+def test_disabledComponent():
+    engine = NodeEngine.NodeEngine()
+    engine._sub_ticks = 5
+    node = createNode("test")
+    node.enabled = False
+    engine.registerNode(node)
+
+    engine.doTick()
+
+    # The cleanup only needs to be done once, since nothing is updated.
+    assert node.cleanupAfterUpdate.call_count == 1
+    diagnostics = engine.getComponentDiagnostics()
+    assert diagnostics == [{"nodes": ["test"], "state": NodeEngine.COMPONENT_DISABLED, "duration": 0.}]
+
+
 def test_tickCount():
     engine = NodeEngine.NodeEngine()
     assert engine.tick_count == 0
@@ -140,6 +259,141 @@ def test_tickCount():
     assert engine.tick_count == 2
 
 
+def test_runTicks():
+    engine = NodeEngine.NodeEngine()
+    engine._sub_ticks = 1
+    node = createNode("test")
+    node.requiresReplanning = MagicMock(return_value = False)
+    engine.registerNode(node)
+
+    duration = engine.runTicks(5)
+
+    assert engine.tick_count == 5
+    assert node.postUpdate.call_count == 5
+    assert duration >= 0
+
+
+def test_startAndStop():
+    engine = NodeEngine.NodeEngine()
+    assert engine.paused
+
+    engine.setTickInterval(0.01)
+    engine.start()
+    assert not engine.paused
+    deadline = time.monotonic() + 5
+    while engine.tick_count < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    engine.stop()
+    assert engine.paused
+    assert engine.tick_count >= 2
+    assert engine.getTickScheduler().getStatistics()["num_ticks"] >= 2
+    engine.getTickScheduler().shutdown(timeout = 5)
+
+
+@pytest.mark.parametrize("emit_signals, expected_call_count", [(True, 3), (False, 0)])
+def test_runTicksSignals(emit_signals, expected_call_count):
+    engine = NodeEngine.NodeEngine()
+    tick_completed = MagicMock()
+    engine.tickCompleted.connect(tick_completed)
+
+    engine.runTicks(3, emit_signals = emit_signals)
+
+    assert tick_completed.call_count == expected_call_count
+    assert engine.tick_count == 3
+
+
+@pytest.mark.parametrize("profile_node_classes", [True, False])
+def test_tickProfile(profile_node_classes):
+    engine = NodeEngine.NodeEngine()
+    engine._sub_ticks = 2
+    engine.getTickProfiler().profile_node_classes = profile_node_classes
+    node = createNode("test")
+    node.requiresReplanning = MagicMock(return_value = False)
+    engine.registerNode(node)
+
+    engine.doTick()
+
+    node.preUpdate.assert_called_once()
+    assert node.update.call_count == 2
+    node.postUpdate.assert_called_once()
+
+    profile = engine.getTickProfiler().getTickProfiles()[0]
+    assert profile["tick"] == 1
+    assert set(profile["phases"].keys()) == {"update_outside_temperature", "pre_update", "update_reservations",
+                                             "replan_reservations", "update", "post_update", "publish_snapshot"}
+    assert len(profile["sub_ticks"]) == 2
+    assert profile["sub_tick_count"] == 2
+    assert ("MagicMock" in profile["node_classes"]) == profile_node_classes
+
+
+def test_snapshot():
+    engine = NodeEngine.NodeEngine()
+    engine.deserialize({"nodes": {"generator": {"type": "Generator", "fuel_type": "fuel", "energy_factor": 1}},
+                        "connections": []})
+    snapshot = engine.getSnapshot()
+    assert snapshot.getAllNodeIds() == ["generator"]
+    assert snapshot.tick_count == 0
+
+    engine.doTick()
+    new_snapshot = engine.getSnapshot()
+    assert new_snapshot.version > snapshot.version
+    assert new_snapshot.tick_count == 1
+    with pytest.raises(TypeError):
+        new_snapshot.getNodeState("generator")["temperature"] = 12  # type: ignore
+
+    engine.getNodeById("generator").target_performance = 0.5
+    assert engine.getSnapshot().getNodeState("generator")["target_performance"] == 1
+    assert engine.updateSnapshot(["generator"])
+    assert engine.getSnapshot().getNodeState("generator")["target_performance"] == 0.5
+    assert engine.getSnapshot().version == new_snapshot.version + 1
+
+    # Nothing is published while a tick is in progress (the end of the tick will do that).
+    with engine._update_lock:
+        result = []
+        thread = Thread(target = lambda: result.append(engine.updateSnapshot()))
+        thread.start()
+        thread.join(5)
+        assert result == [False]
+
+
+def test_adaptiveSubTicks():
+    engine = NodeEngine.NodeEngine()
+    node = createNode("test")
+    node.requiresReplanning = MagicMock(return_value = False)
+    engine.registerNode(node)
+
+    with pytest.raises(ValueError):
+        engine.setAdaptiveSubTicks(True, min_sub_ticks = 10, max_sub_ticks = 5)
+
+    engine.setAdaptiveSubTicks(True, min_sub_ticks = 3, max_sub_ticks = 12)
+    for _ in range(0, 5):
+        engine.doTick()
+
+    # Nothing changes at all, so the minimum should be used once that is known.
+    sub_tick_counts = [profile["sub_tick_count"] for profile in engine.getTickProfiler().getTickProfiles()]
+    assert sub_tick_counts == [12, 12, 12, 3, 3]
+    assert len(engine.getTickProfiler().getTickProfiles()[-1]["sub_ticks"]) == 3
+
+    engine.setAdaptiveSubTicks(False)
+    assert engine.sub_ticks == 10
+
+
+def test_expiredModifiersLastTick():
+    engine = NodeEngine.NodeEngine()
+    node = createNode("test")
+    node.requiresReplanning = MagicMock(return_value = False)
+    expired_modifier = MagicMock()
+    node.updateModifiers = MagicMock(return_value = [expired_modifier])
+    engine.registerNode(node)
+
+    engine.doTick()
+    assert engine.getExpiredModifiersLastTick() == [("test", "MagicMock")]
+
+    node.updateModifiers = MagicMock(return_value = [])
+    engine.doTick()
+    assert engine.getExpiredModifiersLastTick() == []
+
+
 def test_outsideTemperatureHandler():
     engine = NodeEngine.NodeEngine()
 
@@ -1,5 +1,7 @@
 from unittest.mock import MagicMock
 
+import pytest
+
 from Nodes.Node import Node
 from Nodes.NodeHistory import NodeHistory
 
@@ -36,4 +38,117 @@ def test_getResourcesRequiredPerTick():
     node.postUpdate()
     assert history.getResourcesGainedHistory() == {"fuel": [0]}
     node.postUpdate()
-    assert history.getResourcesGainedHistory() == {"fuel": [0, 0]}
\ No newline at end of file
+    assert history.getResourcesGainedHistory() == {"fuel": [0, 0]}
+
+def test_maxElementsToStore():
+    node = Node("blarg!")
+    history = NodeHistory(node, max_elements_to_store = 3)
+    for _ in range(0, 5):
+        node.postUpdate()
+
+    assert len(history.getTemperatureHistory()) == 3
+    assert history.getTickOffset() == 2
+    assert len(history.getTemperatureHistory(num_samples = 2)) == 2
+
+    history.setMaxElementsToStore(2)
+    assert len(history.getTemperatureHistory()) == 2
+    assert history.max_elements_to_store == 2
+
+
+def test_getLastSamples():
+    node = Node("blarg!")
+    node.getResourcesProducedThisTick = MagicMock(side_effect = [{"energy": 200}, {"energy": 900}, {"energy": 300}])
+    history = NodeHistory(node)
+    for _ in range(0, 3):
+        node.postUpdate()
+
+    assert history.getResourcesProducedHistory(num_samples = 2) == {"energy": [900, 300]}
+    assert history.getResourcesProducedHistory() == {"energy": [200, 900, 300]}
+
+
+def test_getMemoryUsage():
+    node = Node("blarg!")
+    node.getResourcesProducedThisTick = MagicMock(return_value = {"energy": 200})
+    history = NodeHistory(node, max_elements_to_store = 100)
+    # Only the temperature is tracked from the start.
+    assert history.getMemoryUsage() == 100 * 8
+    node.postUpdate()
+    # The space for all the samples is reserved as soon as something is tracked.
+    memory_usage = history.getMemoryUsage()
+    assert memory_usage > 100 * 8
+    assert memory_usage % (100 * 8) == 0
+
+
+def test_serializeRoundTrip():
+    node = Node("blarg!")
+    node.getResourcesReceivedThisTick = MagicMock(return_value = {"water": 2})
+    history = NodeHistory(node, max_elements_to_store = 4)
+    for _ in range(0, 6):
+        node.postUpdate()
+
+    restored_history = NodeHistory(Node("blarg!"), max_elements_to_store = 4)
+    restored_history.deserialize(history.serialize())
+
+    assert restored_history.serialize() == history.serialize()
+
+
+def test_resolutions():
+    node = Node("blarg!")
+    node.getResourcesProducedThisTick = MagicMock(side_effect = [{"energy": value} for value in range(0, 25)])
+    history = NodeHistory(node, max_elements_to_store = 2)
+    for _ in range(0, 25):
+        node.postUpdate()
+
+    # Only the last 2 ticks are stored with the default resolution.
+    assert history.getResourcesProducedHistory() == {"energy": [23, 24]}
+    # The points with a resolution of 10 are the mean of those ticks. The last 5 ticks are not a complete point yet.
+    assert history.getResourcesProducedHistory(resolution = 10) == {"energy": [4.5, 14.5]}
+    assert history.getResourcesProducedHistory(num_samples = 1, resolution = 10) == {"energy": [14.5]}
+    # Not enough ticks to make a single point of 100.
+    assert history.getResourcesProducedHistory(resolution = 100) == {"energy": []}
+
+    statistics = history.getHistoryStatistics(10)
+    assert statistics["resources_produced"]["energy"] == {"min": [0, 10], "mean": [4.5, 14.5], "max": [9, 19]}
+
+    assert history.getTickOffset() == 23
+    assert history.getTickOffset(10) == 0
+
+    with pytest.raises(ValueError):
+        history.getTemperatureHistory(resolution = 3)
+
+
+def test_resolutionOffset():
+    node = Node("blarg!")
+    history = NodeHistory(node, max_elements_to_store = 2)
+    for _ in range(0, 45):
+        node.postUpdate()
+
+    # 4 points of 10 ticks were made, of which only the last 2 are stored.
+    assert len(history.getTemperatureHistory(resolution = 10)) == 2
+    assert history.getTickOffset(10) == 20
+
+
+def test_resolutionOfLaterKey():
+    node = Node("blarg!")
+    # Nothing is produced in the first 5 ticks.
+    node.getResourcesProducedThisTick = MagicMock(side_effect = [{}] * 5 + [{"energy": tick} for tick in range(5, 45)])
+    history = NodeHistory(node, max_elements_to_store = 2)
+    for _ in range(0, 45):
+        node.postUpdate()
+
+    # The points must hold the same ticks as the other points, so they match the offset.
+    assert history.getTickOffset(10) == 20
+    assert history.getResourcesProducedHistory(resolution = 10) == {"energy": [24.5, 34.5]}
+
+
+def test_deserializeResolutions():
+    history = NodeHistory(Node("blarg!"), max_elements_to_store = 20)
+    history.deserialize({"resources_produced_history": {"energy": list(range(3, 15))},
+                         "resources_gained_history": {},
+                         "resources_provided_history": {},
+                         "temperature_history": list(range(0, 15))})
+
+    assert history.getTickOffset() == 0
+    assert history.getTemperatureHistory(resolution = 10) == [4.5]
+    # Energy was only produced from the 3rd tick on.
+    assert history.getResourcesProducedHistory(resolution = 10) == {"energy": [6]}
@@ -1,5 +1,8 @@
+from threading import Event, Thread
 from unittest.mock import MagicMock, patch
 
+import dbus.exceptions
+
 import pytest
 
 from Server.Blueprint import blueprint, api
@@ -8,7 +11,7 @@ from Server.Server import Server
 from Server.ControllerNamespace import control_namespace
 from Server.RFIDNamespace import RFID_namespace
 from Server.Database import getDBSession
-from Server.models import User, Ability, AccessCard
+from Server.models import User, Ability, AccessCard, Modifier
 
 default_property_dict = {}
 
@@ -20,6 +23,11 @@ def getNodeAttribute(*args, **kwargs):
         return default_property_dict.get(kwargs["attribute_name"])
 
 
+def getLastSamples(samples, num_samples):
+    # The engine returns all the samples if num_samples is 0
+    return samples[-num_samples:] if num_samples else samples
+
+
 @pytest.fixture
 def app():
     with patch("dbus.SessionBus"):
@@ -42,12 +50,14 @@ def app():
     mocked_dbus.getCustomDescription = MagicMock(side_effect=lambda r: getNodeAttribute(r, attribute_name="custom_description"))
     mocked_dbus.getLabel = MagicMock(side_effect=lambda r: getNodeAttribute(r, attribute_name = "label"))
     mocked_dbus.getNodeType = MagicMock(side_effect = lambda r: getNodeAttribute(r, attribute_name="node_type"))
-    mocked_dbus.getTemperatureHistory = MagicMock(side_effect=lambda r: getNodeAttribute(r, attribute_name="temperature_history"))
+    mocked_dbus.getTemperatureHistory = MagicMock(side_effect=lambda r, resolution, num_samples: getLastSamples(getNodeAttribute(r, attribute_name="temperature_history"), num_samples))
     mocked_dbus.getAdditionalProperties = MagicMock(side_effect=lambda r: getNodeAttribute(r, attribute_name="additional_properties"))
     mocked_dbus.getMaxAdditionalPropertyValue = MagicMock(side_effect=lambda r, s: getNodeAttribute(r, attribute_name="additional_property_max")[s])
     mocked_dbus.getAdditionalPropertyValue = MagicMock(side_effect=lambda r, s: getNodeAttribute(r, attribute_name="additional_property_value")[s])
-    mocked_dbus.getAdditionalPropertyHistory = MagicMock(side_effect=lambda r, s: getNodeAttribute(r, attribute_name="additional_property_history")[s])
+    mocked_dbus.getAdditionalPropertyHistory = MagicMock(side_effect=lambda r, s, resolution, num_samples: getLastSamples(getNodeAttribute(r, attribute_name="additional_property_history")[s], num_samples))
     mocked_dbus.getAllNodeIds = MagicMock(return_value = known_ids)
+    mocked_dbus.getNodeSnapshot = MagicMock(side_effect=lambda r: getNodeAttribute(r, attribute_name="snapshot") or {})
+    mocked_dbus.getAllStaticProperties = MagicMock(side_effect=lambda: {"default": dict(default_property_dict)})
     mocked_dbus.getMinPerformance = MagicMock(side_effect=lambda r: getNodeAttribute(r, attribute_name="min_performance"))
     mocked_dbus.getMaxPerformance = MagicMock(side_effect=lambda r: getNodeAttribute(r, attribute_name="max_performance"))
     mocked_dbus.getMaxSafeTemperature = MagicMock(side_effect=lambda r: getNodeAttribute(r, attribute_name="max_safe_temperature"))
@@ -160,6 +170,29 @@ def test_temperatureHistoryGetLast(client):
     assert response.data.strip() == b'[20, 30]'
 
 
+def test_temperatureHistoryResolution(client):
+    with patch.dict(default_property_dict, {"temperature_history": [20, 30]}):
+        response = client.get("/node/default/temperature/history/?resolution=10&showLast=5")
+    assert response.status_code == 200
+    client.application.getMockedClient().getTemperatureHistory.assert_called_with("default", 10, 5)
+
+    # Only the resolutions that the engine keeps can be requested.
+    response = client.get("/node/default/temperature/history/?resolution=3")
+    assert response.status_code == 400
+
+
+def test_getHistoryStatistics(client):
+    statistics = {"temperature": {"temperature": {"min": [20], "mean": [25], "max": [30]}}}
+    mocked_dbus = client.application.getMockedClient()
+    mocked_dbus.getHistoryStatistics = MagicMock(return_value = statistics)
+    response = client.get("/node/default/history_statistics/?resolution=100")
+
+    assert response.status_code == 200
+    assert response.json == {"offset": 0, "temperature": {"temperature": {"min": [20], "mean": [25], "max": [30]}}}
+    mocked_dbus.getHistoryStatistics.assert_called_once_with("default", 100, 0)
+    mocked_dbus.getHistoryOffset.assert_called_once_with("default", 100)
+
+
 def test_putPerformance(client):
     response = client.put("/node/default/performance/", data = {"performance": 200})
     assert response.status_code == 200
@@ -200,6 +233,39 @@ def test_getAllNodeIds(client):
     assert response.data.strip() == b'[{"yay": 12}, {"yay": 12}]'
 
 
+def createSnapshot(node_id):
+    return {"node_id": node_id, "temperature": 200., "enabled": True, "active": True, "performance": 1.,
+            "target_performance": 1., "min_performance": 0.5, "max_performance": 1.5, "max_safe_temperature": 900.,
+            "heat_convection": 0.5, "heat_emissivity": 200., "health": 100., "is_temperature_dependant": False, "optimal_temperature": 300., "effectiveness_factor": 1.,
+            "resources_required": {"fuel": 2.}, "optional_resources_required": {}, "resources_received": {"fuel": 1.},
+            "resources_produced": {}, "resources_provided": {},
+            "additional_properties": [{"key": "health", "value": 100., "max_value": 100.}]}
+
+
+def test_getNodeFromSnapshot(client):
+    with patch.dict(default_property_dict, {"snapshot": createSnapshot("default"), "surface_area": 200,
+                                            "description": "THE BEST NODE", "node_type": "Generator"}):
+        response = client.get("/node/default/")
+
+    assert response.status_code == 200
+    assert response.json["surface_area"] == 200
+    assert response.json["description"] == "THE BEST NODE"
+    assert response.json["node_type"] == "Generator"
+    assert response.json["resources_required"] == [{"resource_type": "fuel", "value": 2}]
+    assert response.json["additional_properties"] == [{"key": "health", "value": 100, "max_value": 100}]
+
+
+def test_getAllNodesFromSnapshots(client):
+    client.application.getMockedClient().getAllNodeSnapshots = MagicMock(return_value = [createSnapshot("zomg"),
+                                                                                        createSnapshot("omg")])
+    response = client.get("/node/")
+
+    assert response.status_code == 200
+    assert [node["node_id"] for node in response.json] == ["zomg", "omg"]
+    # The full listing should be done in a single call.
+    client.application.getMockedClient().getNodeSnapshot.assert_not_called()
+
+
 def test_getAdditionalPropertyValue(client):
     with patch.dict(default_property_dict, {"additional_properties": ["zomg"], "additional_property_value": {"zomg": 32}}):
         response = client.get("/node/default/zomg/")
@@ -225,6 +291,18 @@ def test_getAllProperties(client):
     assert response.data.strip() == b'{"offset": 0, "zomg": [12, 30], "temperature": [20, 21]}'
 
 
+def test_getAllPropertiesShowLast(client):
+    data = {"additional_properties": ["zomg"],
+            "additional_property_value": {"zomg": 32},
+            "additional_property_history": {"zomg": [12, 30]},
+            "temperature_history": [20, 21]}
+    with patch.dict(default_property_dict, data):
+        response = client.get("/node/default/all_property_chart_data/?showLast=1&resolution=10")
+
+    assert response.data.strip() == b'{"offset": 0, "zomg": [30], "temperature": [21]}'
+    client.application.getMockedClient().getHistoryOffset.assert_called_with("default", 10)
+
+
 def test_getAdditionalPropertyHistory(client):
     data = {"additional_properties": ["zomg"],
             "additional_property_value": {"zomg": 32},
@@ -233,4 +311,157 @@ def test_getAdditionalPropertyHistory(client):
     with patch.dict(default_property_dict, data):
         response = client.get("/node/default/zomg/history/")
 
-    assert response.data.strip() == b'[12, 30]'
\ No newline at end of file
+    assert response.data.strip() == b'[12, 30]'
+
+def test_getTickProfile(client):
+    client.application.getMockedClient().getTickProfile = MagicMock(return_value = {"num_ticks": 2, "total": 0.5})
+    response = client.get("/profile")
+    assert response.status_code == 200
+    assert response.json == {"num_ticks": 2, "total": 0.5}
+
+
+def test_getComponentDiagnostics(client):
+    diagnostics = [{"nodes": ["generator"], "state": "disabled", "duration": 0.}]
+    client.application.getMockedClient().getComponentDiagnostics = MagicMock(return_value = diagnostics)
+    response = client.get("/profile/components")
+    assert response.status_code == 200
+    assert response.json == diagnostics
+
+
+def test_setNodeClassProfilingEnabled(client):
+    response = client.put("/profile/node_classes", json = {"value": True})
+    assert response.status_code == 200
+    client.application.getMockedClient().setNodeClassProfilingEnabled.assert_called_once_with(True)
+
+
+def test_responseCachedUntilNextTick(client):
+    mocked_dbus = client.application.getMockedClient()
+    mocked_dbus.getCurrentTick = MagicMock(return_value = 1)
+    with patch.dict(default_property_dict, {"temperature_history": [20, 30]}):
+        client.get("/node/default/temperature/history/")
+    with patch.dict(default_property_dict, {"temperature_history": [20, 30, 40]}):
+        # Still the same tick, so it should provide the cached data
+        response = client.get("/node/default/temperature/history/")
+        assert response.json == [20, 30]
+
+        mocked_dbus.getCurrentTick = MagicMock(return_value = 2)
+        response = client.get("/node/default/temperature/history/")
+        assert response.json == [20, 30, 40]
+
+    assert mocked_dbus.getTemperatureHistory.call_count == 2
+
+
+def test_responseCacheInvalidatedByChange(client):
+    mocked_dbus = client.application.getMockedClient()
+    mocked_dbus.getCurrentTick = MagicMock(return_value = 1)
+    with patch.dict(default_property_dict, {"snapshot": createSnapshot("default")}):
+        client.get("/node/default/")
+        client.get("/node/default/")
+        assert mocked_dbus.getNodeSnapshot.call_count == 1
+
+        client.put("/node/default/enabled/")
+        client.get("/node/default/")
+        assert mocked_dbus.getNodeSnapshot.call_count == 2
+
+
+def test_staticPropertiesRequestedOnce(client):
+    mocked_dbus = client.application.getMockedClient()
+    with patch.dict(default_property_dict, {"surface_area": 20, "description": "", "custom_description": "",
+                                            "has_settable_performance": False, "supported_modifiers": [],
+                                            "label": "test", "node_type": "SomeNodeType"}):
+        client.get("/node/default/static_properties/")
+        client.get("/node/default/static_properties/")
+        assert client.get("/node/unknown/static_properties/").status_code == 404
+    mocked_dbus.getAllStaticProperties.assert_called_once()
+
+    # If the engine can't be reached, it could have been restarted. So the properties must be requested again.
+    mocked_dbus.checkAlive = MagicMock(side_effect = dbus.exceptions.DBusException())
+    client.get("/node/default/temperature/")
+    client.application._nodes = mocked_dbus
+    mocked_dbus.checkAlive = MagicMock()
+    with patch.dict(default_property_dict, {"surface_area": 20, "description": "", "custom_description": "",
+                                            "has_settable_performance": False, "supported_modifiers": [],
+                                            "label": "test", "node_type": "SomeNodeType"}):
+        client.get("/node/default/static_properties/")
+    assert mocked_dbus.getAllStaticProperties.call_count == 2
+
+
+def test_tickCompletedRemovesExpiredModifiers(client):
+    server = client.application
+    db_session = getDBSession()
+    db_session.add_all([Modifier("BoostCoolingModifier", "default"), Modifier("BoostCoolingModifier", "other"),
+                        Modifier("OverrideDefaultSafetyControlsModifier", "default")])
+    db_session.commit()
+
+    server._last_known_tick = 1
+    server._onTickCompleted(2, [{"node_id": "default", "type": "BoostCoolingModifier"}])
+
+    assert server._last_known_tick == 2
+    remaining = {(modifier.name, modifier.node_id) for modifier in Modifier.query.all()}
+    assert remaining == {("BoostCoolingModifier", "other"), ("OverrideDefaultSafetyControlsModifier", "default")}
+
+
+def test_tickListenerSkipsTickRequest(client):
+    server = client.application
+    mocked_dbus = server.getMockedClient()
+    server._tick_listener_active = True
+    server._tick_resync_needed = False
+    server._setupNodeDBUS()
+    mocked_dbus.getCurrentTick.assert_not_called()
+
+    # Missing a tick means that we need to ask the engine again.
+    server._last_known_tick = 1
+    server._onTickCompleted(5, [])
+    mocked_dbus.getCurrentTick = MagicMock(return_value = 5)
+    server._setupNodeDBUS()
+    mocked_dbus.getCurrentTick.assert_called_once()
+    assert not server._tick_resync_needed
+
+
+def test_nodeServiceOwnerChanged(client):
+    server = client.application
+    mocked_dbus = server.getMockedClient()
+    server._tick_listener_active = True
+    server._tick_resync_needed = False
+    server._static_node_properties = {"default": {}}
+
+    # The listener thread must not drop the objects that a request could be using.
+    server._onNodeServiceOwnerChanged(":1.42")
+    assert server._nodes is mocked_dbus
+    assert server._static_node_properties == {"default": {}}
+
+    restarted_dbus = MagicMock()
+    server._bus.get_object = MagicMock(return_value = restarted_dbus)
+    server._setupNodeDBUS()
+    assert server._nodes is restarted_dbus
+    assert server._static_node_properties is None
+    restarted_dbus.getCurrentTick.assert_called_once()
+    assert not server._node_service_changed
+
+
+@pytest.mark.parametrize("invalidated_node_id, is_cached", [("default", False), (None, False), ("other", True)])
+def test_invalidateWhileCreatingResponse(client, invalidated_node_id, is_cached):
+    server = client.application
+    server._tick_listener_active = True
+    server._tick_resync_needed = False
+    creating = Event()
+    invalidated = Event()
+
+    def createResponse():
+        creating.set()
+        assert invalidated.wait(5)
+        return {"temperature": 20}
+
+    thread = Thread(target = server.getCachedResponse, args = ("/node/default/", "default", createResponse))
+    thread.start()
+    assert creating.wait(5)
+    # Eg; the target performance of the node was changed while the response was being created.
+    server.invalidateResponseCache(invalidated_node_id)
+    invalidated.set()
+    thread.join(5)
+
+    # The response could hold the data from before the change, so it can only be cached if it's about another node.
+    create_response = MagicMock(return_value = {"temperature": 30})
+    response = server.getCachedResponse("/node/default/", "default", create_response)
+    assert response == ({"temperature": 20} if is_cached else {"temperature": 30})
+    assert create_response.called != is_cached
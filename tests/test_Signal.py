@@ -1,5 +1,6 @@
 import Signal
 import copy
+import timeit
 import pytest
 
 class SignalReceiver:
@@ -120,3 +121,71 @@ def test_bad_signalemitter():
 
 
 
+
+
+def test_destroyedSlot():
+    test = SignalReceiver()
+    other = SignalReceiver()
+    signal = Signal.Signal()
+    signal.connect(test.slot)
+    signal.connect(other.slot)
+
+    del test
+    signal.emit()
+    signal.emit()  # After a slot is destroyed, it's dropped, so this only calls the remaining slot.
+
+    assert other.getEmitCount() == 2
+
+
+def test_emitOrder():
+    calls = []
+
+    def function(*args):
+        calls.append(("function", args))
+
+    class Receiver:
+        def slot(self, *args):
+            calls.append(("method", args))
+
+    receiver = Receiver()
+    signal = Signal.Signal()
+    linked_signal = Signal.Signal()
+    linked_signal.connect(function)
+    signal.connect(linked_signal)
+    signal.connect(receiver.slot)
+    signal.connect(function)
+
+    signal.emit(12)
+
+    # Functions first, then methods and finally the linked signals.
+    assert calls == [("function", (12, )), ("method", (12, )), ("function", (12, ))]
+
+
+def test_connectWhileEmitting():
+    test = SignalReceiver()
+    signal = Signal.Signal()
+
+    def connectOther():
+        signal.connect(test.slot)
+
+    signal.connect(connectOther)
+
+    signal.emit()  # Slots that are connected while emitting are only called the next time.
+    assert test.getEmitCount() == 0
+    signal.emit()
+    assert test.getEmitCount() == 1
+
+
+@pytest.mark.parametrize("num_slots", [0, 1, 10])
+def test_emitCost(num_slots):
+    # Micro benchmark of the emit cost; Run with -s to see the numbers.
+    receivers = [SignalReceiver() for _ in range(num_slots)]
+    signal = Signal.Signal()
+    for receiver in receivers:
+        signal.connect(receiver.slot)
+
+    num_emits = 10000
+    duration = min(timeit.repeat(lambda: signal.emit(1, key = 2), number = num_emits, repeat = 3))
+    print("Emitting with %s slots: %.3f microseconds" % (num_slots, duration / num_emits * 1e6))
+
+    assert all(receiver.getEmitCount() == 3 * num_emits for receiver in receivers)
@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from Nodes.ResourceStorage import ResourceStorage
+from Nodes.SubTickController import SubTickController
+
+
+def createConnection(requested, available):
+    connection = MagicMock(reserved_requested_amount = requested)
+    connection.getReservationDeficiency = MagicMock(return_value = requested - available)
+    return connection
+
+
+@pytest.mark.parametrize("min_sub_ticks, max_sub_ticks", [(0, 10), (5, 4)])
+def test_invalidLimits(min_sub_ticks, max_sub_ticks):
+    with pytest.raises(ValueError):
+        SubTickController(min_sub_ticks, max_sub_ticks)
+
+
+def test_steadyFlowUsesMinimum():
+    controller = SubTickController(2, 30)
+    storage = ResourceStorage("tank", "water", amount = 1000, max_storage = 1000)
+    assert controller.getSubTicksForNextTick() == 30
+
+    for _ in range(0, 4):
+        # Draining at a steady rate doesn't require more sub ticks.
+        storage._amount -= 100
+        controller.measureReservations([storage])
+        controller.measureStorages([storage])
+
+    assert controller.volatility == pytest.approx(0)
+    assert controller.getSubTicksForNextTick() == 2
+
+
+def test_changingFlowUsesMoreSubTicks():
+    controller = SubTickController(2, 30, volatility_for_max_sub_ticks = 0.1)
+    storage = ResourceStorage("tank", "water", amount = 1000, max_storage = 1000)
+
+    for change in [0, 0, 0, -25]:
+        storage._amount += change
+        controller.measureReservations([storage])
+        controller.measureStorages([storage])
+
+    # The rate changed with 2.5% of the capacity, which is a quarter of the volatility for the maximum
+    assert controller.volatility == pytest.approx(0.025)
+    assert controller.getSubTicksForNextTick() == 9
+
+    storage._amount -= 500
+    controller.measureReservations([storage])
+    controller.measureStorages([storage])
+    assert controller.getSubTicksForNextTick() == 30
+
+
+def test_changingDeficiencyUsesMoreSubTicks():
+    controller = SubTickController(2, 30)
+    node = MagicMock(enabled = True)
+    for available in [10, 10, 10, 5]:
+        node.getAllIncomingConnections = MagicMock(return_value = [createConnection(10, available)])
+        controller.measureReservations([node])
+        controller.measureStorages([node])
+
+    # Half of what was requested suddenly can't be provided anymore.
+    assert controller.volatility == pytest.approx(0.5)
+    assert controller.getSubTicksForNextTick() == 30
@@ -0,0 +1,54 @@
+import pytest
+
+from Nodes.TickProfiler import TickProfiler
+
+
+def test_emptySummary():
+    profiler = TickProfiler()
+    summary = profiler.getSummary()
+    assert summary["num_ticks"] == 0
+    assert summary["phases"] == {}
+
+
+def test_addTimesWithoutTick():
+    profiler = TickProfiler()
+    # Nothing should be recorded (or break) if no tick was started.
+    profiler.addPhaseTime("update", 2)
+    profiler.addSubTickTime(2)
+    profiler.finishTick(2, 1)
+    assert profiler.getTickProfiles() == []
+
+
+def test_summary():
+    profiler = TickProfiler()
+    profiler.startTick(1)
+    profiler.addPhaseTime("update", 2)
+    profiler.addSubTickTime(1)
+    profiler.addSubTickTime(1)
+    profiler.addNodeClassTimes({"Generator": 1})
+    profiler.finishTick(3, 2, 10)
+
+    profiler.startTick(2)
+    profiler.addPhaseTime("update", 4)
+    profiler.addSubTickTime(3)
+    profiler.addNodeClassTimes({"Generator": 3, "Valve": 2})
+    profiler.finishTick(5, 4, 20)
+
+    summary = profiler.getSummary()
+    assert summary["num_ticks"] == 2
+    assert summary["total"] == pytest.approx(4)
+    assert summary["replan_iterations"] == pytest.approx(3)
+    assert summary["sub_tick_count"] == pytest.approx(15)
+    assert summary["phases"]["update"] == pytest.approx(3)
+    assert summary["sub_ticks"] == pytest.approx([2, 1])
+    assert summary["node_classes"]["Generator"] == pytest.approx(2)
+    assert summary["node_classes"]["Valve"] == pytest.approx(1)
+
+
+def test_maxTicksStored():
+    profiler = TickProfiler(max_ticks_to_store = 2)
+    for tick in range(0, 5):
+        profiler.startTick(tick)
+        profiler.finishTick(1, 0)
+
+    assert [profile["tick"] for profile in profiler.getTickProfiles()] == [3, 4]
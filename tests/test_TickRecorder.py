@@ -0,0 +1,72 @@
+import pytest
+
+from Nodes.TickRecorder import TickRecorder, TickRecordingReader, getDataPath
+from tests.testHelpers import createEngineFromConfig
+
+numpy = pytest.importorskip("numpy")
+
+
+def test_recordAndRead(tmp_path):
+    engine = createEngineFromConfig("GeneratorWaterCoolerConfiguration.json")
+    path = str(tmp_path / "recording")
+    recorder = TickRecorder(engine, path)
+
+    temperatures = []
+    for _ in range(0, 5):
+        engine.doTick()
+        temperatures.append(engine.getNodeById("generator").temperature)
+    recorder.close()
+    assert recorder.num_ticks_recorded == 5
+
+    reader = TickRecordingReader(path)
+    assert reader.num_ticks == 5
+    assert reader.getTicks().tolist() == [1, 2, 3, 4, 5]
+    assert set(reader.getNodeIds()) == set(engine.getAllNodes())
+    assert reader.getColumn("generator", "temperature").tolist() == temperatures
+
+    generator = engine.getNodeById("generator")
+    assert reader.getColumn("generator", "produced", "energy")[-1] == generator.getResourcesProducedLastTick()["energy"]
+    node_data = reader.getNodeData("generator")
+    assert node_data["health"][-1] == generator.health
+    assert "received/fuel" in node_data
+
+    with pytest.raises(KeyError):
+        reader.getColumn("generator", "produced", "unobtainium")
+
+
+def test_continueRecording(tmp_path):
+    engine = createEngineFromConfig("GeneratorWaterCoolerConfiguration.json")
+    path = str(tmp_path / "recording")
+    recorder = TickRecorder(engine, path)
+    engine.doTick()
+    recorder.close()
+
+    # Simulate a crash while the next tick was being written.
+    with open(getDataPath(path), "ab") as f:
+        f.write(b"\x00" * 12)
+
+    recorder = TickRecorder(engine, path)
+    engine.doTick()
+    recorder.close()
+
+    reader = TickRecordingReader(path)
+    assert reader.getTicks().tolist() == [1, 2]
+
+
+def test_continueRecordingWithOtherNodes(tmp_path):
+    path = str(tmp_path / "recording")
+    TickRecorder(createEngineFromConfig("GeneratorWaterCoolerConfiguration.json"), path).close()
+
+    with pytest.raises(ValueError):
+        TickRecorder(createEngineFromConfig("MultiWaterTankConfig.json"), path)
+
+
+def test_stopRecording(tmp_path):
+    engine = createEngineFromConfig("GeneratorWaterCoolerConfiguration.json")
+    path = str(tmp_path / "recording")
+    recorder = TickRecorder(engine, path)
+    engine.doTick()
+    recorder.close()
+    engine.doTick()
+
+    assert TickRecordingReader(path).num_ticks == 1
@@ -0,0 +1,129 @@
+import time
+from threading import Event
+
+import pytest
+
+from Nodes.TickScheduler import TickScheduler, CATCH_UP_SKIP, CATCH_UP_BURST, CATCH_UP_SLOW_DOWN
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_invalidArguments():
+    with pytest.raises(ValueError):
+        TickScheduler(0, lambda: None)
+    with pytest.raises(ValueError):
+        TickScheduler(1, lambda: None, catch_up_policy = "panic")
+
+    scheduler = TickScheduler(1, lambda: None)
+    with pytest.raises(ValueError):
+        scheduler.setInterval(-1)
+    with pytest.raises(ValueError):
+        scheduler.setCatchUpPolicy("panic")
+
+
+@pytest.mark.parametrize("policy, finished, next_deadline, num_skipped", [
+    (CATCH_UP_SKIP, 10.5, 11, 0),  # No overrun, so the policy doesn't matter.
+    (CATCH_UP_BURST, 10.5, 11, 0),
+    (CATCH_UP_SLOW_DOWN, 10.5, 11, 0),
+    (CATCH_UP_SKIP, 13.5, 14, 3),  # The ticks at 11, 12 & 13 are skipped.
+    (CATCH_UP_BURST, 13.5, 11, 0),  # The ticks at 11, 12 & 13 are done right away.
+    (CATCH_UP_BURST, 18.5, 14, 3),  # Only 5 ticks are done right away, the oldest 3 are skipped.
+    (CATCH_UP_SLOW_DOWN, 13.5, 13.5, 0)])  # The schedule continues from when the tick finished.
+def test_getNextDeadline(policy, finished, next_deadline, num_skipped):
+    scheduler = TickScheduler(1, lambda: None, catch_up_policy = policy, max_burst = 5)
+    assert scheduler._getNextDeadline(10, 10, finished) == next_deadline
+    statistics = scheduler.getStatistics()
+    assert statistics["num_skipped"] == num_skipped
+    assert statistics["num_overruns"] == (1 if finished > 11 else 0)
+
+
+def test_burstCountsSingleOverrun():
+    scheduler = TickScheduler(1, lambda: None, catch_up_policy = CATCH_UP_BURST, max_burst = 5)
+    # The call at 10 took until 13.5, so the calls at 11, 12 & 13 are done right away (each taking 0.1 seconds).
+    assert scheduler._getNextDeadline(10, 10, 13.5) == 11
+    assert scheduler._getNextDeadline(11, 13.5, 13.6) == 12
+    assert scheduler._getNextDeadline(12, 13.6, 13.7) == 13
+    assert scheduler._getNextDeadline(13, 13.7, 13.8) == 14
+    statistics = scheduler.getStatistics()
+    assert statistics["num_overruns"] == 1
+    assert statistics["num_skipped"] == 0
+
+
+def test_setIntervalMovesNextDeadline():
+    clock = FakeClock()
+    scheduler = TickScheduler(10, lambda: None, clock = clock)
+    scheduler.start()
+    assert scheduler._next_deadline == 110
+    scheduler.setInterval(2)
+    assert scheduler._next_deadline == 102
+    assert scheduler.interval == 2
+    scheduler.shutdown(timeout = 5)
+
+
+def test_startPauseAndResume():
+    called = Event()
+    scheduler = TickScheduler(0.01, called.set)
+    assert not scheduler.is_running
+
+    scheduler.start()
+    assert scheduler.is_running
+    assert called.wait(5)
+
+    scheduler.pause()
+    assert not scheduler.is_running
+    thread = scheduler._thread
+    time.sleep(0.05)  # Give a call that was in progress time to finish.
+    called.clear()
+    time.sleep(0.05)
+    assert not called.is_set()
+
+    scheduler.start()
+    assert called.wait(5)
+    assert scheduler._thread is thread  # The same thread is used again.
+    assert scheduler.shutdown(timeout = 5)
+    with pytest.raises(RuntimeError):
+        scheduler.start()
+
+
+def test_fixedRateDoesNotDrift():
+    call_times = []
+    done = Event()
+    interval = 0.02
+
+    def target():
+        call_times.append(time.monotonic())
+        time.sleep(interval / 2)  # Waiting for the interval after each call would make the rate 50% slower.
+        if len(call_times) == 10:
+            done.set()
+
+    scheduler = TickScheduler(interval, target)
+    scheduler.start()
+    assert done.wait(5)
+    scheduler.shutdown(timeout = 5)
+
+    average_period = (call_times[9] - call_times[0]) / 9
+    assert average_period == pytest.approx(interval, rel = 0.25)
+    assert scheduler.getStatistics()["num_ticks"] >= 10
+
+
+def test_failingTargetKeepsRunning():
+    num_calls = []
+    done = Event()
+
+    def target():
+        num_calls.append(1)
+        if len(num_calls) == 3:
+            done.set()
+        raise RuntimeError("Oh noes")
+
+    scheduler = TickScheduler(0.01, target)
+    scheduler.start()
+    assert done.wait(5)
+    scheduler.shutdown(timeout = 5)
+    assert scheduler.getStatistics()["num_failed"] >= 3